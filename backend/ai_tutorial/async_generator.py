@@ -3,7 +3,7 @@ import time
 import logging
 from django.utils import timezone
 from .models import AITutorialRequest
-from .services import AITutorialGenerator
+from .services import get_tutorial_generator
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +27,7 @@ class ThreadedTutorialGenerator:
                 tutorial_request.save()
                 
                 # Generate tutorial
-                generator = AITutorialGenerator()
+                generator = get_tutorial_generator()
                 tutorial = generator.generate_tutorial(tutorial_request)
                 
                 # Remove from active tasks
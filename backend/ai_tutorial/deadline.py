@@ -0,0 +1,53 @@
+import time
+import logging
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a generation request runs out of its time budget"""
+
+
+class Deadline:
+    """
+    Time budget for a single tutorial generation request.
+
+    Created by the views and passed down through the generation pipeline so
+    that every stage can check how much time is left and cut its own work
+    short instead of running into the Gunicorn worker timeout.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def for_generation(cls):
+        """Deadline for a full tutorial generation request"""
+        return cls(getattr(settings, 'AI_TUTORIAL_GENERATION_TIMEOUT', 60))
+
+    @classmethod
+    def for_batch(cls):
+        """Deadline for a batch of pending requests generated by the worker"""
+        return cls(getattr(settings, 'AI_TUTORIAL_BATCH_TIMEOUT', 120))
+
+    @classmethod
+    def for_suggestions(cls):
+        """Deadline for a tutorial suggestions request"""
+        return cls(getattr(settings, 'AI_TUTORIAL_SUGGESTIONS_TIMEOUT', 10))
+
+    def remaining(self):
+        """Seconds left in the budget (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def check(self, stage=''):
+        """Raise DeadlineExceeded if the budget is used up"""
+        if self.expired():
+            logger.warning(f"Deadline of {self.seconds}s exceeded at stage: {stage or 'unknown'}")
+            raise DeadlineExceeded(
+                f"Tutorial generation timed out after {self.seconds} seconds"
+            )
@@ -0,0 +1,142 @@
+from django.db import DatabaseError, transaction
+from django.utils.text import slugify
+
+from backend.ndjson import ImportReport, check_fields, check_lengths, chunked, parse_timestamp, resolve_names
+from .models import Tutorial, TutorialCategory, TutorialStep
+
+DIFFICULTIES = {difficulty for difficulty, _ in Tutorial.DIFFICULTY_CHOICES}
+TUTORIAL_FIELDS = {
+    'title': str, 'slug': str, 'category': str, 'description': str, 'difficulty': str,
+    'estimated_duration': int, 'is_ai_generated': bool, 'created_at': str, 'steps': list,
+}
+STEP_FIELDS = {'step_number': int, 'title': str, 'content': str, 'code_example': str}
+
+
+def export_tutorials(chunk_size=500):
+    """
+    Yield every tutorial as a record with its category and steps, streamed
+    with a server-side cursor where supported and steps prefetched per chunk
+    """
+    tutorials = Tutorial.objects.order_by('id').select_related('category').prefetch_related('steps')
+    for tutorial in tutorials.iterator(chunk_size=chunk_size):
+        yield {
+            'title': tutorial.title,
+            'slug': tutorial.slug,
+            'category': tutorial.category.name,
+            'description': tutorial.description,
+            'difficulty': tutorial.difficulty,
+            'estimated_duration': tutorial.estimated_duration,
+            'is_ai_generated': tutorial.is_ai_generated,
+            'created_at': tutorial.created_at,
+            'steps': [
+                {
+                    'step_number': step.step_number,
+                    'title': step.title,
+                    'content': step.content,
+                    'code_example': step.code_example,
+                }
+                for step in tutorial.steps.all()
+            ],
+        }
+
+
+def import_tutorials(records, chunk_size=500, report=None, on_chunk=None):
+    """
+    Create tutorials and their steps from exported records, ``chunk_size``
+    tutorials per transaction with bulk inserts. Categories are matched by
+    name and created when missing; tutorials whose slug exists are skipped.
+    Raises ValueError for invalid records, and for a chunk the database
+    rejects (e.g. a slug taken meanwhile), which is rolled back.
+    """
+    report = report or ImportReport()
+    for chunk in chunked(records, chunk_size):
+        first_row = report.rows + 1
+        try:
+            with transaction.atomic():
+                _import_chunk(chunk, report)
+        except DatabaseError as e:
+            raise ValueError(f"Records {first_row}-{first_row + len(chunk) - 1}: {e}")
+        if on_chunk:
+            on_chunk(report)
+    return report
+
+
+def _import_chunk(records, report):
+    first_row = report.rows + 1
+    report.rows += len(records)
+
+    for number, record in enumerate(records, first_row):
+        _validate(record, f"Record {number}")
+
+    taken = set(Tutorial.objects.filter(slug__in=[record['slug'] for record in records]).values_list('slug', flat=True))
+    new_records = []
+    for record in records:
+        if record['slug'] not in taken:
+            taken.add(record['slug'])
+            new_records.append(record)
+    report.skipped += len(records) - len(new_records)
+    if not new_records:
+        return
+
+    categories = resolve_names(TutorialCategory, (record['category'] for record in new_records))
+    tutorials = [
+        Tutorial(
+            title=record['title'],
+            slug=record['slug'],
+            category=categories[record['category']],
+            description=record.get('description') or '',
+            difficulty=record['difficulty'],
+            estimated_duration=record.get('estimated_duration') or 30,
+            is_ai_generated=record.get('is_ai_generated') is not False,
+        )
+        for record in new_records
+    ]
+    Tutorial.objects.bulk_create(tutorials)
+
+    # auto_now_add overrides timestamps on insert, so restore exported ones
+    for tutorial, record in zip(tutorials, new_records):
+        tutorial.created_at = record['created_at'] or tutorial.created_at
+    Tutorial.objects.bulk_update(tutorials, ['created_at'])
+
+    TutorialStep.objects.bulk_create([
+        TutorialStep(
+            tutorial=tutorial,
+            step_number=step.get('step_number') or index,
+            title=step.get('title') or f'Step {index}',
+            content=step.get('content') or '',
+            code_example=step.get('code_example') or '',
+        )
+        for tutorial, record in zip(tutorials, new_records)
+        for index, step in enumerate(record['steps'], 1)
+    ])
+    report.created += len(tutorials)
+
+
+def _validate(record, label):
+    """
+    Check a record's fields before anything is written, and normalise it:
+    default difficulty, slug, steps and the parsed timestamp. Raises ValueError.
+    """
+    check_fields(record, TUTORIAL_FIELDS, label)
+    if not record.get('title') or not record.get('category'):
+        raise ValueError(f"{label}: title and category are required")
+    if record.setdefault('difficulty', 'beginner') not in DIFFICULTIES:
+        raise ValueError(f"{label}: unknown difficulty {record['difficulty']}")
+    if (record.get('estimated_duration') or 0) < 0:
+        raise ValueError(f"{label}: estimated_duration must not be negative")
+    record['slug'] = record.get('slug') or slugify(record['title'])
+    if not record['slug']:
+        raise ValueError(f"{label}: no slug can be made from the title")
+    check_lengths({'title': record['title'], 'slug': record['slug']}, Tutorial, label)
+    check_lengths({'name': record['category']}, TutorialCategory, f"{label}, category")
+    record['steps'] = record.get('steps') or []
+    for index, step in enumerate(record['steps'], 1):
+        check_fields(step, STEP_FIELDS, f"{label}, step {index}")
+        check_lengths({'title': step.get('title')}, TutorialStep, f"{label}, step {index}")
+        if (step.get('step_number') or 0) < 0:
+            raise ValueError(f"{label}, step {index}: step_number must not be negative")
+
+    try:
+        record['created_at'] = parse_timestamp(record.get('created_at'))
+    except ValueError as e:
+        raise ValueError(f"{label}: {e}")
@@ -0,0 +1,130 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from blog.models import Post
+from blog.semantic import index_stale_posts
+from ai_tutorial.models import Tutorial
+from ai_tutorial.vector_store import (
+    VectorStore, get_embedding_model, post_embedding_text, tutorial_embedding_text
+)
+import os
+import time
+
+
+TARGETS = {
+    'posts': (Post, ['id', 'title', 'excerpt', 'content'], post_embedding_text),
+    'tutorials': (Tutorial, ['id', 'title', 'description'], tutorial_embedding_text),
+}
+
+
+class Command(BaseCommand):
+    help = 'Compute sentence embeddings for all posts and tutorials (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            choices=['posts', 'tutorials', 'all'],
+            default='all',
+            help='Which content to embed',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows fetched per database round trip',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=4096,
+            help='Rows encoded and checkpointed together',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Encoder processes (1 disables the multi-process pool)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Discard existing embeddings and start from the beginning',
+        )
+
+    def handle(self, *args, **options):
+        targets = list(TARGETS) if options['target'] == 'all' else [options['target']]
+
+        model = get_embedding_model()
+        pool = None
+        if options['processes'] > 1:
+            self.stdout.write(f"Starting encoder pool with {options['processes']} processes...")
+            pool = model.start_multi_process_pool(target_devices=['cpu'] * options['processes'])
+
+        try:
+            for target in targets:
+                self._backfill(target, model, pool, options)
+        finally:
+            if pool is not None:
+                model.stop_multi_process_pool(pool)
+
+    def _backfill(self, target, model, pool, options):
+        model_class, fields, text_for = TARGETS[target]
+        store = VectorStore(target)
+
+        if options['restart']:
+            store.reset()
+
+        try:
+            meta = store.open_for_append()
+        except ValueError as e:
+            raise CommandError(f"{e} with --restart")
+
+        queryset = model_class.objects.filter(pk__gt=meta['last_pk']).order_by('pk').only(*fields)
+        total = queryset.count()
+        if meta['count']:
+            self.stdout.write(f"Resuming {target} after pk {meta['last_pk']} ({meta['count']} already stored)")
+        self.stdout.write(f"Embedding {total} {target}...")
+
+        done = 0
+        started = time.monotonic()
+        ids, texts = [], []
+        batch_read_at = None
+
+        def flush():
+            nonlocal done
+            if pool is not None:
+                vectors = model.encode_multi_process(texts, pool, batch_size=64)
+            else:
+                vectors = model.encode(texts, batch_size=64)
+            store.append(ids, vectors)
+            if model_class is Post:
+                # Posts saved after the batch was read stay stale for index_stale_posts
+                Post.objects.filter(pk__in=ids).update(embedded_at=batch_read_at)
+            done += len(ids)
+
+            elapsed = time.monotonic() - started
+            rate = done / elapsed if elapsed else 0.0
+            eta = (total - done) / rate if rate else 0.0
+            self.stdout.write(
+                f"  {target}: {done}/{total} rows, {rate:.1f} rows/sec, ETA {eta:.0f}s"
+            )
+            ids.clear()
+            texts.clear()
+
+        for obj in queryset.iterator(chunk_size=options['chunk_size']):
+            if not ids:
+                batch_read_at = timezone.now()
+            ids.append(obj.pk)
+            texts.append(text_for(obj))
+            if len(ids) >= options['batch_size']:
+                flush()
+        if ids:
+            flush()
+
+        if model_class is Post:
+            # Published posts edited since they were embedded
+            refreshed = index_stale_posts()
+            self.stdout.write(f"Refreshed {refreshed} posts saved since they were embedded")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Finished {target}: {len(store)} embeddings stored in {store.path}")
+        )
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ai_tutorial.ml_models import MLTutorialGenerator
+from ai_tutorial.static_embeddings import StaticEmbeddingEncoder
+from ai_tutorial.vector_store import normalize
+import statistics
+import time
+
+
+class Command(BaseCommand):
+    help = 'Build the static token embedding table used by the fast topic encoder'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.ML_STATIC_EMBEDDINGS_PATH,
+            help='Directory to write the embedding table to',
+        )
+        parser.add_argument(
+            '--compare-only',
+            action='store_true',
+            help='Skip building and only compare an existing table with the full model',
+        )
+        parser.add_argument(
+            '--repeats',
+            type=int,
+            default=20,
+            help='Timed encodes per query in the comparison',
+        )
+
+    def handle(self, *args, **options):
+        ml_generator = MLTutorialGenerator()
+        full_model = ml_generator.sentence_transformer
+
+        if options['compare_only']:
+            static_encoder = StaticEmbeddingEncoder.load(options['output'])
+        else:
+            self.stdout.write('Encoding vocabulary with the full model...')
+            started = time.monotonic()
+            static_encoder = StaticEmbeddingEncoder.build(full_model)
+            static_encoder.save(options['output'])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Static table ({static_encoder.vectors.shape[0]} tokens) saved to '
+                    f'{options["output"]} in {time.monotonic() - started:.1f}s'
+                )
+            )
+
+        self._compare(full_model, static_encoder, ml_generator.tutorial_templates, options['repeats'])
+
+    def _compare(self, full_model, static_encoder, templates, repeats):
+        """Compare latency and template-matching quality on our templates"""
+        template_texts = [f"{t['topic']} {t['description']} {t['difficulty']}" for t in templates]
+        queries = []
+        for template in templates:
+            queries.extend([template['topic'], template['description'], template['topic'].lower()])
+
+        full_templates = normalize(full_model.encode(template_texts))
+        static_templates = normalize(static_encoder.encode(template_texts))
+
+        full_times, static_times, agreements, cosines = [], [], [], []
+        for query in queries:
+            full_vector, elapsed = self._timed(lambda: full_model.encode([query]), repeats)
+            full_times.append(elapsed)
+            static_vector, elapsed = self._timed(lambda: static_encoder.encode([query]), repeats)
+            static_times.append(elapsed)
+
+            full_vector, static_vector = normalize(full_vector), normalize(static_vector)
+            full_best = int((full_templates @ full_vector[0]).argmax())
+            static_best = int((static_templates @ static_vector[0]).argmax())
+            agreements.append(full_best == static_best)
+            cosines.append(float(full_vector[0] @ static_vector[0]))
+
+        full_ms = statistics.median(full_times) * 1000
+        static_ms = statistics.median(static_times) * 1000
+        self.stdout.write(f'Compared on {len(queries)} queries against {len(templates)} templates:')
+        self.stdout.write(f'  full model median latency:   {full_ms:.3f} ms')
+        self.stdout.write(f'  static table median latency: {static_ms:.3f} ms')
+        self.stdout.write(f'  speedup:                     {full_ms / static_ms:.1f}x')
+        self.stdout.write(f'  top-1 template agreement:    {sum(agreements) / len(agreements):.0%}')
+        self.stdout.write(f'  mean query cosine to full:   {statistics.mean(cosines):.3f}')
+
+    def _timed(self, encode, repeats):
+        """Return the last result and the median wall time of ``repeats`` calls"""
+        times = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = encode()
+            times.append(time.perf_counter() - started)
+        return result, statistics.median(times)
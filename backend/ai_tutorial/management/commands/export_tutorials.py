@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from backend.ndjson import write_lines
+from ai_tutorial.exchange import export_tutorials
+import time
+
+
+class Command(BaseCommand):
+    help = 'Export every tutorial with its steps as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File to write, - for stdout',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Tutorials fetched per database round trip',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = write_lines(export_tutorials(chunk_size=options['chunk_size']), options['output'], self.stdout)
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {rows} tutorials in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from backend.ndjson import load_lines
+from ai_tutorial.exchange import import_tutorials
+
+
+class Command(BaseCommand):
+    help = 'Import tutorials from an NDJSON export, in chunked bulk transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON file to read, - for stdin')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Tutorials inserted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        source = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        try:
+            report = import_tutorials(
+                load_lines(source),
+                chunk_size=options['chunk_size'],
+                on_chunk=lambda report: self.stdout.write(str(report)),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write(self.style.SUCCESS(f'Imported {report}'))
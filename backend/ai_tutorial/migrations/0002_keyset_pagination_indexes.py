@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_tutorial', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tutorial',
+            index=models.Index(fields=['-created_at', '-id'], name='ai_tutorial_created_816485_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tutorial',
+            index=models.Index(fields=['-estimated_duration', '-id'], name='ai_tutorial_estimat_8c80ed_idx'),
+        ),
+    ]
@@ -112,7 +112,7 @@ class TutorialDecoder(nn.Module):
 class MLTutorialGenerator:
     """Main ML-based tutorial generator"""
     
-    def __init__(self, model_path='backend/ai_tutorial/models/'):
+    def __init__(self, model_path='backend/ai_tutorial/models/', static_embeddings_path=None):
         self.model_path = model_path
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         
@@ -122,10 +122,37 @@ class MLTutorialGenerator:
         self.encoder = None
         self.decoder = None
         self.tutorial_templates = None
+        self.template_embeddings = None
+        
+        # Optional transformer-free encoder for fast topic matching
+        self.static_encoder = None
+        if static_embeddings_path:
+            self._load_static_encoder(static_embeddings_path)
         
         # Load or create models
         self._load_or_create_models()
     
+    def _load_static_encoder(self, path):
+        """Load the static embedding table, falling back to the full model"""
+        from .static_embeddings import StaticEmbeddingEncoder
+        try:
+            self.static_encoder = StaticEmbeddingEncoder.load(path)
+            logger.info(f"Static embedding encoder loaded from {path}")
+        except Exception as e:
+            logger.warning(f"Could not load static embeddings, using full model: {e}")
+            self.static_encoder = None
+    
+    def _encode(self, texts):
+        """Embed texts for template matching"""
+        if self.static_encoder is not None:
+            return self.static_encoder.encode(texts)
+        return self.sentence_transformer.encode(texts)
+    
+    def warm_up(self):
+        """Precompute template embeddings so the first request doesn't pay for them"""
+        self._get_template_embeddings()
+        logger.info(f"ML generator warmed up with {len(self.tutorial_templates)} templates")
+    
     def _load_or_create_models(self):
         """Load existing models or create new ones"""
         try:
@@ -344,6 +371,7 @@ class MLTutorialGenerator:
         
         # Store tutorial templates for similarity matching
         self.tutorial_templates = sample_data
+        self.template_embeddings = None
     
     def _save_models(self):
         """Save trained models"""
@@ -359,17 +387,16 @@ class MLTutorialGenerator:
         with open(os.path.join(self.model_path, 'tutorial_templates.json'), 'w') as f:
             json.dump(self.tutorial_templates, f, indent=2)
     
-    def generate_tutorial(self, topic, description, difficulty):
+    def generate_tutorial(self, topic, description, difficulty, deadline=None):
         """Generate tutorial using ML models"""
         try:
-            # Create input text
-            input_text = f"{topic} {description} {difficulty}"
-            
-            # Get sentence embedding
-            input_embedding = self.sentence_transformer.encode([input_text])
+            # Not enough budget left to run the model: use the template fallback
+            if deadline is not None and deadline.expired():
+                logger.warning("Deadline reached before matching, using fallback tutorial")
+                return self._get_fallback_tutorial(topic, description, difficulty)
             
             # Find most similar tutorial template
-            best_match = self._find_best_match(topic, description, difficulty)
+            best_match = self._find_best_match(topic, description, difficulty, deadline=deadline)
             
             # Generate tutorial based on best match
             generated_tutorial = self._generate_from_template(best_match, topic, description, difficulty)
@@ -380,25 +407,84 @@ class MLTutorialGenerator:
             logger.error(f"Error generating tutorial: {e}")
             return self._get_fallback_tutorial(topic, description, difficulty)
     
-    def _find_best_match(self, topic, description, difficulty):
+    def generate_tutorials(self, inputs, deadline=None):
+        """
+        Generate tutorials for several (topic, description, difficulty) inputs
+        with a single batched encoder pass
+        """
+        if deadline is not None and deadline.expired():
+            logger.warning("Deadline reached before batch matching, using fallback tutorials")
+            return [self._get_fallback_tutorial(*item) for item in inputs]
+        
+        try:
+            input_texts = [f"{topic} {description} {difficulty}" for topic, description, difficulty in inputs]
+            input_embeddings = self._encode(input_texts)
+            best_matches = self._best_templates(input_embeddings, deadline=deadline)
+            
+            return [
+                self._generate_from_template(template, topic, description, difficulty)
+                for template, (topic, description, difficulty) in zip(best_matches, inputs)
+            ]
+        except Exception as e:
+            logger.error(f"Error generating tutorial batch: {e}")
+            return [self._get_fallback_tutorial(*item) for item in inputs]
+    
+    def _find_best_match(self, topic, description, difficulty, deadline=None):
         """Find the most similar tutorial template"""
         input_text = f"{topic} {description} {difficulty}"
-        input_embedding = self.sentence_transformer.encode([input_text])
+        input_embedding = self._encode([input_text])
+        return self._best_templates(input_embedding, deadline=deadline)[0]
+    
+    def _best_templates(self, input_embeddings, deadline=None):
+        """Pick the most similar template for each row of input embeddings"""
+        template_embeddings = self._get_template_embeddings(deadline=deadline)
+        if template_embeddings is None:
+            return [self.tutorial_templates[0]] * len(input_embeddings)
         
-        best_score = 0
-        best_match = None
+        similarities = cosine_similarity(input_embeddings, template_embeddings)
+        best_matches = []
+        for row in similarities:
+            best_index = int(np.argmax(row))
+            # Keep the previous behaviour of only accepting positive similarity
+            if row[best_index] > 0:
+                best_matches.append(self.tutorial_templates[best_index])
+            else:
+                best_matches.append(self.tutorial_templates[0])
+        return best_matches
+    
+    def _get_template_embeddings(self, deadline=None, chunk_size=32):
+        """
+        Encode all templates once and cache them on the generator.
         
-        for template in self.tutorial_templates:
-            template_text = f"{template['topic']} {template['description']} {template['difficulty']}"
-            template_embedding = self.sentence_transformer.encode([template_text])
-            
-            similarity = cosine_similarity(input_embedding, template_embedding)[0][0]
-            
-            if similarity > best_score:
-                best_score = similarity
-                best_match = template
+        If the deadline is reached part way through, only the templates
+        encoded so far are returned (and nothing is cached), so the caller
+        scores fewer candidates instead of overrunning.
+        """
+        if self.template_embeddings is not None:
+            return self.template_embeddings
+        
+        template_texts = [
+            f"{template['topic']} {template['description']} {template['difficulty']}"
+            for template in self.tutorial_templates
+        ]
+        
+        chunks = []
+        for start in range(0, len(template_texts), chunk_size):
+            # Out of budget: settle for the candidates encoded so far
+            if deadline is not None and deadline.expired():
+                logger.warning(
+                    f"Deadline reached after encoding {start} of {len(template_texts)} templates"
+                )
+                break
+            chunks.append(self._encode(template_texts[start:start + chunk_size]))
+        
+        if not chunks:
+            return None
         
-        return best_match if best_match else self.tutorial_templates[0]
+        embeddings = np.vstack(chunks)
+        if len(embeddings) == len(template_texts):
+            self.template_embeddings = embeddings
+        return embeddings
     
     def _generate_from_template(self, template, topic, description, difficulty):
         """Generate tutorial from template"""
@@ -36,6 +36,11 @@ class Tutorial(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination orderings (see backend/pagination.py)
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['-estimated_duration', '-id']),
+        ]
     
     def __str__(self):
         return self.title
@@ -49,6 +54,7 @@ class TutorialStep(models.Model):
     step_number = models.PositiveIntegerField()
     is_completed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['step_number']
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from backend.sparse_fields import SparseFieldsetMixin, pk_field
 from .models import Tutorial, TutorialCategory, TutorialStep, AITutorialRequest, UserTutorialProgress, TutorialRating
 
 
@@ -20,7 +21,7 @@ class TutorialStepSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'content', 'code_example', 'step_number', 'is_completed']
 
 
-class TutorialListSerializer(serializers.ModelSerializer):
+class TutorialListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = TutorialCategorySerializer(read_only=True)
     steps_count = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
@@ -34,6 +35,9 @@ class TutorialListSerializer(serializers.ModelSerializer):
             'is_ai_generated', 'created_at', 'updated_at'
         ]
     
+    collapsed_fields = {'category': pk_field()}
+    field_requirements = {'steps_count': ['steps'], 'average_rating': ['ratings'], 'user_progress': []}
+    
     def get_steps_count(self, obj):
         return obj.steps.count()
     
@@ -60,7 +64,7 @@ class TutorialListSerializer(serializers.ModelSerializer):
         return None
 
 
-class TutorialDetailSerializer(serializers.ModelSerializer):
+class TutorialDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category = TutorialCategorySerializer(read_only=True)
     steps = TutorialStepSerializer(many=True, read_only=True)
     average_rating = serializers.SerializerMethodField()
@@ -76,6 +80,11 @@ class TutorialDetailSerializer(serializers.ModelSerializer):
             'user_progress', 'user_rating', 'is_ai_generated', 'created_at', 'updated_at'
         ]
     
+    collapsed_fields = {'category': pk_field(), 'steps': pk_field(many=True)}
+    field_requirements = {
+        'average_rating': ['ratings'], 'ratings_count': ['ratings'], 'user_progress': [], 'user_rating': [],
+    }
+    
     def get_average_rating(self, obj):
         ratings = obj.ratings.all()
         if ratings:
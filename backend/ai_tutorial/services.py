@@ -1,7 +1,9 @@
+import threading
 import traceback
 from django.conf import settings
 from .models import Tutorial, TutorialStep, TutorialCategory, AITutorialRequest
-from django.utils.text import slugify
+from .deadline import DeadlineExceeded
+from backend.slugs import save_with_unique_slug
 import json
 import logging
 
@@ -23,6 +25,23 @@ except Exception as e:
     MLTutorialGenerator = None
 
 
+class RequestAlreadyClaimed(Exception):
+    """Raised when a tutorial request is already being generated elsewhere"""
+
+
+def claim_request(request_obj, from_statuses=('pending',)):
+    """
+    Move a tutorial request to 'processing' if it is in one of
+    ``from_statuses``, with one conditional UPDATE, so the view and the
+    batch task never generate the same request twice. Returns whether this
+    caller claimed it.
+    """
+    claimed = AITutorialRequest.objects.filter(id=request_obj.id, status__in=from_statuses).update(status='processing')
+    if claimed:
+        request_obj.status = 'processing'
+    return bool(claimed)
+
+
 class AITutorialGenerator:
     def __init__(self):
         logger.info("Initializing AITutorialGenerator")
@@ -36,7 +55,10 @@ class AITutorialGenerator:
         if self.use_ml and ML_AVAILABLE:
             try:
                 logger.info("Attempting to initialize ML generator")
-                self.ml_generator = MLTutorialGenerator()
+                static_embeddings_path = None
+                if getattr(settings, 'ML_STATIC_EMBEDDINGS', False):
+                    static_embeddings_path = settings.ML_STATIC_EMBEDDINGS_PATH
+                self.ml_generator = MLTutorialGenerator(static_embeddings_path=static_embeddings_path)
                 logger.info("ML generator initialized successfully")
             except Exception as e:
                 logger.error(f"Failed to initialize ML generator: {e}")
@@ -51,14 +73,20 @@ class AITutorialGenerator:
         else:
             logger.info("AITutorialGenerator initialized with ML support")
     
-    def generate_tutorial(self, request_obj):
-        """Generate a complete tutorial using ML models or mock data"""
+    def generate_tutorial(self, request_obj, deadline=None, claim_from=('pending',)):
+        """
+        Generate a complete tutorial using ML models or mock data. The request
+        is claimed first (see claim_request); RequestAlreadyClaimed is raised
+        if it isn't in one of ``claim_from``.
+        """
+        if not claim_request(request_obj, claim_from):
+            raise RequestAlreadyClaimed(f"Tutorial request {request_obj.id} is already being generated")
+        
         try:
             logger.info(f"Starting tutorial generation for topic: {request_obj.topic}, difficulty: {request_obj.difficulty}")
             
-            # Update request status
-            request_obj.status = 'processing'
-            request_obj.save()
+            if deadline is not None:
+                deadline.check('before generation')
             
             if self.use_ml:
                 logger.info("Using ML model for tutorial generation")
@@ -67,7 +95,8 @@ class AITutorialGenerator:
                     tutorial_data = self.ml_generator.generate_tutorial(
                         request_obj.topic,
                         request_obj.description,
-                        request_obj.difficulty
+                        request_obj.difficulty,
+                        deadline=deadline
                     )
                     logger.info("ML model generated tutorial successfully")
                 except Exception as e:
@@ -84,6 +113,10 @@ class AITutorialGenerator:
                 )
                 logger.info("Mock tutorial data created successfully")
             
+            if deadline is not None:
+                # Nothing is saved yet: a request over budget fails with a 504 instead
+                deadline.check('after generation')
+            
             logger.info(f"Tutorial data structure: {list(tutorial_data.keys()) if tutorial_data else 'None'}")
             
             # Create tutorial in database
@@ -98,6 +131,12 @@ class AITutorialGenerator:
             logger.info("Tutorial generation completed successfully")
             return tutorial
             
+        except DeadlineExceeded as e:
+            logger.warning(f"Tutorial generation timed out: {str(e)}")
+            request_obj.status = 'failed'
+            request_obj.error_message = str(e)
+            request_obj.save()
+            raise
         except Exception as e:
             logger.error(f"Error generating tutorial: {str(e)}")
             logger.error(traceback.format_exc())
@@ -106,6 +145,46 @@ class AITutorialGenerator:
             request_obj.save()
             raise
     
+    def generate_tutorials(self, request_objs, deadline=None):
+        """
+        Generate tutorials for several requests with one batched inference.
+        
+        Each request succeeds or fails on its own; returns the list of
+        tutorials that were created.
+        """
+        if not request_objs:
+            return []
+        
+        logger.info(f"Starting batched tutorial generation for {len(request_objs)} requests")
+        
+        if self.use_ml:
+            tutorials_data = self.ml_generator.generate_tutorials(
+                [(r.topic, r.description, r.difficulty) for r in request_objs],
+                deadline=deadline
+            )
+        else:
+            tutorials_data = [
+                self._create_mock_tutorial_data(r.topic, r.description, r.difficulty)
+                for r in request_objs
+            ]
+        
+        tutorials = []
+        for request_obj, tutorial_data in zip(request_objs, tutorials_data):
+            try:
+                tutorial = self._create_tutorial_from_data(tutorial_data, request_obj)
+                request_obj.status = 'completed'
+                request_obj.generated_tutorial = tutorial
+                request_obj.save()
+                tutorials.append(tutorial)
+            except Exception as e:
+                logger.error(f"Error saving batched tutorial for request {request_obj.id}: {str(e)}")
+                request_obj.status = 'failed'
+                request_obj.error_message = str(e)
+                request_obj.save()
+        
+        logger.info(f"Batched generation completed: {len(tutorials)}/{len(request_objs)} succeeded")
+        return tutorials
+    
     def _create_tutorial_from_data(self, data, request_obj):
         """Create Tutorial and TutorialStep objects from parsed data"""
         # Get or create category
@@ -117,23 +196,18 @@ class AITutorialGenerator:
             }
         )
         
-        # Generate unique slug
-        base_slug = slugify(data['title'])
-        slug = base_slug
-        counter = 1
-        while Tutorial.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-        
-        # Create tutorial
-        tutorial = Tutorial.objects.create(
-            title=data['title'],
-            slug=slug,
-            category=category,
-            description=data.get('description', ''),
-            difficulty=request_obj.difficulty,
-            estimated_duration=data.get('estimated_duration', 30),
-            is_ai_generated=True
+        # Create tutorial under a unique slug
+        tutorial = save_with_unique_slug(
+            lambda slug: Tutorial.objects.create(
+                title=data['title'],
+                slug=slug,
+                category=category,
+                description=data.get('description', ''),
+                difficulty=request_obj.difficulty,
+                estimated_duration=data.get('estimated_duration', 30),
+                is_ai_generated=True
+            ),
+            Tutorial.objects.all(), data['title'],
         )
         
         # Create tutorial steps
@@ -148,9 +222,13 @@ class AITutorialGenerator:
         
         return tutorial
     
-    def get_tutorial_suggestions(self, topic):
+    def get_tutorial_suggestions(self, topic, deadline=None):
         """Get AI-powered tutorial suggestions based on a topic"""
         try:
+            if deadline is not None and deadline.expired():
+                logger.warning("Deadline reached before suggestions, using generic suggestions")
+                return {"suggestions": self._create_generic_suggestions(topic)}
+            
             if self.use_ml:
                 # Use ML model for suggestions
                 return self._create_ml_suggestions(topic)
@@ -321,3 +399,30 @@ class AITutorialGenerator:
         }
 
 
+# Process-wide generator, shared by every request/task handled by this process
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_tutorial_generator():
+    """
+    Return the process-wide AITutorialGenerator, creating it on first use.
+    
+    Loading the sentence transformer and the model files is expensive, so
+    web and Celery worker processes reuse one warm generator instead of
+    building a new one for every request.
+    """
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = AITutorialGenerator()
+    return _generator
+
+
+def warm_tutorial_generator():
+    """Load the process-wide generator and precompute its template embeddings"""
+    generator = get_tutorial_generator()
+    if generator.use_ml:
+        generator.ml_generator.warm_up()
+    return generator
@@ -0,0 +1,77 @@
+import os
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = 'vectors.npy'
+TOKENIZER_FILE = 'tokenizer.json'
+
+
+class StaticEmbeddingEncoder:
+    """
+    Transformer-free encoder for short texts.
+
+    Every vocabulary token is run through the sentence transformer once and
+    its pooled output is stored in a (vocab_size, dim) table. A query is then
+    embedded by tokenizing it and mean-pooling the table rows of its tokens,
+    which is a NumPy lookup instead of a forward pass. Quality is lower than
+    the full model because tokens lose their context, so this is meant for
+    short topic strings where latency matters more.
+    """
+
+    def __init__(self, vectors, tokenizer):
+        self.vectors = vectors
+        self.tokenizer = tokenizer
+
+    @classmethod
+    def build(cls, sentence_transformer, batch_size=512):
+        """Precompute the vocabulary table from a SentenceTransformer"""
+        import torch
+
+        transformer = sentence_transformer[0].auto_model
+        hf_tokenizer = sentence_transformer.tokenizer
+        transformer.eval()
+
+        vocab_size = hf_tokenizer.vocab_size
+        cls_id, sep_id = hf_tokenizer.cls_token_id, hf_tokenizer.sep_token_id
+        device = next(transformer.parameters()).device
+        table = np.zeros((vocab_size, transformer.config.hidden_size), dtype=np.float32)
+
+        with torch.no_grad():
+            for start in range(0, vocab_size, batch_size):
+                token_ids = torch.arange(start, min(start + batch_size, vocab_size))
+                # Encode each token as its own sentence: [CLS] token [SEP]
+                input_ids = torch.stack([
+                    torch.full_like(token_ids, cls_id), token_ids, torch.full_like(token_ids, sep_id)
+                ], dim=1).to(device)
+                attention_mask = torch.ones_like(input_ids)
+                hidden = transformer(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+                # Same mean pooling the sentence transformer applies
+                table[start:start + len(token_ids)] = hidden.mean(dim=1).cpu().numpy()
+
+        return cls(table.astype(np.float16), hf_tokenizer.backend_tokenizer)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, VECTORS_FILE), self.vectors)
+        self.tokenizer.save(os.path.join(path, TOKENIZER_FILE))
+
+    @classmethod
+    def load(cls, path):
+        from tokenizers import Tokenizer
+
+        vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode='r')
+        tokenizer = Tokenizer.from_file(os.path.join(path, TOKENIZER_FILE))
+        # Queries are short, so don't pad or truncate them to the model length
+        tokenizer.no_padding()
+        tokenizer.no_truncation()
+        return cls(vectors, tokenizer)
+
+    def encode(self, texts):
+        """Embed a list of texts, returning a (len(texts), dim) float32 array"""
+        embeddings = np.zeros((len(texts), self.vectors.shape[1]), dtype=np.float32)
+        for row, encoding in enumerate(self.tokenizer.encode_batch(texts, add_special_tokens=False)):
+            if encoding.ids:
+                embeddings[row] = self.vectors[encoding.ids].astype(np.float32).mean(axis=0)
+        return embeddings
@@ -1,12 +1,15 @@
 from celery import shared_task
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 import logging
 from .models import AITutorialRequest, Tutorial
-from .services import AITutorialGenerator
+from .deadline import Deadline
+from .services import RequestAlreadyClaimed, get_tutorial_generator
 
 logger = logging.getLogger(__name__)
 
-@shared_task(bind=True, max_retries=3)
+@shared_task(bind=True, max_retries=3, acks_late=True)
 def generate_tutorial_task(self, request_id):
     """
     Celery task to generate tutorial asynchronously
@@ -15,13 +18,10 @@ def generate_tutorial_task(self, request_id):
         # Get the tutorial request
         tutorial_request = AITutorialRequest.objects.get(id=request_id)
         
-        # Update status to processing
-        tutorial_request.status = 'processing'
-        tutorial_request.save()
-        
-        # Generate tutorial
-        generator = AITutorialGenerator()
-        tutorial = generator.generate_tutorial(tutorial_request)
+        # Generate tutorial with the worker's warm generator; a retry picks up
+        # the request the failed attempt marked as failed
+        generator = get_tutorial_generator()
+        tutorial = generator.generate_tutorial(tutorial_request, claim_from=('pending', 'failed'))
         
         logger.info(f"Successfully generated tutorial: {tutorial.title}")
         return {
@@ -33,6 +33,10 @@ def generate_tutorial_task(self, request_id):
     except AITutorialRequest.DoesNotExist:
         logger.error(f"Tutorial request with ID {request_id} not found")
         return {'status': 'error', 'message': 'Tutorial request not found'}
+    
+    except RequestAlreadyClaimed as e:
+        logger.info(str(e))
+        return {'status': 'skipped', 'message': str(e)}
         
     except Exception as e:
         logger.error(f"Error generating tutorial: {str(e)}")
@@ -59,7 +63,7 @@ def get_tutorial_suggestions_task(topic):
     Celery task to get tutorial suggestions asynchronously
     """
     try:
-        generator = AITutorialGenerator()
+        generator = get_tutorial_generator()
         suggestions = generator.get_tutorial_suggestions(topic)
         return {
             'status': 'success',
@@ -71,3 +75,50 @@ def get_tutorial_suggestions_task(topic):
             'status': 'error',
             'message': str(e)
         }
+
+@shared_task(acks_late=True)
+def generate_pending_tutorials_task(batch_size=None):
+    """
+    Celery task that claims a batch of pending tutorial requests and
+    generates them with one batched inference
+    """
+    batch_size = batch_size or getattr(settings, 'AI_TUTORIAL_BATCH_SIZE', 8)
+    
+    # Claim the batch atomically so concurrent workers never pick the same
+    # rows; each row moves from pending to processing only if nothing (such
+    # as the create view generating it inline) claimed it first
+    with transaction.atomic():
+        candidates = list(
+            AITutorialRequest.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .order_by('created_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        request_ids = [
+            request_id for request_id in candidates
+            if AITutorialRequest.objects.filter(id=request_id, status='pending').update(status='processing')
+        ]
+    
+    if not request_ids:
+        return {'status': 'success', 'processed': 0}
+    
+    tutorial_requests = list(
+        AITutorialRequest.objects.filter(id__in=request_ids).order_by('created_at')
+    )
+    
+    try:
+        generator = get_tutorial_generator()
+        tutorials = generator.generate_tutorials(tutorial_requests, deadline=Deadline.for_batch())
+    except Exception as e:
+        logger.error(f"Error generating tutorial batch: {str(e)}")
+        AITutorialRequest.objects.filter(id__in=request_ids, status='processing').update(
+            status='failed', error_message=str(e)
+        )
+        return {'status': 'error', 'message': str(e)}
+    
+    logger.info(f"Batch generated {len(tutorials)} of {len(request_ids)} tutorials")
+    return {
+        'status': 'success',
+        'processed': len(request_ids),
+        'tutorial_ids': [tutorial.id for tutorial in tutorials]
+    }
@@ -1,3 +1,136 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase, override_settings
+
+from backend.test_runner import CacheClearingTestCase
+from .deadline import Deadline, DeadlineExceeded
+from .exchange import export_tutorials, import_tutorials
+from .models import AITutorialRequest, Tutorial, TutorialCategory, TutorialRating, TutorialStep
+from .services import AITutorialGenerator, RequestAlreadyClaimed
+from .tasks import generate_pending_tutorials_task
+
+
+class TutorialConditionalGetTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(username='learner', password='password')
+        category = TutorialCategory.objects.create(name='Django')
+        self.tutorial = Tutorial.objects.create(
+            title='Models', slug='models', category=category, description='x', estimated_duration=10,
+        )
+        self.url = f'/ai-tutorial/api/tutorials/{self.tutorial.id}/'
+
+    def test_etag_follows_steps_and_ratings(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        step = TutorialStep.objects.create(tutorial=self.tutorial, step_number=1, title='Step', content='x')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        step.content = 'Edited'
+        step.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        TutorialRating.objects.create(tutorial=self.tutorial, user=self.user, rating=5)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(USE_ML_GENERATOR=False)
+class TutorialRequestClaimTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='learner', password='password')
+        self.request = AITutorialRequest.objects.create(user=self.user, topic='Django', description='x')
+
+    def test_a_request_is_generated_once(self):
+        generator = AITutorialGenerator()
+        tutorial = generator.generate_tutorial(self.request)
+        self.assertEqual(AITutorialRequest.objects.get(pk=self.request.pk).generated_tutorial, tutorial)
+        with self.assertRaises(RequestAlreadyClaimed):
+            generator.generate_tutorial(self.request)
+
+        AITutorialRequest.objects.filter(pk=self.request.pk).update(status='processing')
+        self.assertEqual(generate_pending_tutorials_task()['processed'], 0)
+
+
+@override_settings(USE_ML_GENERATOR=False)
+class TutorialDeadlineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='learner', password='password')
+        self.request = AITutorialRequest.objects.create(user=self.user, topic='Django', description='x')
+
+    def assert_failed_without_tutorial(self, request_id):
+        request = AITutorialRequest.objects.get(pk=request_id)
+        self.assertEqual(request.status, 'failed')
+        self.assertIn('timed out', request.error_message)
+        self.assertFalse(Tutorial.objects.exists())
+
+    def test_expired_deadline_fails_the_request(self):
+        with self.assertRaises(DeadlineExceeded):
+            AITutorialGenerator().generate_tutorial(self.request, deadline=Deadline(0))
+        self.assert_failed_without_tutorial(self.request.pk)
+
+    def test_budget_spent_during_generation_fails_before_saving(self):
+        generator = AITutorialGenerator()
+        deadline = Deadline(60)
+        create_data = generator._create_mock_tutorial_data
+
+        def slow_generation(*args):
+            deadline.expires_at = 0
+            return create_data(*args)
+
+        with mock.patch.object(generator, '_create_mock_tutorial_data', side_effect=slow_generation):
+            with self.assertRaises(DeadlineExceeded):
+                generator.generate_tutorial(self.request, deadline=deadline)
+        self.assert_failed_without_tutorial(self.request.pk)
+
+    def test_view_answers_504_when_the_budget_is_spent(self):
+        self.client.force_login(self.user)
+        with mock.patch('ai_tutorial.views.Deadline.for_generation', return_value=Deadline(0)):
+            response = self.client.post('/ai-tutorial/api/requests/', {'topic': 'Celery', 'description': 'x'})
+            self.assertEqual(response.status_code, 504)
+            self.assert_failed_without_tutorial(response.json()['request']['id'])
+
+            response = self.client.post(f"/ai-tutorial/api/requests/{response.json()['request']['id']}/regenerate/")
+            self.assertEqual(response.status_code, 504)
+
+
+class TutorialExchangeTest(TestCase):
+    def setUp(self):
+        category = TutorialCategory.objects.create(name='Django')
+        for i in range(3):
+            tutorial = Tutorial.objects.create(
+                title=f'Tutorial {i}', slug=f'tutorial-{i}', category=category, description='x',
+                difficulty='advanced', estimated_duration=45,
+            )
+            for number in (1, 2):
+                TutorialStep.objects.create(tutorial=tutorial, step_number=number, title=f'Step {number}', content='x')
+
+    def test_export_then_import_round_trips(self):
+        exported = json.dumps(list(export_tutorials()), cls=DjangoJSONEncoder)
+        Tutorial.objects.all().delete()
+        TutorialCategory.objects.all().delete()
+
+        self.assertEqual(import_tutorials(json.loads(exported)).created, 3)
+        tutorial = Tutorial.objects.get(slug='tutorial-1')
+        self.assertEqual((tutorial.category.name, tutorial.difficulty, tutorial.estimated_duration), ('Django', 'advanced', 45))
+        self.assertEqual(list(tutorial.steps.values_list('step_number', 'title')), [(1, 'Step 1'), (2, 'Step 2')])
+        self.assertEqual(import_tutorials(json.loads(exported)).skipped, 3)
+
+    def test_import_rejects_wrong_field_types(self):
+        for record in (
+            {'title': 'New', 'category': 'Django', 'estimated_duration': '30'},
+            {'title': 'New', 'category': 'Django', 'steps': [{'step_number': True}]},
+            {'title': 'New', 'category': ['Django']},
+            {'title': 'New', 'category': 'Django', 'slug': 'x' * 201},
+        ):
+            with self.assertRaisesMessage(ValueError, 'Record 2'):
+                import_tutorials([{'title': 'Valid', 'category': 'Django'}, record])
+        self.assertFalse(Tutorial.objects.filter(title__in=['Valid', 'New']).exists())
@@ -0,0 +1,253 @@
+import fcntl
+import json
+import os
+import threading
+import logging
+from contextlib import contextmanager
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Same sentence transformer the tutorial generator uses
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """Return the process-wide sentence transformer, loading it on first use"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _model
+
+
+def normalize(vectors):
+    """L2-normalize rows so a dot product is a cosine similarity"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def post_embedding_text(post):
+    """Text used to embed a blog post"""
+    # The model truncates long inputs anyway, so don't ship the whole body
+    return f"{post.title}\n{post.excerpt}\n{post.content[:2000]}"
+
+
+def tutorial_embedding_text(tutorial):
+    """Text used to embed a tutorial"""
+    return f"{tutorial.title}\n{tutorial.description}"
+
+
+class VectorStore:
+    """
+    Compact on-disk store of float16 embeddings.
+
+    Vectors are kept in a raw row-major float16 file next to an int64 file
+    holding the primary key of every row, plus a small JSON checkpoint. Rows
+    are only counted once the checkpoint is written, so a run interrupted
+    mid-write is truncated back to the last checkpoint and resumed from there.
+    """
+
+    def __init__(self, name, dim=EMBEDDING_DIM, path=None):
+        self.name = name
+        self.dim = dim
+        self.path = os.path.join(path or settings.EMBEDDINGS_PATH, name)
+        self.vectors_file = os.path.join(self.path, 'vectors.f16')
+        self.ids_file = os.path.join(self.path, 'ids.i64')
+        self.meta_file = os.path.join(self.path, 'meta.json')
+        self.lock_file = os.path.join(self.path, '.lock')
+
+    @contextmanager
+    def locked(self):
+        """Exclusive cross-process lock for writers"""
+        os.makedirs(self.path, exist_ok=True)
+        with open(self.lock_file, 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def load_meta(self):
+        if not os.path.exists(self.meta_file):
+            return {'model': EMBEDDING_MODEL_NAME, 'dim': self.dim, 'count': 0, 'last_pk': 0}
+        with open(self.meta_file, 'r') as f:
+            return json.load(f)
+
+    def save_meta(self, meta):
+        # Write-then-rename so the checkpoint is never half written
+        tmp_file = f"{self.meta_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.meta_file)
+
+    def __len__(self):
+        return self.load_meta()['count']
+
+    def reset(self):
+        """Delete all stored vectors and the checkpoint"""
+        for file_path in (self.vectors_file, self.ids_file, self.meta_file):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def open_for_append(self):
+        """
+        Prepare the store for appending and return its checkpoint.
+
+        Anything written after the last checkpoint is discarded.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        meta = self.load_meta()
+        if meta['model'] != EMBEDDING_MODEL_NAME or meta['dim'] != self.dim:
+            raise ValueError(
+                f"Store '{self.name}' was built with {meta['model']} ({meta['dim']} dims); "
+                f"rebuild it from scratch"
+            )
+
+        with self.locked():
+            meta = self.load_meta()
+            for file_path, row_bytes in ((self.vectors_file, self.dim * 2), (self.ids_file, 8)):
+                with open(file_path, 'ab') as f:
+                    f.truncate(meta['count'] * row_bytes)
+        return meta
+
+    def append(self, ids, vectors, checkpoint=True):
+        """
+        Append rows and record them in the checkpoint.
+
+        With ``checkpoint`` the ids must be increasing and ``last_pk`` moves
+        forward (used by the backfill); incremental updates pass False so
+        they never make a running backfill skip rows.
+        """
+        if not len(ids):
+            return self.load_meta()
+
+        with self.locked():
+            return self._append(ids, vectors, checkpoint)
+
+    def _append(self, ids, vectors, checkpoint):
+        vectors = np.ascontiguousarray(normalize(vectors), dtype=np.float16)
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+
+        meta = self.load_meta()
+        for file_path, data in ((self.vectors_file, vectors), (self.ids_file, ids)):
+            with open(file_path, 'ab') as f:
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        meta['count'] += len(ids)
+        if checkpoint:
+            meta['last_pk'] = int(ids[-1])
+        self.save_meta(meta)
+        return meta
+
+    def upsert(self, pk, vector):
+        """Overwrite the vector stored for ``pk`` in place, or append it"""
+        self.upsert_many([pk], [vector])
+
+    def upsert_many(self, pks, vectors):
+        """Overwrite the vectors stored for ``pks`` in place and append the new ones, in one pass over the ids"""
+        with self.locked():
+            count = len(self)
+            vectors = normalize(vectors).astype(np.float16)
+            ids = self.ids() if count else np.zeros(0, dtype=np.int64)
+            stored = np.isin(ids, pks)
+            if stored.any():
+                position = {pk: i for i, pk in enumerate(pks)}
+                matrix = np.memmap(self.vectors_file, dtype=np.float16, mode='r+', shape=(count, self.dim))
+                for row in np.flatnonzero(stored):
+                    matrix[row] = vectors[position[int(ids[row])]]
+                matrix.flush()
+                del matrix
+            present = set(ids[stored].tolist())
+            new = [i for i, pk in enumerate(pks) if pk not in present]
+            if new:
+                self._append([pks[i] for i in new], vectors[new], checkpoint=False)
+
+    def remove(self, pks):
+        """
+        Delete the rows stored for ``pks``: the last rows are moved into the
+        gaps and the files truncated. Returns the number of rows removed.
+        """
+        with self.locked():
+            count = len(self)
+            ids = self.ids() if count else np.zeros(0, dtype=np.int64)
+            removed = np.flatnonzero(np.isin(ids, list(pks)))
+            if not len(removed):
+                return 0
+            keep = count - len(removed)
+            holes = removed[removed < keep]
+            if len(holes):
+                # As many surviving rows past the new end as there are holes before it
+                movers = np.setdiff1d(np.arange(keep, count), removed)
+                matrix = np.memmap(self.vectors_file, dtype=np.float16, mode='r+', shape=(count, self.dim))
+                matrix[holes] = matrix[movers]
+                matrix.flush()
+                del matrix
+                stored_ids = np.memmap(self.ids_file, dtype=np.int64, mode='r+', shape=(count,))
+                stored_ids[holes] = ids[movers]
+                stored_ids.flush()
+                del stored_ids
+            # A crash before the checkpoint leaves moved rows stored twice, which search tolerates
+            meta = self.load_meta()
+            meta['count'] = keep
+            self.save_meta(meta)
+            for file_path, row_bytes in ((self.vectors_file, self.dim * 2), (self.ids_file, 8)):
+                with open(file_path, 'ab') as f:
+                    f.truncate(keep * row_bytes)
+            return len(removed)
+
+    def search(self, vector, k, block_size=65536):
+        """
+        Return up to ``k`` (pk, score) pairs with the highest cosine similarity.
+
+        The float16 matrix is scored block by block straight from the memory
+        map, so only one block is ever upcast to float32.
+        """
+        matrix = self.matrix()
+        if not len(matrix) or k <= 0:
+            return []
+
+        query = normalize([vector])[0]
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), block_size):
+            block = np.asarray(matrix[start:start + block_size], dtype=np.float32)
+            scores[start:start + block_size] = block @ query
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        ids = self.ids()
+        results = []
+        seen = set()
+        for row in top:
+            pk = int(ids[row])
+            # A row can be stored twice if it was updated while a backfill ran
+            if pk not in seen:
+                seen.add(pk)
+                results.append((pk, float(scores[row])))
+        return results
+
+    def matrix(self):
+        """Memory-mapped (count, dim) float16 matrix of all stored vectors"""
+        count = len(self)
+        if count == 0:
+            return np.zeros((0, self.dim), dtype=np.float16)
+        return np.memmap(self.vectors_file, dtype=np.float16, mode='r', shape=(count, self.dim))
+
+    def ids(self):
+        """Primary keys of the stored rows, in row order"""
+        return np.fromfile(self.ids_file, dtype=np.int64, count=len(self))
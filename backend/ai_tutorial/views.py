@@ -2,31 +2,39 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Avg
+from django.db.models import Q, Avg, Count, Max, OuterRef, Subquery, Sum
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from django.utils import timezone
 import logging
 
+from backend.conditional import conditional_detail, make_etag
+from backend.ndjson import ImportReport, load_lines, streaming_response
+from backend.pagination import KeysetCursorPagination
+from backend.sparse_fields import SparseFieldsetViewMixin
 from .models import Tutorial, TutorialCategory, TutorialStep, AITutorialRequest, UserTutorialProgress, TutorialRating
 from .serializers import (
     TutorialListSerializer, TutorialDetailSerializer, TutorialCategorySerializer,
     AITutorialRequestSerializer, TutorialProgressUpdateSerializer, TutorialRatingSerializer
 )
+from .deadline import Deadline, DeadlineExceeded
+from .exchange import export_tutorials, import_tutorials
 
 logger = logging.getLogger(__name__)
 
 # Import services conditionally
 try:
-    from .services import AITutorialGenerator
+    from .services import AITutorialGenerator, RequestAlreadyClaimed, get_tutorial_generator
     AI_SERVICES_AVAILABLE = True
 except ImportError as e:
     logger.warning(f"AI services not available: {e}")
     AI_SERVICES_AVAILABLE = False
     AITutorialGenerator = None
+    RequestAlreadyClaimed = None
+    get_tutorial_generator = None
 
 
-class TutorialViewSet(viewsets.ReadOnlyModelViewSet):
+class TutorialViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tutorial.objects.select_related('category').prefetch_related('steps', 'ratings')
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
@@ -34,12 +42,54 @@ class TutorialViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'estimated_duration']
     ordering = ['-created_at']
+    pagination_class = KeysetCursorPagination
     
     def get_serializer_class(self):
         if self.action == 'list':
             return TutorialListSerializer
         return TutorialDetailSerializer
     
+    @conditional_detail(lambda view, request, pk=None: view.detail_validators(request, pk))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+    
+    def detail_validators(self, request, pk):
+        """
+        ETag and Last-Modified of a tutorial detail from one query: the
+        tutorial row, its steps and ratings aggregates and, for signed-in
+        users, their own progress and rating
+        """
+        steps = TutorialStep.objects.filter(tutorial=OuterRef('pk')).order_by().values('tutorial')
+        ratings = TutorialRating.objects.filter(tutorial=OuterRef('pk')).order_by().values('tutorial')
+        annotations = {
+            'steps_updated_at': Subquery(steps.annotate(latest=Max('updated_at')).values('latest')),
+            'steps_total': Subquery(steps.annotate(total=Count('pk')).values('total')),
+            'ratings_total': Subquery(ratings.annotate(total=Count('pk')).values('total')),
+            'ratings_sum': Subquery(ratings.annotate(total=Sum('rating')).values('total')),
+        }
+        if request.user.is_authenticated:
+            annotations['progress_accessed'] = Subquery(
+                UserTutorialProgress.objects.filter(tutorial=OuterRef('pk'), user=request.user).values('last_accessed')[:1]
+            )
+            annotations['user_rating'] = Subquery(
+                TutorialRating.objects.filter(tutorial=OuterRef('pk'), user=request.user).values('rating')[:1]
+            )
+        try:
+            tutorial = Tutorial.objects.filter(pk=pk).values('id', 'updated_at').annotate(**annotations).first()
+        except (TypeError, ValueError):
+            return None
+        if tutorial is None:
+            return None
+        
+        etag = make_etag(
+            *(tutorial[key] for key in sorted(tutorial)),
+            request.user.id, sorted(request.query_params.lists()), request.accepted_renderer.format,
+        )
+        last_modified = max(filter(None, [
+            tutorial['updated_at'], tutorial['steps_updated_at'], tutorial.get('progress_accessed')
+        ]))
+        return etag, last_modified
+    
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def start(self, request, pk=None):
         """Start a tutorial (create progress record)"""
@@ -118,6 +168,23 @@ class TutorialViewSet(viewsets.ReadOnlyModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """Stream every tutorial with its steps as NDJSON"""
+        return streaming_response(export_tutorials(), 'tutorials.ndjson')
+    
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAdminUser])
+    def bulk_import(self, request):
+        """Bulk import tutorials from an NDJSON request body, as produced by export"""
+        report = ImportReport()
+        try:
+            import_tutorials(load_lines(request.stream or []), report=report)
+        except ValueError as e:
+            # Chunks before the invalid record are already imported
+            return Response({'error': str(e), **report.as_dict()}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(f"Imported tutorials: {report}")
+        return Response(report.as_dict(), status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['get'])
     def popular(self, request):
         """Get popular tutorials based on ratings and completion rates"""
@@ -180,9 +247,10 @@ class AITutorialRequestViewSet(viewsets.ModelViewSet):
             tutorial_request = serializer.save()
             
             # Start generating tutorial in the background
+            deadline = Deadline.for_generation()
             try:
-                generator = AITutorialGenerator()
-                tutorial = generator.generate_tutorial(tutorial_request)
+                generator = get_tutorial_generator()
+                tutorial = generator.generate_tutorial(tutorial_request, deadline=deadline)
                 
                 # Return the created tutorial
                 tutorial_serializer = TutorialDetailSerializer(
@@ -194,6 +262,17 @@ class AITutorialRequestViewSet(viewsets.ModelViewSet):
                     'tutorial': tutorial_serializer.data
                 }, status=status.HTTP_201_CREATED)
                 
+            except RequestAlreadyClaimed:
+                return Response({
+                    'message': 'Tutorial request created and is being generated',
+                    'request': serializer.data,
+                }, status=status.HTTP_202_ACCEPTED)
+            except DeadlineExceeded as e:
+                return Response({
+                    'message': 'Tutorial request created but generation timed out',
+                    'request': serializer.data,
+                    'error': str(e)
+                }, status=status.HTTP_504_GATEWAY_TIMEOUT)
             except Exception as e:
                 logger.error(f"Error generating tutorial: {str(e)}")
                 return Response({
@@ -219,9 +298,10 @@ class AITutorialRequestViewSet(viewsets.ModelViewSet):
                 'error': 'AI tutorial suggestions are currently unavailable'
             }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         
+        deadline = Deadline.for_suggestions()
         try:
-            generator = AITutorialGenerator()
-            suggestions = generator.get_tutorial_suggestions(topic)
+            generator = get_tutorial_generator()
+            suggestions = generator.get_tutorial_suggestions(topic, deadline=deadline)
             return Response(suggestions)
         except Exception as e:
             logger.error(f"Error getting suggestions: {str(e)}")
@@ -246,9 +326,10 @@ class AITutorialRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        deadline = Deadline.for_generation()
         try:
-            generator = AITutorialGenerator()
-            tutorial = generator.generate_tutorial(tutorial_request)
+            generator = get_tutorial_generator()
+            tutorial = generator.generate_tutorial(tutorial_request, deadline=deadline, claim_from=('failed',))
             
             tutorial_serializer = TutorialDetailSerializer(
                 tutorial, context={'request': request}
@@ -258,6 +339,16 @@ class AITutorialRequestViewSet(viewsets.ModelViewSet):
                 'tutorial': tutorial_serializer.data
             })
             
+        except RequestAlreadyClaimed:
+            return Response(
+                {'error': 'Tutorial is already being regenerated'},
+                status=status.HTTP_409_CONFLICT
+            )
+        except DeadlineExceeded as e:
+            return Response(
+                {'error': f'Failed to regenerate tutorial: {str(e)}'},
+                status=status.HTTP_504_GATEWAY_TIMEOUT
+            )
         except Exception as e:
             logger.error(f"Error regenerating tutorial: {str(e)}")
             return Response(
@@ -0,0 +1,204 @@
+"""
+Latency, query and payload benchmarks for the REST API.
+
+Endpoints are driven either in-process through the Django test client,
+where the queries of every request are counted, or over HTTP against a
+running server. Results are compared with a stored baseline so a change
+that adds queries, grows responses or slows an endpoint down shows up.
+"""
+import json
+import math
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+BENCHMARK_USERNAME = 'benchmark'
+
+# (name, method, path, authenticated, body); {post}, {tutorial} and
+# {category} are filled in from the dataset, {username} and {password}
+# from the benchmark user
+ENDPOINTS = [
+    ('alive', 'get', '/alive/', False, None),
+    ('posts', 'get', '/blog/api/posts/', False, None),
+    ('posts-sparse', 'get', '/blog/api/posts/?fields=id,title,slug,author', False, None),
+    ('posts-by-category', 'get', '/blog/api/posts/?category={category}', False, None),
+    ('posts-search', 'get', '/blog/api/posts/?search=django', False, None),
+    ('posts-featured', 'get', '/blog/api/posts/featured/', False, None),
+    ('posts-popular', 'get', '/blog/api/posts/popular/', False, None),
+    ('posts-recent', 'get', '/blog/api/posts/recent/', False, None),
+    ('post-detail', 'get', '/blog/api/posts/{post}/', False, None),
+    ('post-comments', 'get', '/blog/api/posts/{post}/comments/', False, None),
+    ('categories', 'get', '/blog/api/categories/', False, None),
+    ('tags', 'get', '/blog/api/tags/', False, None),
+    ('tutorials', 'get', '/ai-tutorial/api/tutorials/', False, None),
+    ('tutorial-detail', 'get', '/ai-tutorial/api/tutorials/{tutorial}/', False, None),
+    ('tutorials-popular', 'get', '/ai-tutorial/api/tutorials/popular/', False, None),
+    ('tutorials-recommended', 'get', '/ai-tutorial/api/tutorials/recommended/', True, None),
+    ('tutorial-categories', 'get', '/ai-tutorial/api/categories/', False, None),
+    ('auth-profile', 'get', '/auth/profile/', True, None),
+    ('auth-login', 'post', '/auth/login/', False, {'username': '{username}', 'password': '{password}'}),
+]
+
+
+@contextmanager
+def benchmark_user():
+    """
+    A throwaway user for the authenticated endpoints and the login, with a
+    random name and password, deleted (with its token) on exit. Yields
+    (username, password, token).
+    """
+    username = f'{BENCHMARK_USERNAME}-{secrets.token_hex(4)}'
+    password = secrets.token_urlsafe(16)
+    user = User.objects.create_user(username=username, password=password)
+    try:
+        yield username, password, Token.objects.create(user=user).key
+    finally:
+        user.delete()
+
+
+def prepare(names=None, username='', password=''):
+    """
+    Pick the endpoints to run and fill in their paths with the hottest post
+    and tutorial of the dataset, and the login with the given credentials.
+    Returns the endpoints.
+    """
+    from ai_tutorial.models import Tutorial
+    from blog.models import Category, Post
+
+    post = Post.objects.filter(status='published').order_by('-views_count', 'id').values_list('slug', flat=True).first()
+    tutorial = Tutorial.objects.order_by('-id').values_list('id', flat=True).first()
+    category = Category.objects.order_by('id').values_list('id', flat=True).first()
+    values = {'post': post, 'tutorial': tutorial, 'category': category}
+
+    endpoints = []
+    for name, method, path, authenticated, body in ENDPOINTS:
+        if names and name not in names:
+            continue
+        needed = [key for key in values if f'{{{key}}}' in path]
+        if any(values[key] is None for key in needed):
+            # Nothing to point the endpoint at in an empty dataset
+            continue
+        if body is not None:
+            body = {key: value.format(username=username, password=password) for key, value in body.items()}
+        endpoints.append((name, method, path.format(**values), authenticated, body))
+    return endpoints
+
+
+class InProcessClient:
+    """Requests through the Django test client, counting queries"""
+    mode = 'in-process'
+
+    def __init__(self, token, cold_cache=False):
+        self.token = token
+        self.cold_cache = cold_cache
+
+    def request(self, method, path, authenticated, body):
+        client = Client()
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token}'} if authenticated else {}
+        if self.cold_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if body is None:
+                response = getattr(client, method)(path, **headers)
+            else:
+                response = getattr(client, method)(path, body, content_type='application/json', **headers)
+            content = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(content), len(queries.captured_queries)
+
+
+class LiveClient:
+    """Requests over HTTP to a running server; queries are not visible from here"""
+    mode = 'live'
+
+    def __init__(self, base_url, token):
+        import requests
+
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.session = requests.Session()
+
+    def request(self, method, path, authenticated, body):
+        headers = {'Authorization': f'Token {self.token}'} if authenticated else {}
+        started = time.perf_counter()
+        response = self.session.request(method, self.base_url + path, json=body, headers=headers)
+        content = response.content
+        elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(content), None
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values``"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def run_endpoint(client, endpoint, iterations, warmup=0, concurrency=1):
+    """Time ``iterations`` requests to one endpoint after ``warmup`` untimed ones"""
+    _, method, path, authenticated, body = endpoint
+    for _ in range(warmup):
+        client.request(method, path, authenticated, body)
+
+    def call(_):
+        return client.request(method, path, authenticated, body)
+
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(call, range(iterations)))
+    else:
+        samples = [call(i) for i in range(iterations)]
+
+    latencies = [elapsed * 1000 for _, elapsed, _, _ in samples]
+    queries = [count for _, _, _, count in samples if count is not None]
+    return {
+        'p50_ms': round(percentile(latencies, 0.5), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'queries': max(queries) if queries else None,
+        'bytes': max(size for _, _, size, _ in samples),
+        'errors': sum(1 for status, _, _, _ in samples if status >= 400),
+    }
+
+
+def compare(results, baseline, tolerance=0.25, noise_ms=1.0):
+    """
+    Regressions of ``results`` against ``baseline``: any extra query,
+    responses more than ``tolerance`` larger, or a p95 more than
+    ``tolerance`` and ``noise_ms`` slower. Returns messages, empty if none.
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        if current['queries'] is not None and previous.get('queries') is not None and current['queries'] > previous['queries']:
+            regressions.append(f"{key}: {current['queries']} queries, baseline {previous['queries']}")
+        if current['bytes'] > previous['bytes'] * (1 + tolerance):
+            regressions.append(f"{key}: {current['bytes']} bytes, baseline {previous['bytes']}")
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance) and current['p95_ms'] - previous['p95_ms'] > noise_ms:
+            regressions.append(f"{key}: p95 {current['p95_ms']}ms, baseline {previous['p95_ms']}ms")
+        if current['errors'] > previous.get('errors', 0):
+            regressions.append(f"{key}: {current['errors']} failed requests, baseline {previous.get('errors', 0)}")
+    return regressions
+
+
+def load_baseline(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, baseline):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
@@ -1,9 +1,13 @@
 import os
+import logging
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
+logger = logging.getLogger(__name__)
+
 app = Celery('backend')
 
 # Using a string here means the worker doesn't have to serialize
@@ -13,6 +17,22 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+
+@worker_process_init.connect
+def warm_ml_models(**kwargs):
+    """
+    Load the tutorial generator once in every worker process so tasks
+    reuse warm models instead of loading them per task.
+    """
+    try:
+        from ai_tutorial.services import warm_tutorial_generator
+        warm_tutorial_generator()
+        logger.info(f"Tutorial generator warmed up in worker process {os.getpid()}")
+    except Exception as e:
+        # Tasks will still load the generator lazily on first use
+        logger.error(f"Could not warm up tutorial generator: {e}")
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
@@ -0,0 +1,59 @@
+import functools
+import hashlib
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    """
+    Weak ETag over the given version parts. Weak because counters that
+    change on every read (views_count) are deliberately left out.
+    """
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def conditional_detail(validators, on_not_modified=None):
+    """
+    Conditional GET and HEAD for a detail action.
+
+    ``validators(view, request, *args, **kwargs)`` cheaply computes
+    ``(etag, last_modified)`` for the object (one small query, no
+    serialization), or returns None if the object doesn't exist. Requests
+    whose If-None-Match / If-Modified-Since still match get a 304 before
+    the action runs; other responses get ETag and Last-Modified headers.
+    ``on_not_modified(view, request)`` runs for every 304.
+    """
+    def decorator(action):
+        @functools.wraps(action)
+        def wrapper(view, request, *args, **kwargs):
+            current = validators(view, request, *args, **kwargs) if request.method in ('GET', 'HEAD') else None
+            if current is None:
+                return action(view, request, *args, **kwargs)
+
+            etag, last_modified = current
+            headers = HttpResponse()
+            headers['ETag'] = etag
+            if last_modified is not None:
+                headers['Last-Modified'] = http_date(last_modified.timestamp())
+            conditional = get_conditional_response(
+                request,
+                etag=etag,
+                last_modified=int(last_modified.timestamp()) if last_modified else None,
+                response=headers,
+            )
+            if conditional is not headers:
+                if conditional.status_code == 304 and on_not_modified:
+                    on_not_modified(view, request)
+                return conditional
+
+            response = action(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = headers['Last-Modified']
+            return response
+        return wrapper
+    return decorator
@@ -77,6 +77,17 @@ def health_check(request):
         health_data["services"]["static_files"] = "unhealthy"
         logger.error(f"Static files health check failed: {e}")
     
+    # Per-process metrics
+    try:
+        from blog.view_counter import view_counter
+        from blog.response_cache import stats as response_cache_stats
+        health_data["metrics"] = {
+            "view_counter": view_counter.metrics(),
+            "response_cache": response_cache_stats.metrics(),
+        }
+    except Exception as e:
+        logger.error(f"Collecting metrics failed: {e}")
+    
     # Overall status
     if health_data["status"] == "healthy":
         status_code = 200
@@ -0,0 +1,158 @@
+import json
+import time
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+CONTENT_TYPE = 'application/x-ndjson'
+
+
+def dump_lines(records):
+    """Encode records as NDJSON lines, one at a time"""
+    for record in records:
+        yield json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def write_lines(records, path, stdout):
+    """Write records as NDJSON to ``path``, or ``stdout`` for "-". Returns the row count."""
+    rows = 0
+    if path == '-':
+        for line in dump_lines(records):
+            stdout.write(line, ending='')
+            rows += 1
+        return rows
+    with open(path, 'w', encoding='utf-8') as output:
+        for line in dump_lines(records):
+            output.write(line)
+            rows += 1
+    return rows
+
+
+def streaming_response(records, filename):
+    """Stream records as an NDJSON download without building it in memory"""
+    response = StreamingHttpResponse(dump_lines(records), content_type=CONTENT_TYPE)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def load_lines(lines):
+    """
+    Decode NDJSON lines (str or bytes), skipping blank ones. Raises
+    ValueError naming the line number of the first malformed record.
+    """
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number}: {e.msg}")
+        if not isinstance(record, dict):
+            raise ValueError(f"Line {number}: expected a JSON object")
+        yield record
+
+
+FIELD_TYPES = {str: 'a string', int: 'an integer', bool: 'true or false', list: 'a list', dict: 'an object'}
+
+
+def check_fields(record, fields, label):
+    """
+    Raise ValueError, prefixed with ``label``, unless ``record`` is an object
+    whose fields have the types in ``fields`` (name -> type). Missing and
+    null fields are left to the caller.
+    """
+    if not isinstance(record, dict):
+        raise ValueError(f"{label}: expected a JSON object")
+    for name, expected in fields.items():
+        value = record.get(name)
+        if value is None:
+            continue
+        # bool is a subclass of int, but true is not a count or an id
+        if not isinstance(value, expected) or (isinstance(value, bool) and expected is not bool):
+            raise ValueError(f"{label}: {name} must be {FIELD_TYPES[expected]}")
+
+
+def check_lengths(values, model, label):
+    """
+    Raise ValueError, prefixed with ``label``, when a string in ``values``
+    (field name -> value) is longer than the ``max_length`` of that field of
+    ``model``, which the database would reject
+    """
+    for name, value in values.items():
+        max_length = model._meta.get_field(name).max_length
+        if isinstance(value, str) and max_length and len(value) > max_length:
+            raise ValueError(f"{label}: {name} is longer than {max_length} characters")
+
+
+def parse_timestamp(value):
+    """Aware datetime from an exported ISO timestamp, or None"""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"Invalid timestamp: {value}")
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def resolve_names(model, names):
+    """
+    Map names to rows of ``model`` (unique ``name`` field), creating the
+    missing ones, with two queries plus one insert whatever the count
+    """
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    found = model.objects.in_bulk(names, field_name='name')
+    missing = names - set(found)
+    if missing:
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        found.update(model.objects.in_bulk(missing, field_name='name'))
+    return found
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ImportReport:
+    """Counts and throughput of a bulk import"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+
+    @property
+    def seconds(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_sec(self):
+        seconds = self.seconds
+        return self.rows / seconds if seconds else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'skipped': self.skipped,
+            'seconds': round(self.seconds, 3),
+            'rows_per_sec': round(self.rows_per_sec, 1),
+        }
+
+    def __str__(self):
+        return (
+            f"{self.rows} rows ({self.created} created, {self.skipped} skipped) "
+            f"in {self.seconds:.1f}s, {self.rows_per_sec:.0f} rows/s"
+        )
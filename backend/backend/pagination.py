@@ -0,0 +1,161 @@
+import base64
+import json
+import logging
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+logger = logging.getLogger(__name__)
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset ("seek") pagination for infinite-scroll feeds.
+
+    Pages are ordered by the queryset's first ordering term (as chosen by
+    OrderingFilter) with the primary key as tiebreaker, and each page
+    continues strictly after the last row of the previous one. The seek
+    condition leads with ``field <= value`` (``>=`` ascending), and NOT NULL
+    fields are ordered plainly, so a (field, id) index serves each page as a
+    range scan of page_size + 1 rows, however deep the client scrolls. No
+    COUNT(*) is run. NULLs of nullable fields sort last in both directions.
+
+    ``?count=true`` opts into an approximate total: the planner's row
+    estimate on Postgres, an exact count capped at ``count_cap`` elsewhere.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    count_cap = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset)
+        self.nullable = self._is_nullable(queryset.model, self.field)
+
+        direction = '-' if self.descending else ''
+        if self.nullable:
+            order_field = F(self.field).desc(nulls_last=True) if self.descending else F(self.field).asc(nulls_last=True)
+        else:
+            # Matches the plain (field, id) indexes, which NULLS LAST would not
+            order_field = f'{direction}{self.field}'
+        queryset = queryset.order_by(order_field, f'{direction}pk')
+
+        self.count = None
+        if self._wants_count(request):
+            self.count = self.approximate_count(queryset)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            queryset = queryset.filter(self.after(self.decode_cursor(encoded)))
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """(field name, descending) of the first ordering term, defaulting to the primary key"""
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        first = ordering[0] if ordering else '-pk'
+        if not isinstance(first, str):
+            first = '-pk'
+        return first.lstrip('-'), first.startswith('-')
+
+    def _is_nullable(self, model, field):
+        try:
+            return model._meta.get_field(field).null
+        except FieldDoesNotExist:
+            return False
+
+    def after(self, position):
+        """Filter for rows strictly after ``position`` in the page ordering"""
+        value, pk = position['v'], position['pk']
+        beyond = '__lt' if self.descending else '__gt'
+        if value is None:
+            # Inside the trailing NULL block, only the primary key moves on
+            return Q(**{f'{self.field}__isnull': True, f'pk{beyond}': pk})
+        # The leading bound is a range condition on the index; the OR only
+        # tells apart the rows tied on the boundary value
+        condition = Q(**{f'{self.field}{beyond}e': value}) & (
+            Q(**{f'{self.field}{beyond}': value}) | Q(**{f'pk{beyond}': pk})
+        )
+        if self.nullable:
+            condition |= Q(**{f'{self.field}__isnull': True})
+        return condition
+
+    def encode_cursor(self, row):
+        value = getattr(row, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        position = {'o': self.ordering_key(), 'v': value, 'pk': row.pk}
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            assert position['o'] == self.ordering_key()
+            return position
+        except (ValueError, KeyError, TypeError, AssertionError, UnicodeDecodeError):
+            # Also raised when the ordering changed since the cursor was issued
+            raise NotFound(self.invalid_cursor_message)
+
+    def ordering_key(self):
+        return f"{'-' if self.descending else ''}{self.field}"
+
+    def _wants_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def approximate_count(self, queryset):
+        """Return (count, is_exact) without scanning the whole result set"""
+        queryset = queryset.order_by()
+        if connections[queryset.db].vendor == 'postgresql':
+            try:
+                plan = json.loads(queryset.explain(format='json'))
+                return int(plan[0]['Plan']['Plan Rows']), False
+            except Exception as e:
+                logger.error(f"Error estimating row count: {str(e)}")
+        count = queryset.values('pk')[:self.count_cap + 1].count()
+        return min(count, self.count_cap), count <= self.count_cap
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.count_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        response = {'next': self.get_next_link(), 'results': data}
+        if self.count is not None:
+            response['count'], response['count_is_exact'] = self.count
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer'},
+                'count_is_exact': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
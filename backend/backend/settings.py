@@ -111,6 +111,9 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Switches off background threads under `manage.py test` (backend/test_runner.py)
+TEST_RUNNER = 'backend.test_runner.TestRunner'
+
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -127,6 +130,74 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Caching: Redis when CACHE_URL is set (e.g. redis://localhost:6379/1),
+# otherwise a per-process in-memory cache. Set it whenever more than one
+# process serves or changes data (several gunicorn workers, or the Celery
+# worker): the response cache is invalidated through the cache, and with
+# the in-memory one other processes keep serving stale responses.
+CACHE_URL = os.getenv('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'logblog',
+        }
+    }
+
+# Cached anonymous responses for public blog endpoints (blog/response_cache.py)
+BLOG_RESPONSE_CACHE = os.getenv('BLOG_RESPONSE_CACHE', 'True').lower() == 'true'
+BLOG_RESPONSE_CACHE_TIMEOUT = int(os.getenv('BLOG_RESPONSE_CACHE_TIMEOUT', '60'))
+BLOG_RESPONSE_CACHE_LOCK_TIMEOUT = int(os.getenv('BLOG_RESPONSE_CACHE_LOCK_TIMEOUT', '10'))
+BLOG_RESPONSE_CACHE_LOCK_WAIT = float(os.getenv('BLOG_RESPONSE_CACHE_LOCK_WAIT', '1'))
+# Tag and category lists are also kept in process memory, checked against the shared versions
+BLOG_LOCAL_SNAPSHOT_MAX_ENTRIES = int(os.getenv('BLOG_LOCAL_SNAPSHOT_MAX_ENTRIES', '64'))
+
+# Comment threads on post detail: top-level threads per page, replies shown
+# per comment and reply levels expanded (clients can ask for up to the max)
+BLOG_COMMENT_THREADS_PAGE_SIZE = int(os.getenv('BLOG_COMMENT_THREADS_PAGE_SIZE', '20'))
+BLOG_COMMENT_REPLIES_PAGE_SIZE = int(os.getenv('BLOG_COMMENT_REPLIES_PAGE_SIZE', '5'))
+BLOG_COMMENT_REPLY_DEPTH = int(os.getenv('BLOG_COMMENT_REPLY_DEPTH', '2'))
+BLOG_COMMENT_MAX_REPLY_DEPTH = int(os.getenv('BLOG_COMMENT_MAX_REPLY_DEPTH', '5'))
+
+# Post views are deduplicated in memory and written in batches by a
+# background flusher instead of in the request path
+BLOG_VIEW_BUFFERING = os.getenv('BLOG_VIEW_BUFFERING', 'True').lower() == 'true'
+BLOG_VIEW_FLUSH_INTERVAL = float(os.getenv('BLOG_VIEW_FLUSH_INTERVAL', '5'))
+BLOG_VIEW_DEDUPE_SIZE = int(os.getenv('BLOG_VIEW_DEDUPE_SIZE', '100000'))
+# Raw views are rolled up into daily counts (blog/rollups.py) and deleted
+# once they are older than the retention window
+BLOG_VIEW_RETENTION_DAYS = int(os.getenv('BLOG_VIEW_RETENTION_DAYS', '30'))
+BLOG_VIEW_PRUNE_BATCH_SIZE = int(os.getenv('BLOG_VIEW_PRUNE_BATCH_SIZE', '5000'))
+
+# Like counts are kept in sharded counter rows per post (blog/likes.py)
+BLOG_LIKE_COUNTER_SHARDS = int(os.getenv('BLOG_LIKE_COUNTER_SHARDS', '8'))
+BLOG_LIKE_COUNT_CACHE_TIMEOUT = int(os.getenv('BLOG_LIKE_COUNT_CACHE_TIMEOUT', '300'))
+
+# Post popularity: engagement weights decay with this half-life; the
+# rescale job keeps stored scores in range (blog/popularity.py)
+BLOG_POPULARITY_HALF_LIFE_HOURS = float(os.getenv('BLOG_POPULARITY_HALF_LIFE_HOURS', '48'))
+BLOG_POPULARITY_VIEW_WEIGHT = float(os.getenv('BLOG_POPULARITY_VIEW_WEIGHT', '1'))
+BLOG_POPULARITY_LIKE_WEIGHT = float(os.getenv('BLOG_POPULARITY_LIKE_WEIGHT', '2'))
+BLOG_POPULARITY_COMMENT_WEIGHT = float(os.getenv('BLOG_POPULARITY_COMMENT_WEIGHT', '3'))
+
+# Post content is rendered to HTML on save, or by the render_posts job for
+# posts longer than this (blog/rendering.py)
+BLOG_RENDER_SYNC_MAX_CHARS = int(os.getenv('BLOG_RENDER_SYNC_MAX_CHARS', '50000'))
+BLOG_RENDER_CACHE_TIMEOUT = int(os.getenv('BLOG_RENDER_CACHE_TIMEOUT', '86400'))
+
+# Featured images are resized to these widths and formats, without
+# metadata, by the process_images job (blog/images.py)
+BLOG_IMAGE_WIDTHS = [int(width) for width in os.getenv('BLOG_IMAGE_WIDTHS', '320,640,960,1280').split(',')]
+BLOG_IMAGE_FORMATS = [fmt.strip() for fmt in os.getenv('BLOG_IMAGE_FORMATS', 'webp,jpeg').split(',')]
+BLOG_IMAGE_QUALITY = int(os.getenv('BLOG_IMAGE_QUALITY', '80'))
+
 # CORS Configuration - Allow all origins (NOT RECOMMENDED for production)
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
@@ -156,6 +227,79 @@ USE_ML_GENERATOR = os.getenv('USE_ML_GENERATOR', 'True').lower() == 'true'
 ML_MODEL_PATH = os.getenv('ML_MODEL_PATH', os.path.join(BASE_DIR, 'ai_tutorial', 'models'))
 ML_DEVICE = os.getenv('ML_DEVICE', 'auto')  # 'auto', 'cpu', 'cuda'
 
+# Static embedding fast mode: match topics with a precomputed token table
+# instead of a transformer forward pass (build it with build_static_embeddings)
+ML_STATIC_EMBEDDINGS = os.getenv('ML_STATIC_EMBEDDINGS', 'False').lower() == 'true'
+ML_STATIC_EMBEDDINGS_PATH = os.getenv(
+    'ML_STATIC_EMBEDDINGS_PATH', os.path.join(ML_MODEL_PATH, 'static_embeddings')
+)
+
+# Request deadlines for AI tutorial generation (seconds). Keep these well
+# below the Gunicorn worker timeout so requests fail cleanly instead of
+# getting the worker killed.
+AI_TUTORIAL_GENERATION_TIMEOUT = int(os.getenv('AI_TUTORIAL_GENERATION_TIMEOUT', '60'))
+AI_TUTORIAL_SUGGESTIONS_TIMEOUT = int(os.getenv('AI_TUTORIAL_SUGGESTIONS_TIMEOUT', '10'))
+
+# On-disk embedding stores (see ai_tutorial/vector_store.py)
+EMBEDDINGS_PATH = os.getenv('EMBEDDINGS_PATH', os.path.join(BASE_DIR, 'embeddings'))
+
+# Number of pending tutorial requests generated together by the batching task,
+# and the time budget of one batch (seconds)
+AI_TUTORIAL_BATCH_SIZE = int(os.getenv('AI_TUTORIAL_BATCH_SIZE', '8'))
+AI_TUTORIAL_BATCH_TIMEOUT = int(os.getenv('AI_TUTORIAL_BATCH_TIMEOUT', '120'))
+
+# Celery Configuration
+# The beat schedule below needs one worker running the scheduler (the
+# `worker` service in railway.toml):
+#   celery -A backend worker --beat --queues celery,ml --concurrency 2
+# ML tasks go to a dedicated queue so a worker can be started just for them:
+#   celery -A backend worker -Q ml --concurrency=2
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+CELERY_TASK_ROUTES = {
+    'ai_tutorial.tasks.*': {'queue': 'ml'},
+    'blog.tasks.index_posts_task': {'queue': 'ml'},
+}
+# Generation jobs are long, so workers only reserve one task at a time
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.getenv('CELERY_WORKER_PREFETCH_MULTIPLIER', '1'))
+CELERY_BEAT_SCHEDULE = {
+    'generate-pending-tutorials': {
+        'task': 'ai_tutorial.tasks.generate_pending_tutorials_task',
+        'schedule': float(os.getenv('AI_TUTORIAL_BATCH_INTERVAL', '30')),
+    },
+    'rollup-post-views': {
+        'task': 'blog.tasks.rollup_post_views_task',
+        'schedule': float(os.getenv('BLOG_VIEW_ROLLUP_INTERVAL', '300')),
+    },
+    # Also syncs Post.likes_count, which "Most Liked" orders by, from the likes
+    'reconcile-like-counts': {
+        'task': 'blog.tasks.reconcile_like_counts_task',
+        'schedule': float(os.getenv('BLOG_LIKE_RECONCILE_INTERVAL', '600')),
+    },
+    'reconcile-comment-counts': {
+        'task': 'blog.tasks.reconcile_comment_counts_task',
+        'schedule': float(os.getenv('BLOG_COMMENT_RECONCILE_INTERVAL', '3600')),
+    },
+    'render-posts': {
+        'task': 'blog.tasks.render_posts_task',
+        'schedule': float(os.getenv('BLOG_RENDER_INTERVAL', '60')),
+    },
+    # Saving a post only marks its embedding stale; this re-embeds it so
+    # /blog/api/posts/semantic_search/ stays current
+    'index-posts': {
+        'task': 'blog.tasks.index_posts_task',
+        'schedule': float(os.getenv('BLOG_EMBEDDING_INTERVAL', '60')),
+    },
+    'process-images': {
+        'task': 'blog.tasks.process_images_task',
+        'schedule': float(os.getenv('BLOG_IMAGE_INTERVAL', '60')),
+    },
+    'rescale-popularity': {
+        'task': 'blog.tasks.rescale_popularity_task',
+        'schedule': float(os.getenv('BLOG_POPULARITY_RESCALE_INTERVAL', '86400')),
+    },
+}
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
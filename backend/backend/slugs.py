@@ -0,0 +1,79 @@
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Length
+from django.utils.text import slugify
+
+# Room kept at the end of a slug for a "-<counter>" suffix
+SUFFIX_ROOM = 11
+# Counters considered: no leading zeros, so a longer slug has the larger
+# counter, and short enough that the next one still fits in SUFFIX_ROOM
+COUNTER = r'-[1-9][0-9]{0,8}'
+
+
+def _base_slug(queryset, value, field):
+    max_length = queryset.model._meta.get_field(field).max_length
+    base = slugify(value)[:max_length - SUFFIX_ROOM].strip('-')
+    return base or queryset.model._meta.model_name
+
+
+def _pattern(base):
+    return rf'^{re.escape(base)}({COUNTER})?$'
+
+
+def slug_fits(queryset, slug, value, field='slug'):
+    """Whether ``slug`` is ``value``'s slug or one with a counter suffix, so a rename can keep it"""
+    return re.match(_pattern(_base_slug(queryset, value, field)), slug or '') is not None
+
+
+def unique_slug(queryset, value, field='slug', exclude=None):
+    """
+    Free slug for ``value`` in ``queryset``: the slugified value, or the
+    slug with the next counter suffix ("python-guide-12") if taken.
+
+    One query whatever the number of existing duplicates: a prefix range
+    scan of the slug's unique index, narrowed to ``base`` and ``base-<n>``,
+    returning only the highest one. Counters have no leading zeros, so a
+    longer slug always has the larger counter and ordering by length then
+    value finds it.
+    ``exclude`` is the primary key of the row being renamed.
+    """
+    base = _base_slug(queryset, value, field)
+    candidates = queryset.filter(**{
+        f'{field}__startswith': base,
+        f'{field}__regex': _pattern(base),
+    })
+    if exclude is not None:
+        candidates = candidates.exclude(pk=exclude)
+    highest = (
+        candidates.annotate(slug_length=Length(field))
+        .order_by('-slug_length', f'-{field}')
+        .values_list(field, flat=True)
+        .first()
+    )
+    if highest is None:
+        return base
+    if highest == base:
+        return f'{base}-1'
+    return f'{base}-{int(highest.rsplit("-", 1)[1]) + 1}'
+
+
+def save_with_unique_slug(save, queryset, value, field='slug', exclude=None, attempts=5):
+    """
+    Call ``save(slug)`` with a free slug for ``value``, returning its result.
+
+    Two concurrent requests can pick the same slug; the loser's insert hits
+    the unique constraint and is retried with the next free slug. Other
+    integrity errors are raised as they are.
+    """
+    for attempt in range(attempts):
+        slug = unique_slug(queryset, value, field=field, exclude=exclude)
+        try:
+            with transaction.atomic():
+                return save(slug)
+        except IntegrityError:
+            taken = queryset.filter(**{field: slug})
+            if exclude is not None:
+                taken = taken.exclude(pk=exclude)
+            if attempt == attempts - 1 or not taken.exists():
+                raise
@@ -0,0 +1,141 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _param_list(request, name):
+    values = request.query_params.get(name, '')
+    return {value.strip() for value in values.split(',') if value.strip()}
+
+
+def requested_fields(request):
+    """
+    (fields, expand) asked for with ``?fields=id,title,author&expand=author``,
+    or None when the client didn't ask for a sparse response
+    """
+    if request is None or not request.query_params.get(FIELDS_PARAM):
+        return None
+    return _param_list(request, FIELDS_PARAM), _param_list(request, EXPAND_PARAM)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for sparse fieldsets.
+
+    With ``?fields=`` only the listed fields are rendered. Nested relations
+    named in ``collapsed_fields`` are rendered as primary keys unless they are
+    also listed in ``?expand=``. Without ``?fields=`` the serializer renders
+    everything, expanded, as before. Only applies to the top-level serializer;
+    unknown names are ignored here and rejected by SparseFieldsetViewMixin.
+
+    ``field_requirements`` names the model fields and relations a method
+    field reads, so ``sparse_queryset`` knows which columns and prefetches to
+    keep; other fields are mapped through their ``source``.
+    """
+    collapsed_fields = {}
+    field_requirements = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selection = requested_fields(self.context.get('request'))
+        if selection is None or self.parent is not None:
+            return
+
+        fields, expand = selection
+        for name in list(self.fields):
+            if name not in fields:
+                self.fields.pop(name)
+            elif name in self.collapsed_fields and name not in expand:
+                self.fields[name] = self.collapsed_fields[name]()
+
+
+def pk_field(many=False):
+    """Factory for ``collapsed_fields``: the related object's primary key"""
+    return lambda: serializers.PrimaryKeyRelatedField(many=many, read_only=True)
+
+
+def sparse_queryset(queryset, serializer_class, request, required=()):
+    """
+    Narrow ``queryset`` to what the requested sparse fieldset reads: the
+    columns of the selected fields plus the primary key, ordering and
+    ``required`` columns, select_related and prefetches only for selected
+    relations, and primary-key-only prefetches for collapsed to-many
+    relations.
+    """
+    selection = requested_fields(request)
+    if selection is None or not issubclass(serializer_class, SparseFieldsetMixin):
+        return queryset
+
+    fields, expand = selection
+    model = queryset.model
+    serializer = serializer_class(context={'request': request})
+    columns = {model._meta.pk.name, *required}
+    relations = set()
+    collapsed = set()
+    for name, field in serializer.fields.items():
+        sources = serializer_class.field_requirements.get(name, [field.source])
+        for source in sources:
+            try:
+                model_field = model._meta.get_field(source.split('.')[0])
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                columns.add(model_field.name)
+            if model_field.is_relation:
+                if name in serializer_class.collapsed_fields and name not in expand:
+                    collapsed.add(model_field.name)
+                else:
+                    relations.add(model_field.name)
+
+    ordering = list(queryset.query.order_by) or list(model._meta.ordering)
+    for term in ordering:
+        if isinstance(term, str):
+            try:
+                columns.add(model._meta.get_field(term.lstrip('-')).name)
+            except FieldDoesNotExist:
+                pass
+
+    select_related = queryset.query.select_related
+    kept_joins = [name for name in select_related if name in relations] if isinstance(select_related, dict) else []
+    kept_prefetches = [
+        lookup for lookup in queryset._prefetch_related_lookups
+        if (lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup).split('__')[0] in relations
+    ]
+    for name in collapsed:
+        model_field = model._meta.get_field(name)
+        if model_field.many_to_many or model_field.one_to_many:
+            kept_prefetches.append(Prefetch(name, queryset=model_field.related_model.objects.only('pk')))
+
+    queryset = queryset.select_related(None)
+    if kept_joins:
+        queryset = queryset.select_related(*kept_joins)
+    return queryset.prefetch_related(None).prefetch_related(*kept_prefetches).only(*columns)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Viewset mixin rejecting ``?fields=`` names the action's serializer
+    doesn't have with a 400, and applying ``sparse_queryset`` to the filtered
+    queryset. ``sparse_required_fields`` are model fields the view itself reads.
+    """
+    sparse_required_fields = []
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        selection = requested_fields(request)
+        serializer_class = self.get_serializer_class()
+        if selection is None or not issubclass(serializer_class, SparseFieldsetMixin):
+            return
+        # Without a request in its context the serializer keeps every field
+        unknown = selection[0] - set(serializer_class().fields)
+        if unknown:
+            raise serializers.ValidationError({FIELDS_PARAM: [f"Unknown fields: {', '.join(sorted(unknown))}"]})
+
+    def filter_queryset(self, queryset):
+        return self.sparse_queryset(super().filter_queryset(queryset))
+
+    def sparse_queryset(self, queryset):
+        return sparse_queryset(queryset, self.get_serializer_class(), self.request, self.sparse_required_fields)
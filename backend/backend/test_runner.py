@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner with the background machinery of the web process off: no
+    view counter flusher thread writing to the test database behind the
+    tests' backs (tests flush the counter themselves).
+    """
+    test_settings = {
+        'BLOG_VIEW_FLUSH_INTERVAL': 0,
+    }
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_settings = override_settings(**self.test_settings)
+        self._test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+class CacheClearingTestCase(TestCase):
+    """
+    TestCase starting every test with an empty cache, so cached responses,
+    response cache versions and like counters don't leak between tests
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
@@ -1,45 +1,37 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Tag, Post, Comment, PostLike, PostView
+from .models import Category, Tag, Post, Comment, PostLike, PostView, PostViewDaily, PostLikeCounter
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'posts_count', 'created_at']
     search_fields = ['name', 'description']
-    readonly_fields = ['created_at']
-    
-    def posts_count(self, obj):
-        return obj.posts.count()
-    posts_count.short_description = 'Posts Count'
+    readonly_fields = ['posts_count', 'created_at']
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ['name', 'posts_count', 'created_at']
     search_fields = ['name']
-    readonly_fields = ['created_at']
-    
-    def posts_count(self, obj):
-        return obj.posts.count()
-    posts_count.short_description = 'Posts Count'
+    readonly_fields = ['posts_count', 'created_at']
 
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
-    list_display = ['title', 'author', 'category', 'status', 'is_featured', 'views_count', 'likes_count', 'created_at']
+    list_display = ['title', 'author', 'category', 'status', 'is_featured', 'views_count', 'likes_count', 'comments_count', 'created_at']
     list_filter = ['status', 'is_featured', 'category', 'created_at']
     search_fields = ['title', 'content', 'excerpt']
     prepopulated_fields = {'slug': ('title',)}
     filter_horizontal = ['tags']
-    readonly_fields = ['views_count', 'likes_count', 'created_at', 'updated_at', 'reading_time']
+    readonly_fields = ['views_count', 'likes_count', 'comments_count', 'created_at', 'updated_at', 'word_count', 'reading_time', 'image_hash', 'image_renditions']
     
     fieldsets = (
         ('Basic Information', {
             'fields': ('title', 'slug', 'author', 'excerpt')
         }),
         ('Content', {
-            'fields': ('content', 'featured_image')
+            'fields': ('content', 'featured_image', 'image_hash', 'image_renditions')
         }),
         ('Categorization', {
             'fields': ('category', 'tags')
@@ -48,7 +40,7 @@ class PostAdmin(admin.ModelAdmin):
             'fields': ('status', 'is_featured')
         }),
         ('Statistics', {
-            'fields': ('views_count', 'likes_count', 'reading_time'),
+            'fields': ('views_count', 'likes_count', 'comments_count', 'word_count', 'reading_time'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -90,7 +82,22 @@ class PostLikeAdmin(admin.ModelAdmin):
 
 @admin.register(PostView)
 class PostViewAdmin(admin.ModelAdmin):
-    list_display = ['post', 'user', 'ip_address', 'created_at']
-    list_filter = ['created_at']
+    list_display = ['post', 'user', 'ip_address', 'viewed_on', 'created_at']
+    list_filter = ['viewed_on']
     search_fields = ['post__title', 'user__username', 'ip_address']
     readonly_fields = ['created_at']
+
+
+@admin.register(PostViewDaily)
+class PostViewDailyAdmin(admin.ModelAdmin):
+    list_display = ['post', 'date', 'views', 'updated_at']
+    list_filter = ['date']
+    search_fields = ['post__title']
+    readonly_fields = ['post', 'date', 'views', 'visitors_sketch', 'updated_at']
+
+
+@admin.register(PostLikeCounter)
+class PostLikeCounterAdmin(admin.ModelAdmin):
+    list_display = ['post', 'shard', 'count']
+    search_fields = ['post__title']
+    readonly_fields = ['post', 'shard', 'count']
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def ensure_search_triggers(sender, using='default', **kwargs):
+    """Restore SQLite full-text triggers dropped by migrations that rebuild blog_post"""
+    from .search import install_sqlite_triggers
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        install_sqlite_triggers(connection)
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(ensure_search_triggers, sender=self)
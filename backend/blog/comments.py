@@ -0,0 +1,154 @@
+import base64
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils.dateparse import parse_datetime
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+
+def load_comment_tree(post):
+    """
+    Load every approved comment of ``post`` in one query and link them into
+    threads in memory.
+
+    Returns the top-level comments (oldest first) and a dict of all loaded
+    comments by id. Each comment gets a ``children`` list; replies to
+    unapproved comments are dropped along with their parent, as before.
+    """
+    comments = list(
+        Comment.objects.filter(post=post, is_approved=True)
+        .select_related('author')
+        .order_by('created_at', 'id')
+    )
+    by_id = {comment.id: comment for comment in comments}
+    roots = []
+    for comment in comments:
+        comment.children = []
+    for comment in comments:
+        if comment.parent_id is None:
+            roots.append(comment)
+        elif comment.parent_id in by_id:
+            by_id[comment.parent_id].children.append(comment)
+    return roots, by_id
+
+
+def encode_cursor(comment):
+    raw = f"{comment.created_at.isoformat()}|{comment.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) position encoded in ``cursor`` or None if invalid"""
+    try:
+        created_at, comment_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        position = (parse_datetime(created_at), int(comment_id))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return position if position[0] is not None else None
+
+
+def paginate(comments, cursor=None, limit=None):
+    """
+    Slice a list of sibling comments (ordered by created_at, id) after the
+    position in ``cursor``. Returns the page and the cursor for the next one.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        comments = [c for c in comments if (c.created_at, c.id) > position]
+    page = comments[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(comments) > len(page) else None
+    return page, next_cursor
+
+
+def prune_replies(comments, depth):
+    """
+    Attach at most one page of replies to each comment, ``depth`` levels
+    down, so serialized threads have a bounded size. Comments whose replies
+    were cut off are flagged so clients can call the replies endpoint.
+    """
+    replies_page_size = settings.BLOG_COMMENT_REPLIES_PAGE_SIZE
+    for comment in comments:
+        comment.replies_count = len(comment.children)
+        if depth > 0:
+            comment.thread_replies, comment.replies_cursor = paginate(
+                comment.children, limit=replies_page_size
+            )
+            prune_replies(comment.thread_replies, depth - 1)
+        else:
+            # No cursor: the replies endpoint starts from the first reply
+            comment.thread_replies, comment.replies_cursor = [], None
+        comment.has_more_replies = len(comment.thread_replies) < comment.replies_count
+    return comments
+
+
+def reply_depth(request):
+    """Reply depth requested with ``?depth=``, clamped to the configured maximum"""
+    default = settings.BLOG_COMMENT_REPLY_DEPTH
+    try:
+        depth = int(request.query_params.get('depth', default))
+    except (TypeError, ValueError):
+        depth = default
+    return min(max(depth, 0), settings.BLOG_COMMENT_MAX_REPLY_DEPTH)
+
+
+def next_page_url(request, cursor, url=None):
+    """URL for the page after ``cursor`` (defaults to the current URL)"""
+    if cursor is None:
+        return None
+    return replace_query_param(url or request.build_absolute_uri(), 'cursor', cursor)
+
+
+def change_comments_count(post_id, delta):
+    """
+    Move the post's stored approved comment count by ``delta``, in the
+    caller's transaction. Never goes below zero; drift is left to
+    ``reconcile_comment_counts``.
+    """
+    if post_id and delta:
+        Post.objects.filter(id=post_id).update(comments_count=Greatest(F('comments_count') + delta, 0))
+
+
+def approved_comments_count():
+    """Subquery counting the approved comments of the outer post"""
+    counts = (
+        Comment.objects.filter(post=OuterRef('pk'), is_approved=True)
+        .order_by().values('post').annotate(count=Count('pk')).values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def reconcile_comment_counts(chunk_size=1000):
+    """
+    Fix drift between Post.comments_count and the approved comments. Posts
+    are compared a chunk at a time with one grouped count; the drifted ones
+    are locked and recounted in a single UPDATE, so comments saved meanwhile
+    are not lost. Returns the number of posts fixed.
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        posts = list(
+            Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'comments_count')[:chunk_size]
+        )
+        if not posts:
+            break
+        last_id = posts[-1][0]
+
+        approved = dict(
+            Comment.objects.filter(post_id__in=[post_id for post_id, _ in posts], is_approved=True)
+            .values('post_id').annotate(total=Count('id')).values_list('post_id', 'total')
+        )
+        drifted = [post_id for post_id, count in posts if count != approved.get(post_id, 0)]
+        if not drifted:
+            continue
+        with transaction.atomic():
+            list(Post.objects.select_for_update().filter(id__in=drifted).values_list('id'))
+            fixed += Post.objects.filter(id__in=drifted).update(comments_count=approved_comments_count())
+        logger.info(f"Reconciled comment counts of {len(drifted)} posts")
+    return fixed
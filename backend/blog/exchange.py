@@ -0,0 +1,215 @@
+from django.contrib.auth.models import User
+from django.db import DatabaseError, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.text import slugify
+
+from backend.ndjson import ImportReport, check_fields, check_lengths, chunked, parse_timestamp, resolve_names
+from .models import Category, Comment, Post, Tag, content_metrics
+from .post_counts import reconcile_post_counts
+from .rendering import content_hash
+from .response_cache import invalidate
+
+STATUSES = {status for status, _ in Post.STATUS_CHOICES}
+POST_FIELDS = {
+    'title': str, 'slug': str, 'author': str, 'content': str, 'excerpt': str, 'featured_image': str,
+    'category': str, 'tags': list, 'status': str, 'is_featured': bool, 'created_at': str,
+    'published_at': str, 'comments': list,
+}
+COMMENT_FIELDS = {
+    'id': int, 'parent': int, 'author': str, 'content': str, 'is_approved': bool, 'created_at': str,
+}
+
+
+def export_posts(chunk_size=500):
+    """
+    Yield every post as a record with its author, category, tags and
+    comments. Posts are read with a server-side cursor where the database
+    supports it, and relations are prefetched per chunk, so memory use does
+    not grow with the number of posts.
+    """
+    posts = Post.objects.order_by('id').select_related('author', 'category').prefetch_related(
+        'tags',
+        Prefetch('comments', queryset=Comment.objects.select_related('author').order_by('id')),
+    )
+    for post in posts.iterator(chunk_size=chunk_size):
+        yield {
+            'title': post.title,
+            'slug': post.slug,
+            'author': post.author.username,
+            'content': post.content,
+            'excerpt': post.excerpt,
+            'featured_image': post.featured_image.name or None,
+            'category': post.category.name if post.category else None,
+            'tags': [tag.name for tag in post.tags.all()],
+            'status': post.status,
+            'is_featured': post.is_featured,
+            'created_at': post.created_at,
+            'published_at': post.published_at,
+            'comments': [
+                {
+                    'id': comment.id,
+                    'parent': comment.parent_id,
+                    'author': comment.author.username,
+                    'content': comment.content,
+                    'is_approved': comment.is_approved,
+                    'created_at': comment.created_at,
+                }
+                for comment in post.comments.all()
+            ],
+        }
+
+
+def import_posts(records, default_author, chunk_size=500, report=None, on_chunk=None):
+    """
+    Create posts from exported records, ``chunk_size`` posts per
+    transaction with bulk inserts. Authors are matched by username and fall
+    back to ``default_author``; categories and tags are matched by name and
+    created when missing. Posts whose slug already exists are skipped, so an
+    import can be rerun after a failure. ``on_chunk(report)`` is called after
+    each committed chunk. Raises ValueError for invalid records, and for a
+    chunk the database rejects (e.g. a slug taken meanwhile), which is
+    rolled back.
+    """
+    report = report or ImportReport()
+    try:
+        for chunk in chunked(records, chunk_size):
+            first_row = report.rows + 1
+            try:
+                with transaction.atomic():
+                    _import_chunk(chunk, default_author, report)
+            except DatabaseError as e:
+                raise ValueError(f"Records {first_row}-{first_row + len(chunk) - 1}: {e}")
+            if on_chunk:
+                on_chunk(report)
+    finally:
+        if report.created:
+            # Bulk inserts skip the signal handlers that keep these up to date
+            reconcile_post_counts()
+            invalidate('posts', 'categories', 'tags')
+    return report
+
+
+def _import_chunk(records, default_author, report):
+    first_row = report.rows + 1
+    report.rows += len(records)
+
+    for number, record in enumerate(records, first_row):
+        _validate(record, f"Record {number}")
+
+    taken = set(Post.objects.filter(slug__in=[record['slug'] for record in records]).values_list('slug', flat=True))
+    new_records = []
+    for record in records:
+        if record['slug'] not in taken:
+            taken.add(record['slug'])
+            new_records.append(record)
+    report.skipped += len(records) - len(new_records)
+    if not new_records:
+        return
+
+    usernames = {record.get('author') for record in new_records}
+    usernames |= {comment.get('author') for record in new_records for comment in record['comments']}
+    users = User.objects.in_bulk({name for name in usernames if name}, field_name='username')
+    categories = resolve_names(Category, (record.get('category') for record in new_records))
+    tags = resolve_names(Tag, (name for record in new_records for name in record['tags']))
+
+    now = timezone.now()
+    posts = []
+    for record in new_records:
+        content = record['content']
+        published_at = record['published_at']
+        if record['status'] == 'published' and not published_at:
+            published_at = now
+        posts.append(Post(
+            title=record['title'],
+            slug=record['slug'],
+            author=users.get(record.get('author'), default_author),
+            content=content,
+            excerpt=record.get('excerpt') or '',
+            featured_image=record.get('featured_image') or '',
+            category=categories.get(record.get('category')),
+            status=record['status'],
+            is_featured=bool(record.get('is_featured')),
+            published_at=published_at,
+            # HTML is left to the render_posts job
+            content_hash=content_hash(content),
+            **content_metrics(content),
+        ))
+    Post.objects.bulk_create(posts)
+
+    # auto_now_add overrides timestamps on insert, so restore exported ones
+    for post, record in zip(posts, new_records):
+        post.created_at = record['created_at'] or post.created_at
+    Post.objects.bulk_update(posts, ['created_at'])
+
+    Post.tags.through.objects.bulk_create([
+        Post.tags.through(post_id=post.id, tag_id=tags[name].id)
+        for post, record in zip(posts, new_records)
+        for name in set(record['tags'])
+    ])
+    _import_comments(posts, new_records, users, default_author)
+    report.created += len(posts)
+
+
+def _validate(record, label):
+    """
+    Check a record's fields before anything is written, and normalise it:
+    default status, slug, lists and parsed timestamps. Raises ValueError.
+    """
+    check_fields(record, POST_FIELDS, label)
+    if not record.get('title') or record.get('content') is None:
+        raise ValueError(f"{label}: title and content are required")
+    if record.setdefault('status', 'draft') not in STATUSES:
+        raise ValueError(f"{label}: unknown status {record['status']}")
+    record['slug'] = record.get('slug') or slugify(record['title'])
+    if not record['slug']:
+        raise ValueError(f"{label}: no slug can be made from the title")
+    check_lengths({name: record.get(name) for name in ('title', 'slug', 'featured_image')}, Post, label)
+    check_lengths({'name': record.get('category')}, Category, f"{label}, category")
+    record['tags'] = record.get('tags') or []
+    if not all(isinstance(name, str) for name in record['tags']):
+        raise ValueError(f"{label}: tags must be a list of strings")
+    for name in record['tags']:
+        check_lengths({'name': name}, Tag, f"{label}, tag")
+    record['comments'] = record.get('comments') or []
+    for index, comment in enumerate(record['comments'], 1):
+        check_fields(comment, COMMENT_FIELDS, f"{label}, comment {index}")
+
+    try:
+        record['created_at'] = parse_timestamp(record.get('created_at'))
+        record['published_at'] = parse_timestamp(record.get('published_at'))
+        for comment in record['comments']:
+            comment['created_at'] = parse_timestamp(comment.get('created_at'))
+    except ValueError as e:
+        raise ValueError(f"{label}: {e}")
+
+
+def _import_comments(posts, records, users, default_author):
+    comments = []
+    exported = []
+    for post, record in zip(posts, records):
+        for data in record['comments']:
+            comments.append(Comment(
+                post=post,
+                author=users.get(data.get('author'), default_author),
+                content=data.get('content') or '',
+                is_approved=data.get('is_approved') is not False,
+            ))
+            exported.append(data)
+    if not comments:
+        return
+    Comment.objects.bulk_create(comments)
+
+    # Parents are linked once every comment of the chunk has its new id
+    new_ids = {(comment.post_id, data.get('id')): comment for comment, data in zip(comments, exported)}
+    for comment, data in zip(comments, exported):
+        parent = new_ids.get((comment.post_id, data.get('parent'))) if data.get('parent') else None
+        comment.parent_id = parent.id if parent else None
+        comment.created_at = data['created_at'] or comment.created_at
+    Comment.objects.bulk_update(comments, ['parent', 'created_at'])
+
+    # bulk_create skips the signal handlers that maintain comments_count
+    for comment in comments:
+        if comment.is_approved:
+            comment.post.comments_count += 1
+    Post.objects.bulk_update([post for post in posts if post.comments_count], ['comments_count'])
@@ -0,0 +1,182 @@
+import hashlib
+import io
+import json
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+
+from .response_cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+try:
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    PILLOW_AVAILABLE = True
+except ImportError:
+    logger.warning("Pillow not available, featured images will not be resized")
+    PILLOW_AVAILABLE = False
+
+# Part of the storage path: bump it when the output changes, then run
+# `manage.py process_images --force`
+PIPELINE_VERSION = '1'
+RENDITIONS_DIR = 'renditions'
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def image_hash(data):
+    """Identifies the renditions of an image's bytes, pipeline settings included"""
+    config = f"{PIPELINE_VERSION}|{settings.BLOG_IMAGE_WIDTHS}|{settings.BLOG_IMAGE_FORMATS}|{settings.BLOG_IMAGE_QUALITY}"
+    return hashlib.sha256(config.encode() + b'\n' + data).hexdigest()
+
+
+def _directory(digest):
+    return f"{RENDITIONS_DIR}/{digest[:2]}/{digest}"
+
+
+def rendition_widths(width):
+    """The configured widths narrower than the image, plus the image's own width up to the largest"""
+    widths = {w for w in settings.BLOG_IMAGE_WIDTHS if w < width}
+    widths.add(min(width, max(settings.BLOG_IMAGE_WIDTHS)))
+    return sorted(widths)
+
+
+def make_renditions(data):
+    """
+    Resize image bytes to every rendition width and format. The EXIF
+    orientation is applied first, then all metadata (EXIF, ICC, XMP) is
+    dropped. Returns [(width, height, format, bytes)].
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    renditions = []
+    for width in rendition_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        resized = image.convert('RGBA' if has_alpha else 'RGB').resize((width, height), Image.LANCZOS)
+        resized.info = {}
+        for fmt in settings.BLOG_IMAGE_FORMATS:
+            output = io.BytesIO()
+            if fmt == 'jpeg':
+                flattened = resized
+                if has_alpha:
+                    flattened = Image.new('RGB', resized.size, 'white')
+                    flattened.paste(resized, mask=resized.getchannel('A'))
+                flattened.save(output, 'JPEG', quality=settings.BLOG_IMAGE_QUALITY, optimize=True, progressive=True)
+            else:
+                resized.save(output, 'WEBP', quality=settings.BLOG_IMAGE_QUALITY, method=4)
+            renditions.append((width, height, fmt, output.getvalue()))
+    return renditions
+
+
+def store_renditions(data):
+    """
+    Renditions of image bytes, generated once per distinct image: they live
+    under MEDIA_ROOT/renditions/ keyed by content hash, with a manifest, so
+    the same image uploaded again reuses them. Returns (hash, manifest).
+    """
+    digest = image_hash(data)
+    directory = _directory(digest)
+    manifest_name = f"{directory}/manifest.json"
+    if default_storage.exists(manifest_name):
+        with default_storage.open(manifest_name) as f:
+            return digest, json.loads(f.read())
+
+    manifest = []
+    for width, height, fmt, content in make_renditions(data):
+        name = f"{directory}/{width}.{EXTENSIONS[fmt]}"
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(content))
+        manifest.append({'name': name, 'width': width, 'height': height, 'format': fmt, 'bytes': len(content)})
+    # Written last, so a crash part-way leaves no manifest and the next run finishes the job
+    default_storage.save(manifest_name, ContentFile(json.dumps(manifest).encode()))
+    return digest, manifest
+
+
+def process_post_image(post):
+    """
+    Set the post's image hash and renditions from its featured image,
+    without saving. The upload itself is left alone: only the renditions,
+    keyed by content hash, are shared with posts that have the same image.
+    """
+    with post.featured_image.open('rb') as f:
+        data = f.read()
+    try:
+        digest, manifest = store_renditions(data)
+    except (UnidentifiedImageError, Image.DecompressionBombError, SyntaxError, ValueError) as e:
+        # Not an image we can process: clients keep getting the original
+        logger.error(f"Error processing image {post.featured_image.name} of post {post.id}: {str(e)}")
+        digest, manifest = '', []
+
+    post.image_source = post.featured_image.name
+    post.image_hash = digest
+    post.image_renditions = manifest
+
+
+def process_pending_images(batch_size=50, force=False):
+    """
+    Process the featured images of posts whose image changed since it was
+    last processed (every post with an image with ``force``). Posts whose
+    image changes again meanwhile are left for the next run. Returns the
+    number of posts processed.
+    """
+    from .models import Post
+
+    if not PILLOW_AVAILABLE:
+        return 0
+    pending = Post.objects.exclude(featured_image='').exclude(featured_image__isnull=True)
+    if not force:
+        pending = pending.filter(~Q(image_source=F('featured_image')))
+
+    processed = 0
+    dependencies = set()
+    last_id = 0
+    while True:
+        posts = list(
+            pending.filter(id__gt=last_id).order_by('id')
+            .only('id', 'featured_image', 'image_source', 'image_hash', 'image_renditions')[:batch_size]
+        )
+        if not posts:
+            break
+        last_id = posts[-1].id
+        for post in posts:
+            dependencies.add(f'post:{post.id}')
+            source = post.featured_image.name
+            try:
+                process_post_image(post)
+            except OSError as e:
+                # Missing or unreadable upload, or storage trouble; retried on the next run
+                logger.error(f"Error processing image of post {post.id}: {str(e)}")
+                continue
+            # update() leaves updated_at and the post_save handlers alone
+            updated = Post.objects.filter(id=post.id, featured_image=source).update(
+                image_source=post.image_source,
+                image_hash=post.image_hash,
+                image_renditions=post.image_renditions,
+            )
+            processed += updated
+    if processed:
+        # update() skips the signal that drops cached responses showing the old srcset
+        invalidate('posts', *dependencies)
+    return processed
+
+
+def srcsets(post, request=None):
+    """
+    {format: srcset} for the post's featured image, e.g.
+    {'webp': '.../640.webp 640w, ...', 'jpeg': ...}, or None until its
+    current image has been processed
+    """
+    if not post.featured_image or post.image_source != post.featured_image.name or not post.image_renditions:
+        return None
+    result = {}
+    for rendition in post.image_renditions:
+        url = default_storage.url(rendition['name'])
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        result.setdefault(rendition['format'], []).append(f"{url} {rendition['width']}w")
+    return {fmt: ', '.join(entries) for fmt, entries in result.items()}
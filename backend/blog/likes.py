@@ -0,0 +1,159 @@
+import logging
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Post, PostLike, PostLikeCounter
+from .popularity import record_on_commit
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'blog:likes:{}'
+
+
+def _cache_key(post_id):
+    return CACHE_KEY.format(post_id)
+
+
+def toggle_like(post, user):
+    """
+    Like ``post`` for ``user``, or remove the like if it exists.
+
+    The PostLike row is the source of truth: the like is deleted, or
+    inserted if nothing was deleted, and the counter moves only when a row
+    actually changed. A concurrent insert of the same like hits the unique
+    constraint and is treated as already liked, so the count never drifts.
+    Post.likes_count, which "Most Liked" orders by, is left to the
+    reconcile job so likes don't all write the post row. Returns
+    (liked, likes_count).
+    """
+    with transaction.atomic():
+        deleted, _ = PostLike.objects.filter(post=post, user=user).delete()
+        if deleted:
+            liked, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    PostLike.objects.create(post=post, user=user)
+                liked, delta = True, 1
+            except IntegrityError:
+                liked, delta = True, 0
+
+        if delta:
+            _increment(post.id, delta)
+            transaction.on_commit(lambda: cache.delete(_cache_key(post.id)))
+            record_on_commit(post.id, delta * settings.BLOG_POPULARITY_LIKE_WEIGHT)
+
+    return liked, get_like_count(post.id)
+
+
+def _increment(post_id, delta):
+    """
+    Add ``delta`` to a random counter shard of the post. Concurrent likes
+    lock different shard rows instead of all waiting on the post row.
+    """
+    shard = random.randrange(settings.BLOG_LIKE_COUNTER_SHARDS)
+    counters = PostLikeCounter.objects.filter(post_id=post_id, shard=shard)
+    if counters.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            PostLikeCounter.objects.create(post_id=post_id, shard=shard, count=delta)
+    except IntegrityError:
+        # Another request created the shard first
+        counters.update(count=F('count') + delta)
+
+
+def get_like_count(post_id):
+    """Like count of a post: the sum of its counter shards, cached"""
+    return get_like_counts([post_id])[post_id]
+
+
+def get_like_counts(post_ids):
+    """Like counts for several posts with one cache lookup and at most one query"""
+    post_ids = list(post_ids)
+    keys = {_cache_key(post_id): post_id for post_id in post_ids}
+    counts = {keys[key]: value for key, value in cache.get_many(keys).items()}
+
+    missing = [post_id for post_id in post_ids if post_id not in counts]
+    if missing:
+        totals = dict(
+            PostLikeCounter.objects.filter(post_id__in=missing)
+            .values('post_id')
+            .annotate(total=Sum('count'))
+            .values_list('post_id', 'total')
+        )
+        fetched = {post_id: max(totals.get(post_id, 0), 0) for post_id in missing}
+        cache.set_many(
+            {_cache_key(post_id): count for post_id, count in fetched.items()},
+            settings.BLOG_LIKE_COUNT_CACHE_TIMEOUT,
+        )
+        counts.update(fetched)
+    return counts
+
+
+def attach_like_counts(posts):
+    """Set ``sharded_likes_count`` on each post for the serializers"""
+    counts = get_like_counts(post.id for post in posts)
+    for post in posts:
+        post.sharded_likes_count = counts[post.id]
+    return posts
+
+
+def reconcile_like_counts(chunk_size=1000):
+    """
+    Fix counter drift against PostLike. For every post whose shards don't
+    add up to its number of likes, the shards are locked and collapsed into
+    shard 0 with the true count. Post.likes_count, used for ordering, is
+    synced from the likes in the same pass, one bulk update per chunk.
+    Returns the number of posts whose shards drifted.
+    """
+    fixed = 0
+    synced = 0
+    last_id = 0
+    while True:
+        posts = list(
+            Post.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'likes_count')[:chunk_size]
+        )
+        if not posts:
+            break
+        last_id = posts[-1][0]
+        post_ids = [post_id for post_id, _ in posts]
+
+        likes = dict(
+            PostLike.objects.filter(post_id__in=post_ids)
+            .values('post_id').annotate(total=Count('id')).values_list('post_id', 'total')
+        )
+        shards = dict(
+            PostLikeCounter.objects.filter(post_id__in=post_ids)
+            .values('post_id').annotate(total=Sum('count')).values_list('post_id', 'total')
+        )
+        stale = []
+        for post_id, likes_count in posts:
+            actual = likes.get(post_id, 0)
+            if shards.get(post_id, 0) != actual:
+                _reset_counters(post_id)
+                fixed += 1
+            elif likes_count != actual:
+                stale.append(Post(id=post_id, likes_count=actual))
+        # Likes since the last pass; bulk_update leaves updated_at and the signals alone
+        Post.objects.bulk_update(stale, ['likes_count'])
+        synced += len(stale)
+    if synced:
+        logger.info(f"Synced likes_count of {synced} posts")
+    return fixed
+
+
+def _reset_counters(post_id):
+    with transaction.atomic():
+        # Locking the shards first makes likes in flight finish before we count
+        list(PostLikeCounter.objects.select_for_update().filter(post_id=post_id))
+        actual = PostLike.objects.filter(post_id=post_id).count()
+        PostLikeCounter.objects.filter(post_id=post_id).exclude(shard=0).delete()
+        PostLikeCounter.objects.update_or_create(post_id=post_id, shard=0, defaults={'count': actual})
+        Post.objects.filter(id=post_id).update(likes_count=actual)
+        transaction.on_commit(lambda: cache.delete(_cache_key(post_id)))
+    logger.info(f"Reconciled like count of post {post_id} to {actual}")
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from blog.models import Post, content_metrics
+import time
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored word count and reading time of every post'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Posts loaded and updated per batch',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        batch_size = options['batch_size']
+        updated = 0
+        last_id = 0
+        while True:
+            posts = list(
+                Post.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'content', 'word_count', 'reading_time')[:batch_size]
+            )
+            if not posts:
+                break
+            last_id = posts[-1].id
+
+            changed = []
+            for post in posts:
+                metrics = content_metrics(post.content)
+                if metrics != {'word_count': post.word_count, 'reading_time': post.reading_time}:
+                    post.word_count = metrics['word_count']
+                    post.reading_time = metrics['reading_time']
+                    changed.append(post)
+            # bulk_update skips save(), so updated_at and the signals are left alone
+            Post.objects.bulk_update(changed, ['word_count', 'reading_time'])
+            updated += len(changed)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated {updated} posts in {time.monotonic() - started:.1f}s')
+        )
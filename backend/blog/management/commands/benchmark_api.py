@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from backend import benchmark
+import time
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the REST API: p50/p95 latency, queries per request and response size against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, e.g. http://127.0.0.1:8000; in-process when omitted',
+        )
+        parser.add_argument('--iterations', type=int, default=50, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first')
+        parser.add_argument('--concurrency', type=int, default=1, help='Parallel requests, live server only')
+        parser.add_argument('--endpoints', help='Comma-separated endpoint names to run, all by default')
+        parser.add_argument(
+            '--cold-cache',
+            action='store_true',
+            help='Clear the cache before every in-process request, to measure the uncached path',
+        )
+        parser.add_argument(
+            '--generate',
+            type=int,
+            metavar='POSTS',
+            help='First generate a dataset of this many posts (and a tenth as many tutorials) with generate_load_data',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Seed for --generate')
+        parser.add_argument(
+            '--baseline',
+            default=str(settings.BASE_DIR / 'benchmark_baseline.json'),
+            help='Baseline file to compare with',
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Allowed relative growth of p95 latency and response size',
+        )
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on regressions')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['concurrency'] > 1 and not options['url']:
+            raise CommandError('--concurrency needs --url; in-process requests share one database connection')
+
+        if options['generate']:
+            posts = options['generate']
+            call_command(
+                'generate_load_data',
+                posts=posts,
+                tutorials=max(1, posts // 10),
+                users=max(10, posts // 10),
+                seed=options['seed'],
+                prefix='bench',
+                clear=True,
+                workers=4,
+                stdout=self.stdout,
+            )
+
+        names = {name.strip() for name in options['endpoints'].split(',')} if options['endpoints'] else None
+        baseline = benchmark.load_baseline(options['baseline'])
+        results = {}
+        with benchmark.benchmark_user() as (username, password, token):
+            endpoints = benchmark.prepare(names, username, password)
+            if options['url']:
+                client = benchmark.LiveClient(options['url'], token)
+            else:
+                client = benchmark.InProcessClient(token, cold_cache=options['cold_cache'])
+
+            self.stdout.write(f"{'endpoint':<36} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'bytes':>9} {'errors':>7}")
+            for endpoint in endpoints:
+                key = f'{client.mode}:{endpoint[0]}'
+                result = benchmark.run_endpoint(
+                    client, endpoint, options['iterations'], options['warmup'], options['concurrency']
+                )
+                results[key] = result
+                queries = '-' if result['queries'] is None else result['queries']
+                self.stdout.write(
+                    f"{key:<36} {result['p50_ms']:>8} {result['p95_ms']:>8} {queries:>8} {result['bytes']:>9} {result['errors']:>7}"
+                )
+
+        regressions = benchmark.compare(results, baseline, options['tolerance'])
+        for regression in regressions:
+            self.stdout.write(self.style.WARNING(f'Regression: {regression}'))
+
+        if options['save_baseline']:
+            baseline.update(results)
+            benchmark.save_baseline(options['baseline'], baseline)
+            self.stdout.write(f"Saved baseline to {options['baseline']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Benchmarked {len(results)} endpoints in {time.monotonic() - started:.1f}s'
+        ))
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from backend.ndjson import write_lines
+from blog.exchange import export_posts
+import time
+
+
+class Command(BaseCommand):
+    help = 'Export every post with its tags, category and comments as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='File to write, - for stdout',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Posts fetched per database round trip',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = write_lines(export_posts(chunk_size=options['chunk_size']), options['output'], self.stdout)
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {rows} posts in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
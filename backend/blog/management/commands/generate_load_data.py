@@ -0,0 +1,110 @@
+from multiprocessing import get_context
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+from blog import synthetic
+from blog.popularity import get_epoch
+from blog.post_counts import reconcile_post_counts
+from blog.response_cache import invalidate
+import time
+
+
+def _run_chunk(job):
+    kind, index, options = job
+    generate = synthetic.generate_posts if kind == 'posts' else synthetic.generate_tutorials
+    return kind, generate(index, options)
+
+
+class Command(BaseCommand):
+    help = 'Generate a large, skewed synthetic dataset (posts, comments, likes, views, tutorials) for load testing'
+
+    CHUNK_OPTIONS = [
+        'seed', 'prefix', 'batch_size', 'days', 'posts', 'tutorials',
+        'comments_per_post', 'max_comments_per_post', 'likes_per_post', 'views_per_post', 'max_views_per_post',
+        'ratings_per_tutorial', 'progress_per_tutorial',
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to create')
+        parser.add_argument('--posts', type=int, default=10000, help='Posts to create')
+        parser.add_argument('--tutorials', type=int, default=1000, help='Tutorials to create')
+        parser.add_argument('--comments-per-post', type=float, default=8, help='Mean comments per published post')
+        parser.add_argument('--max-comments-per-post', type=int, default=2000, help='Cap for the hottest posts')
+        parser.add_argument('--likes-per-post', type=float, default=15, help='Mean likes per published post')
+        parser.add_argument('--views-per-post', type=float, default=200, help='Mean view records per published post')
+        parser.add_argument('--max-views-per-post', type=int, default=50000, help='Cap for the hottest posts')
+        parser.add_argument('--ratings-per-tutorial', type=float, default=10, help='Mean ratings per tutorial')
+        parser.add_argument('--progress-per-tutorial', type=float, default=25, help='Mean learners per tutorial')
+        parser.add_argument('--days', type=int, default=365, help='Spread creation dates over this many days')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Posts or tutorials per chunk and transaction')
+        parser.add_argument('--workers', type=int, default=1, help='Processes generating chunks in parallel')
+        parser.add_argument('--seed', type=int, default=42, help='Seed; the same seed yields the same data')
+        parser.add_argument(
+            '--prefix',
+            default='load',
+            help='Prefix of generated usernames and slugs, so runs can be told apart and cleared',
+        )
+        parser.add_argument('--clear', action='store_true', help='Delete data from earlier runs with the same prefix first')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        prefix = options['prefix']
+        if options['users'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--users and --batch-size must be at least 1')
+
+        if options['clear']:
+            deleted = synthetic.clear(prefix)
+            self.stdout.write(f'Deleted {deleted} rows from earlier runs')
+        elif User.objects.filter(username__startswith=f'{prefix}-user-').exists():
+            raise CommandError(f'Data with prefix "{prefix}" exists; pass --clear or another --prefix')
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite allows one writer at a time, so workers would only wait on each other
+            self.stdout.write(self.style.WARNING('SQLite serializes writes, using a single worker'))
+            workers = 1
+
+        # Only plain values, as they are pickled to the workers
+        chunk_options = {key: options[key] for key in self.CHUNK_OPTIONS}
+        chunk_options.update(
+            synthetic.create_reference_data(prefix, options['users']), now=timezone.now(), epoch=get_epoch(),
+        )
+        jobs = [
+            (kind, index, chunk_options)
+            for kind in ('posts', 'tutorials')
+            for index in range(-(-options[kind] // options['batch_size']))
+        ]
+
+        rows = {'posts': 0, 'tutorials': 0}
+        if workers > 1:
+            # Children must open their own connections rather than share the parent's
+            connections.close_all()
+            with get_context('fork').Pool(workers) as pool:
+                for done, (kind, count) in enumerate(pool.imap_unordered(_run_chunk, jobs), 1):
+                    rows[kind] += count
+                    self.progress(done, len(jobs), rows, started)
+        else:
+            for done, job in enumerate(jobs, 1):
+                kind, count = _run_chunk(job)
+                rows[kind] += count
+                self.progress(done, len(jobs), rows, started)
+
+        # bulk_create skips the signals that maintain category and tag
+        # counts and invalidate cached responses
+        reconcile_post_counts()
+        invalidate('posts', 'categories', 'tags')
+        total = sum(rows.values())
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s); '
+            f'run render_posts and rollup_post_views to fill derived data'
+        ))
+
+    def progress(self, done, total, rows, started):
+        inserted = sum(rows.values())
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{done}/{total} chunks, {inserted} rows ({inserted / elapsed if elapsed else 0:.0f} rows/s)'
+        )
@@ -0,0 +1,45 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from backend.ndjson import load_lines
+from blog.exchange import import_posts
+
+
+class Command(BaseCommand):
+    help = 'Import posts from an NDJSON export, in chunked bulk transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON file to read, - for stdin')
+        parser.add_argument(
+            '--author',
+            required=True,
+            help='Username of the author for posts and comments whose author does not exist here',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Posts inserted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['author']} does not exist")
+
+        source = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        try:
+            report = import_posts(
+                load_lines(source),
+                default_author=author,
+                chunk_size=options['chunk_size'],
+                on_chunk=lambda report: self.stdout.write(str(report)),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.stdout.write(self.style.SUCCESS(f'Imported {report}'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from blog.images import process_pending_images
+import time
+
+
+class Command(BaseCommand):
+    help = 'Resize featured images that changed since they were last processed into responsive renditions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Posts loaded per batch',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Reprocess every featured image, e.g. after changing the widths or formats',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        processed = process_pending_images(batch_size=options['batch_size'], force=options['force'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed {processed} images in {time.monotonic() - started:.1f}s')
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from blog.likes import reconcile_like_counts
+import time
+
+
+class Command(BaseCommand):
+    help = 'Repair sharded like counters that drifted from the PostLike rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Posts checked per batch',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        fixed = reconcile_like_counts(chunk_size=options['chunk_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Reconciled {fixed} posts in {time.monotonic() - started:.1f}s')
+        )
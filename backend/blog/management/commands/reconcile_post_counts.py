@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from blog.post_counts import reconcile_post_counts
+from blog.response_cache import invalidate
+import time
+
+
+class Command(BaseCommand):
+    help = 'Repair stored published post counts of categories and tags'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        fixed = reconcile_post_counts()
+        if fixed:
+            invalidate('posts', 'categories', 'tags')
+        self.stdout.write(
+            self.style.SUCCESS(f'Reconciled {fixed} categories and tags in {time.monotonic() - started:.1f}s')
+        )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from blog.rendering import render_pending_posts
+import time
+
+
+class Command(BaseCommand):
+    help = 'Store the rendered HTML of posts whose content changed since their last rendering'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Posts loaded per batch',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render every post, e.g. after a renderer change',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rendered = render_pending_posts(batch_size=options['batch_size'], force=options['force'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Rendered {rendered} posts in {time.monotonic() - started:.1f}s')
+        )
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from blog.rollups import prune_views, rollup_views
+import time
+
+
+class Command(BaseCommand):
+    help = 'Roll raw post views up into daily counts and prune old raw views'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-prune',
+            action='store_true',
+            help='Only update the rollups, keep all raw views',
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=settings.BLOG_VIEW_RETENTION_DAYS,
+            help='Delete raw views older than this many days',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.BLOG_VIEW_PRUNE_BATCH_SIZE,
+            help='Raw views deleted per statement',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rolled_up = rollup_views()
+        self.stdout.write(f'Rolled up {rolled_up} post-days in {time.monotonic() - started:.1f}s')
+
+        if not options['no_prune']:
+            started = time.monotonic()
+            pruned = prune_views(options['retention_days'], options['batch_size'])
+            self.stdout.write(f'Pruned {pruned} raw views in {time.monotonic() - started:.1f}s')
+
+        self.stdout.write(self.style.SUCCESS('Post view rollups are up to date'))
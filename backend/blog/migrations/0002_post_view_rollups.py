@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+
+def set_viewed_on(apps, schema_editor):
+    # Existing views were recorded on the day they were created
+    PostView = apps.get_model('blog', 'PostView')
+    PostView.objects.update(viewed_on=TruncDate('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='postview',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='postview',
+            name='viewed_on',
+            field=models.DateField(db_index=True, default=django.utils.timezone.localdate),
+        ),
+        migrations.RunPython(set_viewed_on, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='postview',
+            unique_together={('post', 'ip_address', 'viewed_on')},
+        ),
+        migrations.CreateModel(
+            name='PostViewDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('visitors_sketch', models.BinaryField(default=bytes)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_views', to='blog.post')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('post', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def seed_counters(apps, schema_editor):
+    # Start every liked post with its current number of likes in shard 0
+    PostLike = apps.get_model('blog', 'PostLike')
+    PostLikeCounter = apps.get_model('blog', 'PostLikeCounter')
+    totals = PostLike.objects.values('post_id').annotate(total=Count('id'))
+    PostLikeCounter.objects.bulk_create(
+        (PostLikeCounter(post_id=row['post_id'], shard=0, count=row['total']) for row in totals),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0002_post_view_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostLikeCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_counters', to='blog.post')),
+            ],
+            options={
+                'unique_together': {('post', 'shard')},
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
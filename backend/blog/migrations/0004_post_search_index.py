@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:07
+
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from blog.search import install_search_index
+    install_search_index(schema_editor)
+
+
+def remove_search_index(apps, schema_editor):
+    from blog.search import remove_search_index
+    remove_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_like_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
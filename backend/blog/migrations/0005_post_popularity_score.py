@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def seed_scores(apps, schema_editor):
+    # Approximate starting scores: all engagement so far counts as of the
+    # publish date, decayed with the configured half-life
+    Post = apps.get_model('blog', 'Post')
+    PopularityEpoch = apps.get_model('blog', 'PopularityEpoch')
+    half_life = settings.BLOG_POPULARITY_HALF_LIFE_HOURS * 3600
+    view_weight = settings.BLOG_POPULARITY_VIEW_WEIGHT
+    like_weight = settings.BLOG_POPULARITY_LIKE_WEIGHT
+    now = timezone.now()
+    PopularityEpoch.objects.update_or_create(pk=1, defaults={'started_at': now})
+
+    posts = []
+    for post in Post.objects.only('id', 'views_count', 'likes_count', 'published_at', 'created_at').iterator():
+        age = (now - (post.published_at or post.created_at)).total_seconds()
+        engagement = view_weight * post.views_count + like_weight * post.likes_count
+        post.popularity_score = engagement * 2 ** (-age / half_life)
+        posts.append(post)
+    Post.objects.bulk_update(posts, ['popularity_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularityEpoch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='popularity_score',
+            field=models.FloatField(default=0.0, help_text='Time-decayed engagement, see blog/popularity.py'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-popularity_score'], name='blog_post_status_05ffd3_idx'),
+        ),
+        migrations.RunPython(seed_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0005_post_popularity_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='blog_post_status_615533_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='blog_post_views_c_d02b72_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='blog_post_status_05ffd3_idx',
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created_at', '-id'], name='blog_commen_post_id_f18a65_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='blog_post_status_3770d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-updated_at', '-id'], name='blog_post_status_2dae43_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-published_at', '-id'], name='blog_post_status_258d5d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-views_count', '-id'], name='blog_post_status_a92089_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-likes_count', '-id'], name='blog_post_status_a4053a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-popularity_score', '-id'], name='blog_post_status_f29bca_idx'),
+        ),
+    ]
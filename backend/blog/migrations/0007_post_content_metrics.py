@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:17
+
+from django.db import migrations, models
+
+
+def backfill_metrics(apps, schema_editor):
+    # Same computation as blog.models.content_metrics at the time of writing
+    Post = apps.get_model('blog', 'Post')
+    posts = []
+    for post in Post.objects.only('id', 'content').iterator():
+        post.word_count = len(post.content.split())
+        post.reading_time = max(1, round(post.word_count / 200))
+        posts.append(post)
+    Post.objects.bulk_update(posts, ['word_count', 'reading_time'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Estimated reading time in minutes'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:45
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comments_count(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    counts = (
+        Comment.objects.filter(post=OuterRef('pk'), is_approved=True)
+        .order_by().values('post').annotate(count=Count('pk')).values('count')
+    )
+    Post.objects.update(comments_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_rendered_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, help_text='Approved comments, see blog/comments.py'),
+        ),
+        migrations.RunPython(backfill_comments_count, migrations.RunPython.noop),
+    ]
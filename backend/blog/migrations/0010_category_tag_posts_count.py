@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:55
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_posts_count(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    for model_name, lookup in (('Category', 'category'), ('Tag', 'tags')):
+        counts = (
+            Post.objects.filter(**{lookup: OuterRef('pk'), 'status': 'published'})
+            .order_by().values(lookup).annotate(count=Count('pk')).values('count')
+        )
+        apps.get_model('blog', model_name).objects.update(
+            posts_count=Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, help_text='Published posts, see blog/post_counts.py'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, help_text='Published posts, see blog/post_counts.py'),
+        ),
+        migrations.RunPython(backfill_posts_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_post_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='embedded_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_post_embedded_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='popularity_epoch',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Epoch popularity_score was last rescaled to; null if created since', null=True),
+        ),
+    ]
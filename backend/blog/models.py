@@ -1,12 +1,18 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.urls import reverse
 
+from .rendering import content_hash, render_post
+
 
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    posts_count = models.PositiveIntegerField(default=0, help_text="Published posts, see blog/post_counts.py")
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -19,6 +25,7 @@ class Category(models.Model):
 
 class Tag(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    posts_count = models.PositiveIntegerField(default=0, help_text="Published posts, see blog/post_counts.py")
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -28,6 +35,33 @@ class Tag(models.Model):
         return self.name
 
 
+WORDS_PER_MINUTE = 200
+
+
+def content_metrics(content):
+    """Word count and estimated reading time in minutes of a post body"""
+    word_count = len(content.split())
+    return {'word_count': word_count, 'reading_time': max(1, round(word_count / WORDS_PER_MINUTE))}
+
+
+def published_posts_count(lookup):
+    """Subquery counting published posts related to the outer row through ``lookup``"""
+    posts = Post.objects.filter(**{lookup: OuterRef('pk'), 'status': 'published'}).order_by()
+    counts = posts.values(lookup).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        """
+        Load everything the post serializers read, with a fixed number of
+        queries per page: author and category are joined and tags are
+        prefetched. Post counts of categories and tags and the approved
+        comment count are stored columns, so no counting happens on reads.
+        """
+        return self.select_related('author', 'category').prefetch_related('tags')
+
+
 class Post(models.Model):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
@@ -41,22 +75,49 @@ class Post(models.Model):
     content = models.TextField()
     excerpt = models.TextField(max_length=300, blank=True, help_text="Brief description of the post")
     featured_image = models.ImageField(upload_to='post_images/', blank=True, null=True)
+    # Responsive renditions of featured_image, made by the process_images job (blog/images.py)
+    image_source = models.CharField(max_length=100, blank=True, editable=False, help_text="featured_image the renditions were made from")
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
+    image_renditions = models.JSONField(default=list, blank=True, editable=False)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='posts')
     tags = models.ManyToManyField(Tag, blank=True, related_name='posts')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
     is_featured = models.BooleanField(default=False, help_text="Mark as featured post")
     views_count = models.PositiveIntegerField(default=0)
     likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0, help_text="Approved comments, see blog/comments.py")
+    popularity_score = models.FloatField(default=0.0, help_text="Time-decayed engagement, see blog/popularity.py")
+    popularity_epoch = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text="Epoch popularity_score was last rescaled to; null if created since",
+    )
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    reading_time = models.PositiveIntegerField(default=1, editable=False, help_text="Estimated reading time in minutes")
+    # Rendered HTML of content (blog/rendering.py), current when rendered_hash == content_hash
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    rendered_hash = models.CharField(max_length=64, blank=True, editable=False)
+    content_html = models.TextField(blank=True, editable=False)
+    content_toc = models.JSONField(default=list, blank=True, editable=False)
+    # Semantic search embedding (blog/semantic.py), stale when older than updated_at
+    embedded_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(null=True, blank=True)
     
+    objects = PostQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['status', '-published_at']),
             models.Index(fields=['category', '-published_at']),
-            models.Index(fields=['-views_count']),
+            # Keyset pagination: one (status, ordering field, id) index per
+            # ordering offered by PostViewSet (see backend/pagination.py)
+            models.Index(fields=['status', '-created_at', '-id']),
+            models.Index(fields=['status', '-updated_at', '-id']),
+            models.Index(fields=['status', '-published_at', '-id']),
+            models.Index(fields=['status', '-views_count', '-id']),
+            models.Index(fields=['status', '-likes_count', '-id']),
+            models.Index(fields=['status', '-popularity_score', '-id']),
         ]
     
     def __str__(self):
@@ -65,17 +126,27 @@ class Post(models.Model):
     def save(self, *args, **kwargs):
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
-        super().save(*args, **kwargs)
+        
+        # Content metrics and HTML are stored so reads never process the body
+        update_fields = kwargs.get('update_fields')
+        if 'content' not in self.get_deferred_fields() and (update_fields is None or 'content' in update_fields):
+            for field, value in content_metrics(self.content).items():
+                setattr(self, field, value)
+            self.content_hash = content_hash(self.content)
+            # Large posts are left to the render_posts job
+            if self.rendered_hash != self.content_hash and len(self.content) <= settings.BLOG_RENDER_SYNC_MAX_CHARS:
+                render_post(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = {
+                    *update_fields, 'word_count', 'reading_time',
+                    'content_hash', 'rendered_hash', 'content_html', 'content_toc',
+                }
+        # Category and tag post counts are updated by a post_save handler, in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     def get_absolute_url(self):
         return reverse('blog:post_detail', kwargs={'slug': self.slug})
-    
-    @property
-    def reading_time(self):
-        """Calculate estimated reading time in minutes"""
-        words_per_minute = 200
-        word_count = len(self.content.split())
-        return max(1, round(word_count / words_per_minute))
 
 
 class Comment(models.Model):
@@ -89,10 +160,18 @@ class Comment(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id']),
+        ]
     
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
     
+    def save(self, *args, **kwargs):
+        # The post's comments_count is updated by a post_save handler, in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     @property
     def is_reply(self):
         return self.parent is not None
@@ -110,14 +189,59 @@ class PostLike(models.Model):
         return f'{self.user.username} likes {self.post.title}'
 
 
+class PostLikeCounter(models.Model):
+    """
+    One of BLOG_LIKE_COUNTER_SHARDS counter rows per post. Like toggles
+    update a random shard and reads sum them (see blog/likes.py).
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='like_counters')
+    shard = models.PositiveSmallIntegerField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        unique_together = ('post', 'shard')
+    
+    def __str__(self):
+        return f'{self.post.title} likes shard {self.shard}: {self.count}'
+
+
 class PostView(models.Model):
+    """
+    Raw view, one per (post, IP) per day. Rows are folded into
+    PostViewDaily rollups and pruned after BLOG_VIEW_RETENTION_DAYS.
+    """
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='post_views')
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     ip_address = models.GenericIPAddressField()
+    viewed_on = models.DateField(default=timezone.localdate, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ('post', 'ip_address')
+        unique_together = ('post', 'ip_address', 'viewed_on')
     
     def __str__(self):
         return f'View on {self.post.title} from {self.ip_address}'
+
+
+class PostViewDaily(models.Model):
+    """Daily view rollup for a post with a HyperLogLog sketch of its visitors"""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='daily_views')
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    visitors_sketch = models.BinaryField(default=bytes)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('post', 'date')
+        ordering = ['date']
+    
+    def __str__(self):
+        return f'{self.views} views on {self.post.title} on {self.date}'
+
+
+class PopularityEpoch(models.Model):
+    """Single row holding the reference time of Post.popularity_score"""
+    started_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f'Popularity epoch {self.started_at}'
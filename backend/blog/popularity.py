@@ -0,0 +1,108 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.utils import timezone
+
+from .models import Post, PopularityEpoch
+
+logger = logging.getLogger(__name__)
+
+
+def get_epoch():
+    """Reference time of the stored popularity scores"""
+    epoch, _ = PopularityEpoch.objects.get_or_create(pk=1, defaults={'started_at': timezone.now()})
+    return epoch.started_at
+
+
+def half_life_seconds():
+    return settings.BLOG_POPULARITY_HALF_LIFE_HOURS * 3600
+
+
+def growth_factor(epoch, now=None):
+    """
+    Weight of an event happening ``now`` relative to one at ``epoch``.
+
+    Instead of decaying every score over time, new events are weighted up
+    by 2 ** (age of the epoch / half-life). Relative order between posts is
+    the same as with decayed scores, so an index on popularity_score can
+    serve the popular list directly.
+    """
+    now = now or timezone.now()
+    return 2 ** ((now - epoch).total_seconds() / half_life_seconds())
+
+
+def score_increments(weights, epoch=None):
+    """
+    Case expression adding ``weights`` (post id -> event weight) to
+    popularity_score, for use in a Post UPDATE
+    """
+    factor = growth_factor(epoch or get_epoch())
+    return F('popularity_score') + Case(
+        *[When(id=post_id, then=Value(weight * factor)) for post_id, weight in weights.items()],
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def apply_scores(weights, attempts=3):
+    """
+    Add event weights to the posts' popularity scores, normally with one
+    UPDATE. The epoch is read without a lock: the UPDATE only touches posts
+    whose score is not newer than that epoch (Post.popularity_epoch), and
+    posts a concurrent rescale() moved past it are retried with the new one.
+    """
+    weights = {post_id: weight for post_id, weight in weights.items() if weight}
+    for _ in range(attempts):
+        if not weights:
+            return
+        epoch = get_epoch()
+        with transaction.atomic():
+            Post.objects.filter(id__in=weights).filter(
+                Q(popularity_epoch__isnull=True) | Q(popularity_epoch__lte=epoch)
+            ).update(popularity_score=score_increments(weights, epoch))
+            # Rows updated above stay locked until commit, so these are the skipped ones
+            rescaled = set(Post.objects.filter(id__in=weights, popularity_epoch__gt=epoch).values_list('id', flat=True))
+        weights = {post_id: weight for post_id, weight in weights.items() if post_id in rescaled}
+    if weights:
+        logger.warning(f"Dropped popularity weights of {len(weights)} posts rescaled during every attempt")
+
+
+def record(post_id, weight):
+    """
+    Count an event towards a post's popularity. With view buffering on, the
+    weight is batched into the view counter's next flush so busy posts don't
+    get a row update per like or comment.
+    """
+    from .view_counter import view_counter
+
+    if settings.BLOG_VIEW_BUFFERING:
+        view_counter.add_score(post_id, weight)
+    else:
+        apply_scores({post_id: weight})
+
+
+def record_on_commit(post_id, weight):
+    transaction.on_commit(lambda: record(post_id, weight))
+
+
+def rescale():
+    """
+    Move the epoch to now and shrink every score by the same factor, so
+    scores stay far from float overflow. Ordering is unchanged. Each post
+    records the new epoch, so increments computed against the old one are
+    retried instead of landing on a rescaled score (see apply_scores).
+    Returns the factor applied.
+    """
+    get_epoch()
+    with transaction.atomic():
+        # Only one rescale at a time; score writes don't take this lock
+        epoch = PopularityEpoch.objects.select_for_update().get(pk=1).started_at
+        now = timezone.now()
+        factor = 1 / growth_factor(epoch, now)
+        Post.objects.update(popularity_score=F('popularity_score') * factor, popularity_epoch=now)
+        PopularityEpoch.objects.filter(pk=1).update(started_at=now)
+    logger.info(f"Rescaled popularity scores by {factor:.6g}")
+    return factor
+
@@ -0,0 +1,42 @@
+import logging
+
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import Category, Post, Tag, published_posts_count
+
+logger = logging.getLogger(__name__)
+
+
+def change_category_count(category_id, delta):
+    """Move the category's stored published post count by ``delta``, in the caller's transaction"""
+    if category_id and delta:
+        Category.objects.filter(id=category_id).update(posts_count=Greatest(F('posts_count') + delta, 0))
+
+
+def change_tag_counts(tag_ids, delta):
+    """Move the stored published post count of each tag by ``delta``, in one UPDATE"""
+    tag_ids = list(tag_ids)
+    if tag_ids and delta:
+        Tag.objects.filter(id__in=tag_ids).update(posts_count=Greatest(F('posts_count') + delta, 0))
+
+
+def published_post_ids(post_ids):
+    return list(Post.objects.filter(id__in=post_ids, status='published').values_list('id', flat=True))
+
+
+def reconcile_post_counts():
+    """
+    Recount the published posts of every category and tag whose stored
+    count drifted, one UPDATE per model. Used after bulk inserts, which
+    bypass the signal handlers. Returns the number of rows fixed.
+    """
+    fixed = 0
+    for model, lookup in ((Category, 'category'), (Tag, 'tags')):
+        drifted = model.objects.annotate(actual=published_posts_count(lookup)).exclude(posts_count=F('actual'))
+        fixed += model.objects.filter(id__in=list(drifted.values_list('id', flat=True))).update(
+            posts_count=published_posts_count(lookup)
+        )
+    if fixed:
+        logger.info(f"Reconciled post counts of {fixed} categories and tags")
+    return fixed
@@ -0,0 +1,274 @@
+import hashlib
+import html
+import logging
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils.text import slugify
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pygments import highlight
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+    PYGMENTS_AVAILABLE = True
+except ImportError:
+    logger.warning("Pygments not available, code blocks will not be highlighted")
+    PYGMENTS_AVAILABLE = False
+
+# Part of the content hash: bump it when the output changes, then run
+# `manage.py render_posts --force`
+RENDERER_VERSION = '2'
+CACHE_KEY = 'blog:html:{}'
+
+FENCE = re.compile(r'^\s{0,3}(`{3,}|~{3,})\s*([\w+#.-]*)')
+HEADING = re.compile(r'^\s{0,3}(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+RULE = re.compile(r'^\s{0,3}([-*_])(?:\s*\1){2,}\s*$')
+BULLET = re.compile(r'^\s{0,3}[-*+]\s+(.*)$')
+ORDERED = re.compile(r'^\s{0,3}\d{1,9}[.)]\s+(.*)$')
+QUOTE = re.compile(r'^\s{0,3}>\s?(.*)$')
+
+CODE_SPAN = re.compile(r'`([^`\n]+)`')
+LINK = re.compile(r'\[([^\]\n]+)\]\(([^()\s]+)\)')
+STRONG = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*|__(?=\S)(.+?)(?<=\S)__')
+EMPHASIS = re.compile(r'(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])|(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)')
+STASHED = re.compile(r'\x00(\d+)\x00')
+SAFE_SCHEMES = {'http', 'https', 'mailto'}
+RELATIVE_PREFIXES = ('/', '#', '?', './', '../')
+# Browsers drop leading C0 controls and spaces, and tabs and newlines anywhere,
+# so 'java\tscript:' and '\x01javascript:' would still run script
+CONTROL_CHARS = re.compile(r'[\x00-\x20\x7f]')
+
+
+def content_hash(content):
+    """Identifies the rendered output of ``content``, renderer version included"""
+    return hashlib.sha256(f"{RENDERER_VERSION}\n{content}".encode()).hexdigest()
+
+
+def _safe_url(url):
+    """The URL if it is relative or uses a safe scheme, else None"""
+    if CONTROL_CHARS.search(url):
+        return None
+    if url.startswith(RELATIVE_PREFIXES):
+        return url
+    scheme = re.match(r'([a-zA-Z][a-zA-Z0-9+.-]*):', url)
+    if scheme and scheme.group(1).lower() in SAFE_SCHEMES:
+        return url
+    return None
+
+
+class MarkdownRenderer:
+    """
+    Renders the Markdown subset posts are written in: ATX headings, fenced
+    code blocks, bullet and numbered lists, block quotes, horizontal rules
+    and paragraphs, with inline code, links, strong and emphasis.
+
+    Output is sanitized by construction: all post text is HTML-escaped and
+    only the renderer's own tags are emitted, so raw HTML in a post shows up
+    as text. Links are limited to relative URLs (starting with /, #, ?, ./ or
+    ../) and http(s)/mailto.
+    """
+
+    def __init__(self):
+        self.toc = []
+        self.ids = set()
+
+    def render(self, text):
+        body = self.blocks(text.replace('\r\n', '\n').replace('\t', '    ').split('\n'))
+        return {'html': body, 'toc': self.toc}
+
+    def blocks(self, lines):
+        out = []
+        paragraph = []
+
+        def flush():
+            if paragraph:
+                out.append(f"<p>{self.inline(chr(10).join(line.strip() for line in paragraph))}</p>")
+                paragraph.clear()
+
+        i = 0
+        while i < len(lines):
+            line = lines[i]
+            fence = FENCE.match(line)
+            if fence:
+                flush()
+                marker = fence.group(1)
+                code = []
+                i += 1
+                while i < len(lines) and not lines[i].strip().startswith(marker):
+                    code.append(lines[i])
+                    i += 1
+                out.append(self.code_block('\n'.join(code), fence.group(2)))
+                i += 1
+                continue
+
+            if not line.strip():
+                flush()
+            elif HEADING.match(line):
+                flush()
+                match = HEADING.match(line)
+                out.append(self.heading(len(match.group(1)), match.group(2)))
+            elif RULE.match(line):
+                flush()
+                out.append('<hr>')
+            elif QUOTE.match(line):
+                flush()
+                quoted = []
+                while i < len(lines) and QUOTE.match(lines[i]):
+                    quoted.append(QUOTE.match(lines[i]).group(1))
+                    i += 1
+                out.append(f"<blockquote>{self.blocks(quoted)}</blockquote>")
+                continue
+            elif BULLET.match(line) or ORDERED.match(line):
+                flush()
+                i = self.list_block(lines, i, out)
+                continue
+            else:
+                paragraph.append(line)
+            i += 1
+
+        flush()
+        return '\n'.join(out)
+
+    def list_block(self, lines, i, out):
+        """Render the list starting at line ``i``; returns the next line to read"""
+        pattern = ORDERED if ORDERED.match(lines[i]) else BULLET
+        items = []
+        while i < len(lines):
+            line = lines[i]
+            match = pattern.match(line)
+            if match:
+                items.append([match.group(1)])
+            elif line.strip() and not (FENCE.match(line) or HEADING.match(line) or RULE.match(line)
+                                       or QUOTE.match(line) or BULLET.match(line) or ORDERED.match(line)):
+                # Continuation of the previous item
+                items[-1].append(line.strip())
+            else:
+                break
+            i += 1
+
+        tag = 'ol' if pattern is ORDERED else 'ul'
+        rendered = ''.join(f"<li>{self.inline(chr(10).join(item))}</li>" for item in items)
+        out.append(f"<{tag}>{rendered}</{tag}>")
+        return i
+
+    def heading(self, level, text):
+        title = re.sub(r'[`*_]|\[([^\]]*)\]\([^)]*\)', r'\1', text).strip()
+        anchor = self.anchor(title)
+        self.toc.append({'level': level, 'title': title, 'id': anchor})
+        return (
+            f'<h{level} id="{anchor}">{self.inline(text)}'
+            f'<a class="heading-anchor" href="#{anchor}" aria-hidden="true">#</a></h{level}>'
+        )
+
+    def anchor(self, title):
+        base = slugify(title) or 'section'
+        anchor, n = base, 1
+        while anchor in self.ids:
+            n += 1
+            anchor = f"{base}-{n}"
+        self.ids.add(anchor)
+        return anchor
+
+    def code_block(self, code, language):
+        css_class = f' class="language-{html.escape(language)}"' if language else ''
+        if PYGMENTS_AVAILABLE and language:
+            try:
+                lexer = get_lexer_by_name(language, stripnl=False)
+                highlighted = highlight(code, lexer, HtmlFormatter(nowrap=True))
+                return f'<pre class="highlight"><code{css_class}>{highlighted}</code></pre>'
+            except ClassNotFound:
+                pass
+        return f'<pre><code{css_class}>{html.escape(code)}</code></pre>'
+
+    def inline(self, text):
+        stash = []
+
+        def keep(fragment):
+            stash.append(fragment)
+            return f"\x00{len(stash) - 1}\x00"
+
+        text = CODE_SPAN.sub(lambda m: keep(f"<code>{html.escape(m.group(1))}</code>"), text.replace('\x00', ''))
+        text = html.escape(text, quote=False)
+
+        def link(match):
+            # The text is escaped already; the URL is escaped again as an attribute
+            label, url = match.group(1), _safe_url(html.unescape(match.group(2)))
+            if url is None:
+                return label
+            return keep(f'<a href="{html.escape(url)}" rel="nofollow noopener">{self.emphasis(label)}</a>')
+
+        text = LINK.sub(link, text)
+        text = self.emphasis(text)
+        return STASHED.sub(lambda m: stash[int(m.group(1))], text)
+
+    def emphasis(self, text):
+        text = STRONG.sub(lambda m: f"<strong>{m.group(1) or m.group(2)}</strong>", text)
+        return EMPHASIS.sub(lambda m: f"<em>{m.group(1) or m.group(2)}</em>", text)
+
+
+def render_markdown(text):
+    """Sanitized HTML and table of contents ([{level, title, id}]) of ``text``"""
+    return MarkdownRenderer().render(text or '')
+
+
+def render_post(post):
+    """Render the post's content into its stored HTML fields, without saving"""
+    rendered = render_markdown(post.content)
+    post.content_html = rendered['html']
+    post.content_toc = rendered['toc']
+    post.rendered_hash = post.content_hash
+    cache.set(CACHE_KEY.format(post.content_hash), rendered, settings.BLOG_RENDER_CACHE_TIMEOUT)
+
+
+def rendered_content(post):
+    """
+    HTML and table of contents of the post: the stored rendering when it
+    matches the current content, else a rendering cached by content hash
+    until the background job stores it
+    """
+    if post.rendered_hash and post.rendered_hash == post.content_hash:
+        return {'html': post.content_html, 'toc': post.content_toc}
+
+    digest = post.content_hash or content_hash(post.content)
+    key = CACHE_KEY.format(digest)
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = render_markdown(post.content)
+        cache.set(key, rendered, settings.BLOG_RENDER_CACHE_TIMEOUT)
+    return rendered
+
+
+def render_pending_posts(batch_size=100, force=False):
+    """
+    Store the rendering of posts whose content changed since they were last
+    rendered (every post with ``force``). Rows edited again in the meantime
+    are left for the next run. Returns the number of posts rendered.
+    """
+    from .models import Post
+
+    pending = Post.objects.all()
+    if not force:
+        pending = pending.filter(Q(rendered_hash='') | ~Q(rendered_hash=F('content_hash')))
+
+    rendered = 0
+    last_id = 0
+    while True:
+        posts = list(pending.filter(id__gt=last_id).order_by('id').only('id', 'content', 'content_hash')[:batch_size])
+        if not posts:
+            break
+        last_id = posts[-1].id
+        for post in posts:
+            digest = content_hash(post.content)
+            result = render_markdown(post.content)
+            rendered += Post.objects.filter(id=post.id, content_hash=post.content_hash).update(
+                content_hash=digest,
+                rendered_hash=digest,
+                content_html=result['html'],
+                content_toc=result['toc'],
+            )
+    return rendered
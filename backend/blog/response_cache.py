@@ -0,0 +1,336 @@
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'blog:response'
+VERSION_PREFIX = 'blog:dep'
+
+
+class CacheStats:
+    """Process-local hit/miss counters reported by /health/"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {'hits': 0, 'stale_hits': 0, 'local_hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0}
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def metrics(self):
+        with self._lock:
+            counts = dict(self.counts)
+        served = counts['hits'] + counts['stale_hits'] + counts['local_hits']
+        lookups = served + counts['misses']
+        counts['hit_ratio'] = round(served / lookups, 4) if lookups else None
+        return counts
+
+
+stats = CacheStats()
+
+
+def is_cacheable(request):
+    return (
+        settings.BLOG_RESPONSE_CACHE
+        and request.method == 'GET'
+        and not request.user.is_authenticated
+    )
+
+
+def make_key(request):
+    """
+    Cache key for a request: path, query parameters sorted with empty ones
+    dropped, and the negotiated format (JSON or the browsable API)
+    """
+    params = sorted(
+        (key, value) for key, values in request.query_params.lists() for value in values if value != ''
+    )
+    renderer = getattr(request, 'accepted_renderer', None)
+    raw = f"{request.path}?{urlencode(params)}|{renderer.format if renderer else ''}"
+    return f"{KEY_PREFIX}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def _version_key(dependency):
+    return f"{VERSION_PREFIX}:{dependency}"
+
+
+def current_versions(dependencies):
+    """
+    Versions of ``dependencies``, creating a version for any that has none
+    yet. Returns the versions and the set of dependencies just created.
+    """
+    keys = {_version_key(dep): dep for dep in dependencies}
+    found = cache.get_many(keys)
+    created = set()
+    for key in keys:
+        if key not in found:
+            version = time.time_ns()
+            if cache.add(key, version, None):
+                created.add(keys[key])
+            else:
+                version = cache.get(key)
+            found[key] = version
+    return {keys[key]: version for key, version in found.items()}, created
+
+
+def invalidate(*dependencies):
+    """
+    Give ``dependencies`` new versions once the current transaction commits,
+    which turns every cached response built from them stale
+    """
+    dependencies = set(dependencies)
+    if not dependencies:
+        return
+
+    def bump():
+        version = time.time_ns()
+        cache.set_many({_version_key(dep): version for dep in dependencies}, None)
+        stats.incr('invalidations', len(dependencies))
+
+    transaction.on_commit(bump)
+
+
+def _is_fresh(entry):
+    if entry['expires_at'] < time.time():
+        return False
+    versions = cache.get_many([_version_key(dep) for dep in entry['versions']])
+    return all(versions.get(_version_key(dep)) == version for dep, version in entry['versions'].items())
+
+
+def _to_response(entry, status):
+    response = HttpResponse(entry['content'], status=entry['status'], content_type=entry['content_type'])
+    response['X-Cache'] = status
+    return response
+
+
+def _store(key, response, dependencies, meta, built_at):
+    try:
+        versions, created = current_versions(dependencies)
+        if any(version > built_at for dep, version in versions.items() if dep not in created):
+            # Invalidated while the response was being built, so it may be outdated
+            return
+        entry = {
+            'content': response.rendered_content,
+            'status': response.status_code,
+            'content_type': response['Content-Type'],
+            'versions': versions,
+            'expires_at': time.time() + settings.BLOG_RESPONSE_CACHE_TIMEOUT,
+            'meta': meta,
+        }
+        # Kept past its freshness window so it can be served stale during a rebuild
+        cache.set(key, entry, settings.BLOG_RESPONSE_CACHE_TIMEOUT * 2)
+        stats.incr('stores')
+    except Exception as e:
+        logger.error(f"Error caching response: {str(e)}")
+
+
+def cache_response(dependencies, meta=None, on_hit=None):
+    """
+    Cache a viewset action's rendered response for anonymous readers.
+
+    ``dependencies(view, data)`` returns the invalidation tags the response
+    was built from, e.g. ``{'posts', 'post:3', 'category:1'}``, or None if
+    the response can't be cached. A cached
+    response is served only while none of them has been invalidated, and
+    for at most BLOG_RESPONSE_CACHE_TIMEOUT seconds since counters such as
+    views_count change without invalidation.
+
+    Stampede protection: one request per key rebuilds a missing or stale
+    entry while others serve the stale copy or briefly wait for the new one.
+
+    ``meta(view, data)`` stores extra values with the entry, which are passed
+    to ``on_hit(view, request, meta)`` when the cached response is served.
+    """
+    def decorator(action):
+        @functools.wraps(action)
+        def wrapper(view, request, *args, **kwargs):
+            if not is_cacheable(request):
+                return action(view, request, *args, **kwargs)
+
+            key = make_key(request)
+            lock_key = f"{key}:lock"
+            try:
+                entry = cache.get(key)
+                if entry is not None and _is_fresh(entry):
+                    return _serve(view, request, entry, 'HIT', on_hit)
+
+                # Only one request rebuilds; the rest get the stale copy or wait
+                if not cache.add(lock_key, 1, settings.BLOG_RESPONSE_CACHE_LOCK_TIMEOUT):
+                    if entry is not None:
+                        return _serve(view, request, entry, 'STALE', on_hit)
+                    entry = _wait_for(key)
+                    if entry is not None:
+                        return _serve(view, request, entry, 'HIT', on_hit)
+            except Exception as e:
+                # The cache being down must not take the endpoint with it
+                logger.error(f"Error reading response cache: {str(e)}")
+                return action(view, request, *args, **kwargs)
+
+            stats.incr('misses')
+            built_at = time.time_ns()
+            try:
+                response = action(view, request, *args, **kwargs)
+            except Exception:
+                cache.delete(lock_key)
+                raise
+            if response.status_code != 200:
+                cache.delete(lock_key)
+                return response
+
+            deps = dependencies(view, response.data)
+            if deps is None:
+                # Can't tell what the response was built from, so don't cache it
+                cache.delete(lock_key)
+                return response
+            extra = meta(view, response.data) if meta else None
+
+            def store(rendered):
+                _store(key, rendered, deps, extra, built_at)
+                try:
+                    cache.delete(lock_key)
+                except Exception as e:
+                    logger.error(f"Error releasing response cache lock: {str(e)}")
+
+            response.add_post_render_callback(store)
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def local_snapshot(*dependencies):
+    """
+    Keep a viewset action's rendered response in process memory, for small
+    read-mostly responses such as the tag and category lists.
+
+    Each request reads only the shared versions of ``dependencies`` (one
+    cache lookup) and serves the local copy while they are unchanged, so
+    every process drops its copy as soon as ``invalidate`` bumps one of
+    them. Versions are read before the response is built, so an invalidation
+    during the build leaves the copy stale rather than wrongly fresh. Copies
+    also expire after BLOG_RESPONSE_CACHE_TIMEOUT seconds, which bounds
+    staleness when the cache isn't shared and invalidations made in other
+    processes are never seen. Up to BLOG_LOCAL_SNAPSHOT_MAX_ENTRIES URLs are
+    kept, least recently used out.
+    """
+    def decorator(action):
+        snapshots = OrderedDict()
+        lock = threading.Lock()
+
+        @functools.wraps(action)
+        def wrapper(view, request, *args, **kwargs):
+            if not is_cacheable(request):
+                return action(view, request, *args, **kwargs)
+
+            key = make_key(request)
+            try:
+                versions, _ = current_versions(dependencies)
+            except Exception as e:
+                logger.error(f"Error reading response cache versions: {str(e)}")
+                return action(view, request, *args, **kwargs)
+
+            with lock:
+                entry = snapshots.get(key)
+                if entry is not None and entry['versions'] == versions and entry['expires_at'] >= time.time():
+                    snapshots.move_to_end(key)
+                    stats.incr('local_hits')
+                    return _to_response(entry, 'LOCAL')
+
+            stats.incr('misses')
+            response = action(view, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            def store(rendered):
+                entry = {
+                    'content': rendered.rendered_content,
+                    'status': rendered.status_code,
+                    'content_type': rendered['Content-Type'],
+                    'versions': versions,
+                    'expires_at': time.time() + settings.BLOG_RESPONSE_CACHE_TIMEOUT,
+                }
+                with lock:
+                    snapshots[key] = entry
+                    snapshots.move_to_end(key)
+                    while len(snapshots) > settings.BLOG_LOCAL_SNAPSHOT_MAX_ENTRIES:
+                        snapshots.popitem(last=False)
+                stats.incr('stores')
+
+            response.add_post_render_callback(store)
+            response['X-Cache'] = 'MISS'
+            return response
+
+        wrapper.snapshots = snapshots
+        return wrapper
+    return decorator
+
+
+def _serve(view, request, entry, status, on_hit):
+    stats.incr('hits' if status == 'HIT' else 'stale_hits')
+    if on_hit:
+        on_hit(view, request, entry['meta'])
+    return _to_response(entry, status)
+
+
+def _wait_for(key):
+    """Poll for an entry another request is building, up to the lock wait time"""
+    deadline = time.monotonic() + settings.BLOG_RESPONSE_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and _is_fresh(entry):
+            return entry
+    return None
+
+
+def _related_id(value):
+    # Nested object, or just its primary key in a sparse fieldset
+    return value['id'] if isinstance(value, dict) else value
+
+
+def post_dependencies(post):
+    """
+    Tags of a serialized post: the post itself, its category and its tags.
+    None for sparse fieldsets without the id, which can't be invalidated.
+    """
+    if 'id' not in post:
+        return None
+    deps = {f"post:{post['id']}"}
+    if post.get('category'):
+        deps.add(f"category:{_related_id(post['category'])}")
+    deps.update(f"tag:{_related_id(tag)}" for tag in post.get('tags', []))
+    return deps
+
+
+def post_list_dependencies(view, data):
+    posts = data['results'] if isinstance(data, dict) else data
+    deps = {'posts'}
+    for post in posts:
+        post_deps = post_dependencies(post)
+        if post_deps is None:
+            return None
+        deps |= post_deps
+    return deps
+
+
+def post_detail_dependencies(view, data):
+    return post_dependencies(data)
+
+
+def category_dependencies(view, data):
+    return {'categories'}
+
+
+def tag_dependencies(view, data):
+    return {'tags'}
@@ -0,0 +1,176 @@
+import logging
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .hyperloglog import HyperLogLog
+from .models import Post, PostView, PostViewDaily
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def rollup_start():
+    """
+    First day whose rollups have to be recomputed from raw views, or None if
+    nothing has been rolled up yet. Views are normally recorded for the
+    current day, and the day before the latest rollup is included for views
+    buffered before midnight and flushed after it. Views still written for
+    earlier days are added to their rollups by fold_late_views().
+    """
+    latest = PostViewDaily.objects.aggregate(latest=Max('date'))['latest']
+    return latest - timedelta(days=1) if latest else None
+
+
+def rollup_views():
+    """
+    Fold raw PostView rows into PostViewDaily rollups and refresh
+    views_count of the affected posts. Rollups are recomputed (not
+    incremented), so running this repeatedly or concurrently is safe.
+    Returns the number of post-days written.
+    """
+    start = rollup_start()
+    raw_views = PostView.objects.all()
+    if start is not None:
+        raw_views = raw_views.filter(viewed_on__gte=start)
+    raw_views = raw_views.order_by('post_id', 'viewed_on').values_list('post_id', 'viewed_on', 'ip_address')
+
+    rollups, post_ids, written = [], set(), 0
+    grouped = groupby(raw_views.iterator(chunk_size=5000), key=lambda row: (row[0], row[1]))
+    for (post_id, date), rows in grouped:
+        sketch, views = HyperLogLog(), 0
+        for _, _, ip_address in rows:
+            sketch.add(ip_address)
+            views += 1
+        rollups.append(PostViewDaily(post_id=post_id, date=date, views=views, visitors_sketch=sketch.to_bytes()))
+        post_ids.add(post_id)
+        if len(rollups) >= BATCH_SIZE:
+            written += _save_rollups(rollups)
+            rollups = []
+    written += _save_rollups(rollups)
+
+    refresh_views_count(post_ids)
+    if start is not None:
+        fold_late_views(start)
+    return written
+
+
+def fold_late_views(before):
+    """
+    Add raw views dated before ``before`` that their day's rollup doesn't
+    include: views stored after the day was last rolled up, or for a day
+    never rolled up (backdated rows). Days that old are not recomputed, as
+    their raw views may be pruned already, so the late views are merged
+    into the rollup instead. Returns the number of views folded in.
+    """
+    started = timezone.now()
+    rolled_up_at = PostViewDaily.objects.filter(
+        post=OuterRef('post_id'), date=OuterRef('viewed_on')
+    ).values('updated_at')[:1]
+    late_views = (
+        PostView.objects.filter(viewed_on__lt=before, created_at__lte=started)
+        .annotate(rolled_up_at=Subquery(rolled_up_at))
+        .filter(Q(rolled_up_at__isnull=True) | Q(created_at__gt=F('rolled_up_at')))
+        .values_list('post_id', 'viewed_on', 'ip_address')
+    )
+    late = {}
+    for post_id, date, ip_address in late_views.iterator(chunk_size=5000):
+        entry = late.setdefault((post_id, date), [0, HyperLogLog()])
+        entry[0] += 1
+        entry[1].add(ip_address)
+
+    for (post_id, date), (views, sketch) in late.items():
+        with transaction.atomic():
+            rollup, _ = PostViewDaily.objects.select_for_update().get_or_create(post_id=post_id, date=date)
+            # updated_at marks which raw views the rollup includes
+            PostViewDaily.objects.filter(pk=rollup.pk).update(
+                views=rollup.views + views,
+                visitors_sketch=HyperLogLog.from_bytes(rollup.visitors_sketch).merge(sketch).to_bytes(),
+                updated_at=started,
+            )
+    refresh_views_count({post_id for post_id, _ in late})
+    folded = sum(views for views, _ in late.values())
+    if folded:
+        logger.info(f"Folded {folded} late post views into {len(late)} rollups")
+    return folded
+
+
+def _save_rollups(rollups):
+    if rollups:
+        PostViewDaily.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['post', 'date'],
+            update_fields=['views', 'visitors_sketch', 'updated_at'],
+        )
+    return len(rollups)
+
+
+def refresh_views_count(post_ids):
+    """Set views_count to the sum of the daily rollups"""
+    post_ids = list(post_ids)
+    total_views = (
+        PostViewDaily.objects.filter(post=OuterRef('pk'))
+        .values('post')
+        .annotate(total=Sum('views'))
+        .values('total')
+    )
+    for i in range(0, len(post_ids), BATCH_SIZE):
+        Post.objects.filter(id__in=post_ids[i:i + BATCH_SIZE]).update(
+            views_count=Coalesce(Subquery(total_views), 0)
+        )
+
+
+def prune_views(retention_days=None, batch_size=None):
+    """
+    Delete raw views older than the retention window in batches of
+    ``batch_size`` rows, so no single statement holds locks for long.
+    Views that have not been rolled up yet are never deleted: late and
+    backdated views are folded into their rollups first.
+    Returns the number of rows deleted.
+    """
+    retention_days = settings.BLOG_VIEW_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or settings.BLOG_VIEW_PRUNE_BATCH_SIZE
+
+    start = rollup_start()
+    if start is None:
+        return 0
+    cutoff = min(timezone.localdate() - timedelta(days=retention_days), start)
+    fold_late_views(cutoff)
+
+    deleted = 0
+    while True:
+        ids = list(
+            PostView.objects.filter(viewed_on__lt=cutoff).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            PostView.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+    return deleted
+
+
+def post_analytics(post, days):
+    """Daily views and estimated unique visitors of ``post`` over the last ``days`` days"""
+    since = timezone.localdate() - timedelta(days=days - 1)
+    visitors = HyperLogLog()
+    daily = []
+    for rollup in post.daily_views.filter(date__gte=since).order_by('date'):
+        visitors.merge(HyperLogLog.from_bytes(rollup.visitors_sketch))
+        daily.append({'date': rollup.date, 'views': rollup.views})
+
+    return {
+        'since': since,
+        'days': days,
+        'views': sum(day['views'] for day in daily),
+        'unique_visitors': visitors.count(),
+        'views_count': post.views_count,
+        'daily': daily,
+    }
@@ -0,0 +1,213 @@
+import logging
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import BaseFilterBackend
+
+logger = logging.getLogger(__name__)
+
+# Column weights: title > excerpt > content
+POSTGRES_SEARCH_COLUMN = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(excerpt, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'C')"
+)
+POSTGRES_QUERY = "websearch_to_tsquery('english', %s)"
+POSTGRES_HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10'
+
+SQLITE_FTS_TABLE = 'blog_post_fts'
+SQLITE_BM25_WEIGHTS = '10.0, 5.0, 1.0'
+SQLITE_TRIGGERS = {
+    'blog_post_fts_insert': """
+        CREATE TRIGGER IF NOT EXISTS blog_post_fts_insert AFTER INSERT ON blog_post BEGIN
+            INSERT INTO blog_post_fts(rowid, title, excerpt, content)
+            VALUES (new.id, new.title, new.excerpt, new.content);
+        END
+    """,
+    'blog_post_fts_delete': """
+        CREATE TRIGGER IF NOT EXISTS blog_post_fts_delete AFTER DELETE ON blog_post BEGIN
+            INSERT INTO blog_post_fts(blog_post_fts, rowid, title, excerpt, content)
+            VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+        END
+    """,
+    'blog_post_fts_update': """
+        CREATE TRIGGER IF NOT EXISTS blog_post_fts_update AFTER UPDATE OF title, excerpt, content ON blog_post BEGIN
+            INSERT INTO blog_post_fts(blog_post_fts, rowid, title, excerpt, content)
+            VALUES ('delete', old.id, old.title, old.excerpt, old.content);
+            INSERT INTO blog_post_fts(rowid, title, excerpt, content)
+            VALUES (new.id, new.title, new.excerpt, new.content);
+        END
+    """,
+}
+
+
+def install_search_index(schema_editor):
+    """
+    Create the full-text index for blog posts.
+
+    Postgres gets a generated, weighted ``search_vector`` tsvector column
+    with a GIN index. SQLite gets an FTS5 table over the post columns kept
+    in sync by triggers. Other databases fall back to LIKE queries.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f"ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({POSTGRES_SEARCH_COLUMN}) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS blog_post_search_vector_idx ON blog_post USING GIN (search_vector)"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+            f"title, excerpt, content, content='blog_post', content_rowid='id', "
+            f"tokenize='porter unicode61')"
+        )
+        install_sqlite_triggers(schema_editor.connection)
+
+
+def remove_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS blog_post_search_vector_idx")
+        schema_editor.execute("ALTER TABLE blog_post DROP COLUMN IF EXISTS search_vector")
+    elif vendor == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}")
+
+
+def install_sqlite_triggers(conn):
+    """
+    (Re)create the FTS sync triggers and rebuild the index if any were
+    missing. SQLite migrations that rebuild blog_post drop its triggers,
+    so this also runs after every migrate (see BlogConfig.ready).
+    Returns True if the index had to be rebuilt.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [SQLITE_FTS_TABLE]
+        )
+        if cursor.fetchone() is None:
+            return False
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'blog_post'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if set(SQLITE_TRIGGERS) <= existing:
+            return False
+        for sql in SQLITE_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+    logger.info("Rebuilt the SQLite full-text index for blog posts")
+    return True
+
+
+def fts5_query(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last
+    one as a prefix so results show up while typing.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_posts(queryset, query):
+    """
+    Filter ``queryset`` to posts matching ``query`` and annotate each with
+    a ``search_rank`` (higher is better).
+    """
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        return queryset.annotate(
+            search_rank=RawSQL(
+                f"ts_rank_cd(blog_post.search_vector, {POSTGRES_QUERY}, 32)", [query], output_field=FloatField()
+            )
+        ).extra(where=[f"blog_post.search_vector @@ {POSTGRES_QUERY}"], params=[query])
+
+    if vendor == 'sqlite':
+        match = fts5_query(query)
+        if match is None:
+            return queryset.none()
+        # bm25() is negative, lower is better; correlated on the FTS rowid
+        return queryset.annotate(
+            search_rank=RawSQL(
+                f"(SELECT -bm25({SQLITE_FTS_TABLE}, {SQLITE_BM25_WEIGHTS}) FROM {SQLITE_FTS_TABLE} "
+                f"WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = blog_post.id)",
+                [match],
+                output_field=FloatField(),
+            )
+        ).extra(
+            where=[f"blog_post.id IN (SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s)"],
+            params=[match],
+        )
+
+    return queryset.filter(
+        Q(title__icontains=query) | Q(excerpt__icontains=query) | Q(content__icontains=query)
+    ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def search_snippets(post_ids, query):
+    """
+    Highlighted content fragments (matches wrapped in <mark>) for a page of
+    search results, computed only for the posts being serialized.
+    """
+    post_ids = list(post_ids)
+    if not post_ids:
+        return {}
+
+    vendor = connection.vendor
+    with connection.cursor() as cursor:
+        if vendor == 'postgresql':
+            cursor.execute(
+                f"SELECT id, ts_headline('english', content, {POSTGRES_QUERY}, %s) "
+                f"FROM blog_post WHERE id = ANY(%s)",
+                [query, POSTGRES_HEADLINE_OPTIONS, post_ids],
+            )
+        elif vendor == 'sqlite':
+            match = fts5_query(query)
+            if match is None:
+                return {}
+            placeholders = ', '.join(['%s'] * len(post_ids))
+            cursor.execute(
+                f"SELECT rowid, snippet({SQLITE_FTS_TABLE}, 2, '<mark>', '</mark>', '…', 24) "
+                f"FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid IN ({placeholders})",
+                [match, *post_ids],
+            )
+        else:
+            return {}
+        return dict(cursor.fetchall())
+
+
+class PostSearchFilter(BaseFilterBackend):
+    """
+    Full-text search on ``?search=``, ranked by relevance.
+
+    Results are ordered by rank unless the client asks for another
+    ordering (``?ordering=relevance`` keeps rank order explicitly).
+    Serializers add a highlighted ``snippet`` to each result.
+    """
+    search_param = 'search'
+    ordering_param = 'ordering'
+
+    @classmethod
+    def get_search_query(cls, request):
+        return request.query_params.get(cls.search_param, '').strip() if request else ''
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+
+        queryset = search_posts(queryset, query)
+        ordering = request.query_params.get(self.ordering_param, '')
+        if not ordering or ordering == 'relevance':
+            queryset = queryset.order_by('-search_rank', '-id')
+        return queryset
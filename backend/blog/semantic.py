@@ -0,0 +1,88 @@
+import logging
+from django.db.models import F, Q
+from django.utils import timezone
+from ai_tutorial.vector_store import VectorStore, get_embedding_model, post_embedding_text
+
+logger = logging.getLogger(__name__)
+
+POST_STORE_NAME = 'posts'
+
+
+def get_post_store():
+    return VectorStore(POST_STORE_NAME)
+
+
+def embed_text(text):
+    """Embed a single string with the shared MiniLM model"""
+    return get_embedding_model().encode([text])[0]
+
+
+def index_post(post):
+    """Store (or refresh) the embedding for a single post"""
+    get_post_store().upsert(post.pk, embed_text(post_embedding_text(post)))
+
+
+def search_post_ids(query, limit):
+    """Return (post_id, score) pairs most similar to ``query``, best first"""
+    return get_post_store().search(embed_text(query), limit)
+
+
+def stale_posts():
+    """Published posts saved since their embedding was computed, or never embedded"""
+    from .models import Post
+
+    return Post.objects.filter(status='published').filter(
+        Q(embedded_at__isnull=True) | Q(embedded_at__lt=F('updated_at'))
+    )
+
+
+def remove_unpublished_posts(chunk_size=10000):
+    """
+    Drop the stored vectors of posts deleted or unpublished since they were
+    embedded, so search doesn't over-fetch around them. Returns the number
+    of vectors removed.
+    """
+    from .models import Post
+
+    store = get_post_store()
+    if not len(store):
+        return 0
+    stored = store.ids().tolist()
+    gone = []
+    for start in range(0, len(stored), chunk_size):
+        chunk = stored[start:start + chunk_size]
+        published = set(Post.objects.filter(id__in=chunk, status='published').values_list('id', flat=True))
+        gone.extend(post_id for post_id in chunk if post_id not in published)
+    removed = store.remove(gone) if gone else 0
+    if removed:
+        logger.info(f"Removed {removed} vectors of unpublished or deleted posts")
+    return removed
+
+
+def index_stale_posts(batch_size=64):
+    """
+    Embed the stale posts batch by batch, off the request path (saving a
+    post only makes it stale), then drop the vectors of posts no longer
+    published. A post saved again while its batch is being encoded stays
+    stale for the next run. Returns the number of posts indexed.
+    """
+    from .models import Post
+
+    store = get_post_store()
+    indexed = 0
+    last_id = 0
+    while True:
+        started = timezone.now()
+        posts = list(
+            stale_posts().filter(id__gt=last_id).order_by('id')
+            .only('id', 'title', 'excerpt', 'content')[:batch_size]
+        )
+        if not posts:
+            break
+        last_id = posts[-1].id
+        vectors = get_embedding_model().encode([post_embedding_text(post) for post in posts])
+        store.upsert_many([post.pk for post in posts], vectors)
+        Post.objects.filter(id__in=[post.id for post in posts], updated_at__lte=started).update(embedded_at=started)
+        indexed += len(posts)
+    remove_unpublished_posts()
+    return indexed
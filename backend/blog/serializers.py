@@ -1,7 +1,15 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.utils.text import slugify
+from django.urls import reverse
+from backend.slugs import save_with_unique_slug, slug_fits
+from backend.sparse_fields import SparseFieldsetMixin, pk_field
 from .models import Post, Category, Tag, Comment, PostLike, PostView
+from .images import srcsets
+from .comments import load_comment_tree, paginate, prune_replies, reply_depth, next_page_url
+from .likes import attach_like_counts, get_like_count
+from .rendering import rendered_content
+from .search import PostSearchFilter, search_snippets
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -11,25 +19,15 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    posts_count = serializers.SerializerMethodField()
-    
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'posts_count', 'created_at']
-    
-    def get_posts_count(self, obj):
-        return obj.posts.filter(status='published').count()
 
 
 class TagSerializer(serializers.ModelSerializer):
-    posts_count = serializers.SerializerMethodField()
-    
     class Meta:
         model = Tag
         fields = ['id', 'name', 'posts_count', 'created_at']
-    
-    def get_posts_count(self, obj):
-        return obj.posts.filter(status='published').count()
 
 
 class CommentSerializer(serializers.ModelSerializer):
@@ -51,52 +49,156 @@ class CommentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class PostListSerializer(serializers.ModelSerializer):
+class CommentThreadSerializer(CommentSerializer):
+    """Comment whose replies come from a tree built in memory by blog.comments"""
+    replies_count = serializers.IntegerField(read_only=True)
+    has_more_replies = serializers.BooleanField(read_only=True)
+    replies_cursor = serializers.CharField(read_only=True, allow_null=True)
+    
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['replies_count', 'has_more_replies', 'replies_cursor']
+    
+    def get_replies(self, obj):
+        return CommentThreadSerializer(obj.thread_replies, many=True, context=self.context).data
+
+
+class PostListSerializerList(serializers.ListSerializer):
+    """Fetches like counts (and search snippets) for the whole page at once"""
+    
+    def to_representation(self, data):
+        posts = list(data.all() if hasattr(data, 'all') else data)
+        attach_like_counts(posts)
+        
+        query = PostSearchFilter.get_search_query(self.context.get('request'))
+        if query and posts and hasattr(posts[0], 'search_rank'):
+            snippets = search_snippets([post.id for post in posts], query)
+            for post in posts:
+                post.search_snippet = snippets.get(post.id, '')
+        return super().to_representation(posts)
+
+
+# Read to build the srcset of the featured image's renditions
+IMAGE_FIELDS = ['featured_image', 'image_source', 'image_renditions']
+
+
+def image_srcset(serializer, obj):
+    return srcsets(obj, serializer.context.get('request'))
+
+
+def sharded_likes_count(obj):
+    # Attached for a whole page by PostListSerializerList; cached per post otherwise
+    if hasattr(obj, 'sharded_likes_count'):
+        return obj.sharded_likes_count
+    return get_like_count(obj.id)
+
+
+class PostListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    comments_count = serializers.SerializerMethodField()
-    reading_time = serializers.ReadOnlyField()
+    likes_count = serializers.SerializerMethodField()
+    featured_image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Post
         fields = [
-            'id', 'title', 'slug', 'author', 'excerpt', 'featured_image',
+            'id', 'title', 'slug', 'author', 'excerpt', 'featured_image', 'featured_image_srcset',
             'category', 'tags', 'status', 'is_featured', 'views_count',
-            'likes_count', 'comments_count', 'reading_time', 'created_at',
+            'likes_count', 'comments_count', 'word_count', 'reading_time', 'created_at',
             'updated_at', 'published_at'
         ]
+        list_serializer_class = PostListSerializerList
+    
+    collapsed_fields = {'author': pk_field(), 'category': pk_field(), 'tags': pk_field(many=True)}
+    field_requirements = {'likes_count': [], 'featured_image_srcset': IMAGE_FIELDS}
+    
+    def get_likes_count(self, obj):
+        return sharded_likes_count(obj)
+    
+    def get_featured_image_srcset(self, obj):
+        return image_srcset(self, obj)
     
-    def get_comments_count(self, obj):
-        return obj.comments.filter(is_approved=True).count()
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Only present on full-text search results
+        if hasattr(instance, 'search_snippet'):
+            data['snippet'] = instance.search_snippet
+            data['search_rank'] = instance.search_rank or 0.0
+        return data
 
 
-class PostDetailSerializer(serializers.ModelSerializer):
+# Read to serve the stored rendering, or render when it's outdated
+RENDERED_FIELDS = ['content', 'content_hash', 'rendered_hash', 'content_html', 'content_toc']
+
+
+class PostDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     comments = serializers.SerializerMethodField()
-    comments_count = serializers.SerializerMethodField()
-    reading_time = serializers.ReadOnlyField()
+    comments_next = serializers.SerializerMethodField()
+    likes_count = serializers.SerializerMethodField()
     is_liked_by_user = serializers.SerializerMethodField()
+    content_html = serializers.SerializerMethodField()
+    toc = serializers.SerializerMethodField()
+    featured_image_srcset = serializers.SerializerMethodField()
     
     class Meta:
         model = Post
         fields = [
-            'id', 'title', 'slug', 'author', 'content', 'excerpt',
-            'featured_image', 'category', 'tags', 'status', 'is_featured',
-            'views_count', 'likes_count', 'comments', 'comments_count',
-            'reading_time', 'is_liked_by_user', 'created_at', 'updated_at',
+            'id', 'title', 'slug', 'author', 'content', 'content_html', 'toc', 'excerpt',
+            'featured_image', 'featured_image_srcset', 'category', 'tags', 'status', 'is_featured',
+            'views_count', 'likes_count', 'comments', 'comments_next', 'comments_count',
+            'word_count', 'reading_time', 'is_liked_by_user', 'created_at', 'updated_at',
             'published_at'
         ]
     
+    collapsed_fields = PostListSerializer.collapsed_fields
+    field_requirements = {
+        'comments': ['slug'], 'comments_next': ['slug'],
+        'likes_count': [], 'is_liked_by_user': [],
+        'content_html': RENDERED_FIELDS, 'toc': RENDERED_FIELDS, 'featured_image_srcset': IMAGE_FIELDS,
+    }
+    
+    def _rendered(self, obj):
+        if not hasattr(obj, '_rendered_content'):
+            obj._rendered_content = rendered_content(obj)
+        return obj._rendered_content
+    
+    def get_content_html(self, obj):
+        return self._rendered(obj)['html']
+    
+    def get_toc(self, obj):
+        return self._rendered(obj)['toc']
+    
+    def _comment_threads(self, obj):
+        """First page of comment threads, loaded with a single query per post"""
+        if not hasattr(obj, '_comment_threads'):
+            request = self.context.get('request')
+            depth = reply_depth(request) if request else settings.BLOG_COMMENT_REPLY_DEPTH
+            roots, _ = load_comment_tree(obj)
+            page, cursor = paginate(roots, limit=settings.BLOG_COMMENT_THREADS_PAGE_SIZE)
+            obj._comment_threads = (prune_replies(page, depth), cursor)
+        return obj._comment_threads
+    
     def get_comments(self, obj):
-        # Get top-level comments (no parent)
-        top_comments = obj.comments.filter(parent=None, is_approved=True).order_by('created_at')
-        return CommentSerializer(top_comments, many=True).data
+        page, _ = self._comment_threads(obj)
+        return CommentThreadSerializer(page, many=True, context=self.context).data
+    
+    def get_comments_next(self, obj):
+        """URL of the next page of threads on the post comments endpoint"""
+        _, cursor = self._comment_threads(obj)
+        request = self.context.get('request')
+        if cursor is None or request is None:
+            return None
+        url = request.build_absolute_uri(reverse('blog:post-comments', kwargs={'slug': obj.slug}))
+        return next_page_url(request, cursor, url=url)
+    
+    def get_likes_count(self, obj):
+        return sharded_likes_count(obj)
     
-    def get_comments_count(self, obj):
-        return obj.comments.filter(is_approved=True).count()
+    def get_featured_image_srcset(self, obj):
+        return image_srcset(self, obj)
     
     def get_is_liked_by_user(self, obj):
         request = self.context.get('request')
@@ -122,42 +224,37 @@ class PostCreateUpdateSerializer(serializers.ModelSerializer):
         
         # Auto-generate slug if not provided
         if not validated_data.get('slug'):
-            title = validated_data.get('title', '')
-            base_slug = slugify(title)
-            slug = base_slug
-            counter = 1
-            
-            # Ensure slug is unique
-            while Post.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            validated_data['slug'] = slug
+            validated_data.pop('slug', None)
+            post = save_with_unique_slug(
+                lambda slug: Post.objects.create(**validated_data, slug=slug),
+                Post.objects.all(), validated_data.get('title', ''),
+            )
+        else:
+            post = Post.objects.create(**validated_data)
         
-        post = Post.objects.create(**validated_data)
         post.tags.set(tags_data)
         return post
     
     def update(self, instance, validated_data):
         tags_data = validated_data.pop('tags', None)
         
-        # Auto-generate slug if title changed and no slug provided
-        if 'title' in validated_data and not validated_data.get('slug'):
-            title = validated_data.get('title', instance.title)
-            base_slug = slugify(title)
-            slug = base_slug
-            counter = 1
-            
-            # Ensure slug is unique (excluding current instance)
-            while Post.objects.filter(slug=slug).exclude(pk=instance.pk).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-            
-            validated_data['slug'] = slug
+        if not validated_data.get('slug'):
+            validated_data.pop('slug', None)
+        title_changed = validated_data.get('title', instance.title) != instance.title
         
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        
+        # Auto-generate slug if title changed and no slug provided; a slug
+        # that still fits the new title is kept, so the post's URL survives
+        if (title_changed and 'slug' not in validated_data
+                and not slug_fits(Post.objects.all(), instance.slug, instance.title)):
+            def save(slug):
+                instance.slug = slug
+                instance.save()
+            save_with_unique_slug(save, Post.objects.all(), instance.title, exclude=instance.pk)
+        else:
+            instance.save()
         
         if tags_data is not None:
             instance.tags.set(tags_data)
@@ -0,0 +1,172 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from .comments import change_comments_count
+from .models import Category, Comment, Post, Tag
+from .popularity import record_on_commit
+from .post_counts import change_category_count, change_tag_counts, published_post_ids
+from .response_cache import invalidate
+
+UNKNOWN = object()
+
+
+@receiver(post_init, sender=Comment)
+def remember_comment_state(sender, instance, **kwargs):
+    """Remember which post the comment counts towards, if any"""
+    # Not known for instances loaded without these columns; reconcile_comment_counts catches those
+    if {'post_id', 'is_approved'} & instance.get_deferred_fields():
+        instance._counted_post_id = UNKNOWN
+    else:
+        instance._counted_post_id = instance.post_id if instance.is_approved and instance.pk else None
+
+
+@receiver(post_save, sender=Comment)
+def update_comments_count(sender, instance, **kwargs):
+    """
+    Keep Post.comments_count and the popularity score in step as comments
+    are added, approved, hidden or moved
+    """
+    counted = instance._counted_post_id
+    now_counted = instance.post_id if instance.is_approved else None
+    if counted is not UNKNOWN and counted != now_counted:
+        change_comments_count(counted, -1)
+        change_comments_count(now_counted, 1)
+        if counted:
+            record_on_commit(counted, -settings.BLOG_POPULARITY_COMMENT_WEIGHT)
+        if now_counted:
+            record_on_commit(now_counted, settings.BLOG_POPULARITY_COMMENT_WEIGHT)
+    instance._counted_post_id = now_counted
+
+
+@receiver(post_delete, sender=Comment)
+def update_deleted_comments_count(sender, instance, origin=None, **kwargs):
+    """Runs in the deletion's transaction, for replies deleted with their parent too"""
+    if getattr(origin, 'model', type(origin)) is Post:
+        # The post is being deleted along with its comments
+        return
+    if instance.is_approved:
+        change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    """Remember what public listings depend on, to tell what a save changed"""
+    # Not known for instances loaded without these columns (sparse fieldsets)
+    if {'status', 'category_id'} & instance.get_deferred_fields():
+        instance._cached_state = None
+    else:
+        instance._cached_state = (instance.status, instance.category_id)
+
+
+@receiver(post_save, sender=Post)
+def update_post_counts(sender, instance, created, **kwargs):
+    """Keep the published post counts of the post's category and tags in step"""
+    if instance._cached_state is None:
+        # Loaded without status or category; reconcile_post_counts catches those
+        return
+    status, category_id = instance._cached_state
+    was_published = status == 'published' and not created
+    published = instance.status == 'published'
+
+    old_category = category_id if was_published else None
+    new_category = instance.category_id if published else None
+    if old_category != new_category:
+        change_category_count(old_category, -1)
+        change_category_count(new_category, 1)
+    # Tags of a new post are counted as they are added
+    if was_published != published and not created:
+        change_tag_counts(instance.tags.values_list('id', flat=True), 1 if published else -1)
+
+
+@receiver(post_save, sender=Post)
+def invalidate_post_responses(sender, instance, created, **kwargs):
+    """Published posts affect post lists; their status and category affect counts"""
+    status, category_id = instance._cached_state or ('published', None)
+    dependencies = {f'post:{instance.id}'}
+    if 'published' in (status, instance.status):
+        dependencies.add('posts')
+        if created or instance._cached_state is None or status != instance.status or category_id != instance.category_id:
+            dependencies |= {'categories', 'tags'}
+    invalidate(*dependencies)
+    instance._cached_state = (instance.status, instance.category_id)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_tags(sender, instance, **kwargs):
+    # The tag links are gone by post_delete
+    if instance.status == 'published':
+        instance._counted_tag_ids = list(instance.tags.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def update_deleted_post_counts(sender, instance, **kwargs):
+    if instance.status == 'published':
+        change_category_count(instance.category_id, -1)
+        change_tag_counts(getattr(instance, '_counted_tag_ids', []), -1)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_responses(sender, instance, **kwargs):
+    dependencies = {f'post:{instance.id}'}
+    if instance.status == 'published':
+        dependencies |= {'posts', 'categories', 'tags'}
+    invalidate(*dependencies)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_tag_counts(sender, instance, action, pk_set, **kwargs):
+    """Count tag links of published posts as they are added and removed, from either side"""
+    is_post = isinstance(instance, Post)
+    if action in ('pre_remove', 'pre_clear'):
+        # remove() reports every id it was given, so look up the links that exist
+        links = Post.tags.through.objects.filter(**{'post_id' if is_post else 'tag_id': instance.id})
+        if pk_set:
+            links = links.filter(**{'tag_id__in' if is_post else 'post_id__in': pk_set})
+        instance._removed_tag_links = list(links.values_list('post_id', 'tag_id'))
+    elif action in ('post_remove', 'post_clear'):
+        _count_tag_links(instance.__dict__.pop('_removed_tag_links', []), -1)
+    elif action == 'post_add':
+        # Only links that were actually added are in pk_set
+        links = [(instance.id, pk) for pk in pk_set] if is_post else [(pk, instance.id) for pk in pk_set]
+        _count_tag_links(links, 1)
+
+
+def _count_tag_links(links, delta):
+    if not links:
+        return
+    published = set(published_post_ids({post_id for post_id, _ in links}))
+    per_tag = Counter(tag_id for post_id, tag_id in links if post_id in published)
+    by_count = {}
+    for tag_id, count in per_tag.items():
+        by_count.setdefault(count, []).append(tag_id)
+    for count, tag_ids in by_count.items():
+        change_tag_counts(tag_ids, delta * count)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_tag_responses(sender, instance, action, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, Post):
+        invalidate(f'post:{instance.id}', 'tags')
+    else:
+        invalidate(f'tag:{instance.id}', 'tags', *(f'post:{pk}' for pk in pk_set or ()))
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_comment_responses(sender, instance, **kwargs):
+    """Comments show up in the post detail and its comments count"""
+    invalidate(f'post:{instance.post_id}')
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    invalidate(f'category:{instance.id}', 'categories')
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag_responses(sender, instance, **kwargs):
+    invalidate(f'tag:{instance.id}', 'tags')
@@ -0,0 +1,309 @@
+"""
+Synthetic data at production scale, for reproducing query plans and load
+tests locally.
+
+Work is split into chunks of posts and tutorials, each generated from its
+own random stream derived from the seed and the chunk number, so the data
+is the same whatever the number of worker processes. Popularity follows a
+power law: authors, categories and tags are picked with Zipf weights, and
+per-post comment, like and view counts are Pareto-distributed, which gives
+the same Zipf-shaped rank/frequency curve with a few very hot posts and a
+long tail of quiet ones.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from ai_tutorial.models import Tutorial, TutorialCategory, TutorialRating, TutorialStep, UserTutorialProgress
+from .models import Category, Comment, Post, PostLike, PostLikeCounter, PostView, Tag, content_metrics
+from .popularity import growth_factor
+from .rendering import content_hash
+
+WORDS = (
+    'python django api query index cache request response database model view serializer '
+    'async worker queue thread process memory latency throughput benchmark profile trace '
+    'deploy container cluster replica shard partition migration schema transaction lock '
+    'react component state hook render layout grid style browser network socket stream '
+    'function class module package test fixture mock assert debug logging error retry '
+    'timeout deadline budget scale load traffic user session token auth permission role'
+).split()
+LANGUAGES = ['python', 'javascript', 'sql', 'bash']
+CATEGORIES = ['Web Development', 'JavaScript', 'Django', 'React', 'CSS', 'Python', 'DevOps', 'Databases']
+TUTORIAL_CATEGORIES = ['Programming', 'Web Development', 'Data Science', 'DevOps', 'Databases']
+TAG_COUNT = 200
+ZIPF_EXPONENT = 1.1
+PARETO_ALPHA = 1.5
+RATING_WEIGHTS = [1, 1, 3, 6, 8]
+
+
+def zipf_cum_weights(n, exponent=ZIPF_EXPONENT):
+    """Cumulative Zipf weights for ``random.choices``: item k is picked in proportion to 1/k^s"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def skewed_count(rng, mean, cap):
+    """Pareto-distributed count averaging ``mean`` before capping: mostly small, a few huge"""
+    # paretovariate(1.5) is >= 1 with mean 3, so (x - 1) / 2 has mean 1
+    return min(cap, int(mean * (rng.paretovariate(PARETO_ALPHA) - 1) / 2))
+
+
+def chunk_rng(seed, kind, index):
+    return random.Random(f'{seed}:{kind}:{index}')
+
+
+def sentence(rng, words):
+    text = ' '.join(rng.choices(WORDS, k=words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def post_content(rng):
+    """Markdown body of a few hundred to a few thousand words, log-normally distributed"""
+    remaining = int(rng.lognormvariate(6.3, 0.6))
+    blocks = []
+    while remaining > 0:
+        roll = rng.random()
+        if roll < 0.1:
+            blocks.append(f"## {sentence(rng, rng.randint(2, 5))[:-1]}")
+        elif roll < 0.15:
+            code = '\n'.join(f"{rng.choice(WORDS)} = {rng.choice(WORDS)}({rng.choice(WORDS)})" for _ in range(rng.randint(2, 8)))
+            blocks.append(f"```{rng.choice(LANGUAGES)}\n{code}\n```")
+        else:
+            words = min(remaining, rng.randint(40, 120))
+            blocks.append(' '.join(sentence(rng, rng.randint(6, 18)) for _ in range(max(1, words // 12))))
+            remaining -= words
+    return '\n\n'.join(blocks)
+
+
+def create_reference_data(prefix, users):
+    """
+    Create the generated users and make sure the categories and tags exist.
+    Returns the ids the chunks pick from, as plain lists that can be sent to
+    worker processes.
+    """
+    User.objects.bulk_create(
+        [User(username=f'{prefix}-user-{i}', email=f'{prefix}-user-{i}@example.com', password='!') for i in range(users)],
+        batch_size=1000,
+    )
+    Category.objects.bulk_create([Category(name=name) for name in CATEGORIES], ignore_conflicts=True)
+    Tag.objects.bulk_create([Tag(name=f'topic-{i}') for i in range(TAG_COUNT)], ignore_conflicts=True)
+    TutorialCategory.objects.bulk_create([TutorialCategory(name=name) for name in TUTORIAL_CATEGORIES], ignore_conflicts=True)
+    return {
+        'user_ids': list(User.objects.filter(username__startswith=f'{prefix}-user-').order_by('id').values_list('id', flat=True)),
+        'category_ids': list(Category.objects.filter(name__in=CATEGORIES).order_by('id').values_list('id', flat=True)),
+        'tag_ids': list(Tag.objects.filter(name__startswith='topic-').order_by('id').values_list('id', flat=True)),
+        'tutorial_category_ids': list(
+            TutorialCategory.objects.filter(name__in=TUTORIAL_CATEGORIES).order_by('id').values_list('id', flat=True)
+        ),
+    }
+
+
+def clear(prefix):
+    """Delete data created by earlier runs with ``prefix``"""
+    Tutorial.objects.filter(slug__startswith=f'{prefix}-tutorial-').delete()
+    # Posts, comments, likes, views, ratings and progress cascade from their users
+    return User.objects.filter(username__startswith=f'{prefix}-user-').delete()[0]
+
+
+def generate_posts(index, options):
+    """
+    Create chunk ``index`` of the posts with their tags, comment threads,
+    likes and views, and popularity scores from that engagement. Returns
+    the number of rows inserted.
+    """
+    rng = chunk_rng(options['seed'], 'posts', index)
+    size = options['batch_size']
+    first = index * size
+    count = min(size, options['posts'] - first)
+    users = options['user_ids']
+    user_weights = zipf_cum_weights(len(users))
+    category_weights = zipf_cum_weights(len(options['category_ids']))
+    tag_weights = zipf_cum_weights(len(options['tag_ids']))
+    now = options['now']
+    days = options['days']
+
+    with transaction.atomic():
+        posts = []
+        for number in range(first, first + count):
+            content = post_content(rng)
+            published = rng.random() < 0.9
+            created_at = now - timedelta(seconds=rng.randrange(days * 86400))
+            posts.append(Post(
+                title=sentence(rng, rng.randint(3, 9))[:-1],
+                slug=f"{options['prefix']}-post-{number}",
+                author_id=rng.choices(users, cum_weights=user_weights)[0],
+                content=content,
+                excerpt=sentence(rng, 20),
+                category_id=rng.choices(options['category_ids'], cum_weights=category_weights)[0],
+                status='published' if published else 'draft',
+                is_featured=rng.random() < 0.02,
+                published_at=created_at if published else None,
+                content_hash=content_hash(content),
+                **content_metrics(content),
+            ))
+        Post.objects.bulk_create(posts)
+
+        tags = []
+        for post in posts:
+            picked = set(rng.choices(options['tag_ids'], cum_weights=tag_weights, k=rng.randint(1, 5)))
+            tags.extend(Post.tags.through(post_id=post.id, tag_id=tag_id) for tag_id in picked)
+        Post.tags.through.objects.bulk_create(tags)
+
+        comments, threads, likes, views = [], [], [], []
+        for post in posts:
+            post.created_at = post.published_at or now - timedelta(days=rng.randrange(days))
+            age_days = max(1, (now - post.created_at).days)
+            if post.status != 'published':
+                continue
+            first_comment = len(comments)
+            _post_comments(rng, post, options, users, comments, threads, age_days)
+
+            likers = rng.sample(users, skewed_count(rng, options['likes_per_post'], len(users)))
+            likes.extend(PostLike(post_id=post.id, user_id=user_id) for user_id in likers)
+            post.likes_count = len(likers)
+
+            # dict rather than set: drops duplicate (ip, day) pairs in a stable order
+            visits = dict.fromkeys(
+                (f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}', rng.randrange(min(age_days, 90)))
+                for _ in range(skewed_count(rng, options['views_per_post'], options['max_views_per_post']))
+            )
+            today = now.date()
+            views.extend(
+                PostView(post_id=post.id, ip_address=ip, viewed_on=today - timedelta(days=ago),
+                         user_id=rng.choice(users) if rng.random() < 0.3 else None)
+                for ip, ago in visits
+            )
+            post.views_count = len(visits)
+            post.popularity_score = _popularity_score(
+                options, post, visits, zip(comments[first_comment:], threads[first_comment:])
+            )
+
+        # auto_now_add overrides timestamps on insert, so they are set afterwards
+        Post.objects.bulk_update(posts, ['created_at', 'likes_count', 'views_count', 'comments_count', 'popularity_score'])
+        Comment.objects.bulk_create(comments)
+        for comment, (parent, created_at) in zip(comments, threads):
+            comment.parent_id = comments[parent].id if parent is not None else None
+            comment.created_at = created_at
+        Comment.objects.bulk_update(comments, ['parent', 'created_at'])
+        PostLike.objects.bulk_create(likes)
+        PostLikeCounter.objects.bulk_create(
+            [PostLikeCounter(post_id=post.id, shard=0, count=post.likes_count) for post in posts if post.likes_count]
+        )
+        PostView.objects.bulk_create(views)
+
+    return len(posts) + len(tags) + len(comments) + len(likes) + len(views)
+
+
+def _post_comments(rng, post, options, users, comments, threads, age_days):
+    """
+    Append the post's comments to ``comments`` and (index of the parent,
+    created_at) of each one to ``threads``. Replies mostly answer the latest comments, which
+    builds the long back-and-forth threads real discussions have.
+    """
+    start = len(comments)
+    created_at = post.created_at
+    for _ in range(skewed_count(rng, options['comments_per_post'], options['max_comments_per_post'])):
+        earlier = len(comments) - start
+        if earlier and rng.random() < 0.6:
+            parent = start + earlier - 1 - min(earlier - 1, int(rng.expovariate(0.5)))
+        else:
+            parent = None
+        created_at = min(created_at + timedelta(minutes=rng.expovariate(1 / (age_days * 60))), options['now'])
+        threads.append((parent, created_at))
+        comments.append(Comment(
+            post_id=post.id,
+            author_id=rng.choice(users),
+            content=' '.join(sentence(rng, rng.randint(5, 20)) for _ in range(rng.randint(1, 4))),
+            is_approved=rng.random() < 0.95,
+        ))
+        post.comments_count += comments[-1].is_approved
+
+
+def _popularity_score(options, post, visits, comments):
+    """
+    Score as blog/popularity.py would have built it event by event: views
+    on their day, approved comments when posted and likes (undated) at
+    publication, each weighted by its growth factor against the epoch
+    """
+    def weight(when):
+        return growth_factor(options['epoch'], when)
+
+    score = settings.BLOG_POPULARITY_LIKE_WEIGHT * post.likes_count * weight(post.created_at)
+    score += settings.BLOG_POPULARITY_VIEW_WEIGHT * sum(
+        weight(options['now'] - timedelta(days=ago)) for _, ago in visits
+    )
+    score += settings.BLOG_POPULARITY_COMMENT_WEIGHT * sum(
+        weight(created_at) for comment, (_, created_at) in comments if comment.is_approved
+    )
+    return score
+
+
+def generate_tutorials(index, options):
+    """
+    Create chunk ``index`` of the tutorials with their steps, ratings and
+    user progress. Returns the number of rows inserted.
+    """
+    rng = chunk_rng(options['seed'], 'tutorials', index)
+    size = options['batch_size']
+    first = index * size
+    count = min(size, options['tutorials'] - first)
+    users = options['user_ids']
+    category_weights = zipf_cum_weights(len(options['tutorial_category_ids']))
+    difficulties = [difficulty for difficulty, _ in Tutorial.DIFFICULTY_CHOICES]
+
+    with transaction.atomic():
+        tutorials = [
+            Tutorial(
+                title=sentence(rng, rng.randint(3, 8))[:-1],
+                slug=f"{options['prefix']}-tutorial-{number}",
+                category_id=rng.choices(options['tutorial_category_ids'], cum_weights=category_weights)[0],
+                description=sentence(rng, 30),
+                difficulty=rng.choice(difficulties),
+                estimated_duration=rng.randrange(10, 180, 5),
+            )
+            for number in range(first, first + count)
+        ]
+        Tutorial.objects.bulk_create(tutorials)
+
+        steps = []
+        for tutorial in tutorials:
+            for number in range(1, rng.randint(3, 12) + 1):
+                steps.append(TutorialStep(
+                    tutorial_id=tutorial.id,
+                    step_number=number,
+                    title=sentence(rng, rng.randint(2, 6))[:-1],
+                    content=' '.join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(3, 10))),
+                    code_example=f"{rng.choice(WORDS)}({rng.choice(WORDS)})" if rng.random() < 0.5 else '',
+                ))
+        TutorialStep.objects.bulk_create(steps)
+        step_ids = {}
+        for step in steps:
+            step_ids.setdefault(step.tutorial_id, []).append(step.id)
+
+        ratings, progress = [], []
+        for tutorial in tutorials:
+            for user_id in rng.sample(users, skewed_count(rng, options['ratings_per_tutorial'], len(users))):
+                ratings.append(TutorialRating(
+                    tutorial_id=tutorial.id,
+                    user_id=user_id,
+                    rating=rng.choices(range(1, 6), weights=RATING_WEIGHTS)[0],
+                ))
+            ids = step_ids[tutorial.id]
+            for user_id in rng.sample(users, skewed_count(rng, options['progress_per_tutorial'], len(users))):
+                # Learners drop off: most stop after the first few steps
+                done = ids[:min(len(ids), int(rng.expovariate(1 / 3)))]
+                complete = len(done) == len(ids)
+                progress.append(UserTutorialProgress(
+                    tutorial_id=tutorial.id,
+                    user_id=user_id,
+                    completed_steps=done,
+                    progress_percentage=round(100 * len(done) / len(ids), 2),
+                    completed_at=options['now'] if complete else None,
+                ))
+        TutorialRating.objects.bulk_create(ratings)
+        UserTutorialProgress.objects.bulk_create(progress)
+
+    return len(tutorials) + len(steps) + len(ratings) + len(progress)
@@ -0,0 +1,104 @@
+from celery import shared_task
+import logging
+from .comments import reconcile_comment_counts
+from .images import process_pending_images
+from .likes import reconcile_like_counts
+from .popularity import rescale
+from .rendering import render_pending_posts
+from .rollups import prune_views, rollup_views
+from .semantic import index_stale_posts
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def rollup_post_views_task():
+    """
+    Periodic task: fold raw post views into daily rollups and prune raw
+    views older than BLOG_VIEW_RETENTION_DAYS
+    """
+    try:
+        rolled_up = rollup_views()
+        pruned = prune_views()
+        logger.info(f"Rolled up {rolled_up} post-days of views, pruned {pruned} raw views")
+        return {'status': 'success', 'rolled_up': rolled_up, 'pruned': pruned}
+    except Exception as e:
+        logger.error(f"Error rolling up post views: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
+@shared_task
+def reconcile_like_counts_task():
+    """
+    Periodic task: repair like counter shards that drifted from PostLike
+    """
+    try:
+        fixed = reconcile_like_counts()
+        if fixed:
+            logger.warning(f"Reconciled like counts of {fixed} posts")
+        return {'status': 'success', 'fixed': fixed}
+    except Exception as e:
+        logger.error(f"Error reconciling like counts: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
+@shared_task
+def reconcile_comment_counts_task():
+    """
+    Periodic task: repair stored post comment counts that drifted from the
+    approved comments
+    """
+    try:
+        fixed = reconcile_comment_counts()
+        if fixed:
+            logger.warning(f"Reconciled comment counts of {fixed} posts")
+        return {'status': 'success', 'fixed': fixed}
+    except Exception as e:
+        logger.error(f"Error reconciling comment counts: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
+@shared_task
+def rescale_popularity_task():
+    """
+    Periodic task: move the popularity epoch forward so scores stay in range
+    """
+    try:
+        factor = rescale()
+        return {'status': 'success', 'factor': factor}
+    except Exception as e:
+        logger.error(f"Error rescaling popularity scores: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
+@shared_task
+def render_posts_task():
+    """
+    Periodic task: store the HTML of posts too large to render on save
+    """
+    try:
+        rendered = render_pending_posts()
+        return {'status': 'success', 'rendered': rendered}
+    except Exception as e:
+        logger.error(f"Error rendering posts: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
+@shared_task
+def process_images_task():
+    """
+    Periodic task: resize new featured images into responsive renditions
+    """
+    try:
+        processed = process_pending_images()
+        return {'status': 'success', 'processed': processed}
+    except Exception as e:
+        logger.error(f"Error processing featured images: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
+@shared_task
+def index_posts_task():
+    """
+    Periodic task: embed posts published or edited since they were last
+    embedded, for semantic search
+    """
+    try:
+        indexed = index_stale_posts()
+        return {'status': 'success', 'indexed': indexed}
+    except Exception as e:
+        logger.error(f"Error indexing posts for semantic search: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
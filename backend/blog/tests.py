@@ -1,3 +1,1021 @@
-from django.test import TestCase
+from datetime import timedelta
+import json
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ai_tutorial.models import Tutorial, TutorialStep
+from ai_tutorial.vector_store import normalize, post_embedding_text
+from backend.slugs import unique_slug
+from backend.test_runner import CacheClearingTestCase
+
+from .comments import reconcile_comment_counts
+from .hyperloglog import HyperLogLog
+from .images import process_pending_images
+from .likes import reconcile_like_counts
+from .models import Category, Comment, PopularityEpoch, Post, PostLike, PostLikeCounter, PostView, Tag
+from .popularity import apply_scores, get_epoch, rescale
+from .rendering import render_pending_posts
+from .response_cache import stats as response_cache_stats
+from .rollups import prune_views, rollup_views
+from .semantic import get_post_store, index_stale_posts
+from .view_counter import ViewCounter, view_counter
+
+
+class PostListQueryBudgetTest(CacheClearingTestCase):
+    """Post list endpoints must not issue queries per post"""
+
+    endpoints = [
+        '/blog/api/posts/',
+        '/blog/api/posts/featured/',
+        '/blog/api/posts/popular/',
+        '/blog/api/posts/recent/',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.categories = [Category.objects.create(name=f'Category {i}') for i in range(3)]
+        self.tags = [Tag.objects.create(name=f'tag-{i}') for i in range(4)]
+
+    def create_posts(self, count):
+        start = Post.objects.count()
+        for i in range(start, start + count):
+            post = Post.objects.create(
+                title=f'Post {i}',
+                slug=f'post-{i}',
+                author=self.author,
+                content='word ' * 300,
+                category=self.categories[i % len(self.categories)],
+                status='published',
+                is_featured=True,
+            )
+            post.tags.set(self.tags[:1 + i % len(self.tags)])
+            comment = Comment.objects.create(post=post, author=self.author, content='First')
+            Comment.objects.create(post=post, author=self.author, content='Reply', parent=comment)
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_is_independent_of_page_size(self):
+        self.create_posts(2)
+        small = {url: self.count_queries(url) for url in self.endpoints}
+
+        self.create_posts(10)
+        large = {url: self.count_queries(url) for url in self.endpoints}
+
+        self.assertEqual(small, large)
+
+    def test_counts_come_from_annotations(self):
+        self.create_posts(3)
+        Post.objects.create(
+            title='Draft', slug='draft', author=self.author, content='draft',
+            category=self.categories[0], status='draft',
+        )
+
+        response = self.client.get('/blog/api/posts/')
+        post = next(p for p in response.json()['results'] if p['slug'] == 'post-0')
+
+        self.assertEqual(post['comments_count'], 2)
+        self.assertEqual(post['category']['posts_count'], 1)
+        self.assertEqual(post['tags'][0]['posts_count'], 3)
+
+    def test_content_metrics_are_stored_and_lists_skip_the_body(self):
+        self.create_posts(1)
+        post = Post.objects.get(slug='post-0')
+        self.assertEqual((post.word_count, post.reading_time), (300, 2))
+        post.content = 'word ' * 1000
+        post.save(update_fields=['content'])
+        self.assertEqual(Post.objects.values_list('reading_time', flat=True).get(pk=post.pk), 5)
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            data = self.client.get('/blog/api/posts/').json()
+        self.assertEqual(data['results'][0]['reading_time'], 5)
+        post_query = next(q['sql'] for q in context.captured_queries if 'FROM "blog_post"' in q['sql'])
+        self.assertNotIn('"blog_post"."content"', post_query)
+
+
+class CommentThreadTest(CacheClearingTestCase):
+    """Post detail loads comment threads with a bounded number of queries"""
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.post = Post.objects.create(
+            title='Post', slug='post', author=self.author, content='content', status='published'
+        )
+
+    def create_thread(self, replies):
+        root = Comment.objects.create(post=self.post, author=self.author, content='Root')
+        parent = root
+        for i in range(replies):
+            parent = Comment.objects.create(post=self.post, author=self.author, content=f'Reply {i}', parent=parent)
+        return root
+
+    def count_queries(self, url, ip_address):
+        # A new address each time so every request records a view the same way
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, REMOTE_ADDR=ip_address)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.json()
+
+    def test_detail_query_count_is_independent_of_comment_count(self):
+        self.create_thread(replies=2)
+        small, _ = self.count_queries('/blog/api/posts/post/', '10.0.0.1')
+
+        for _ in range(10):
+            self.create_thread(replies=4)
+        large, data = self.count_queries('/blog/api/posts/post/', '10.0.0.2')
+
+        self.assertEqual(small, large)
+        self.assertEqual(len(data['comments']), 11)
+
+    def test_threads_and_replies_are_cursor_paginated(self):
+        with self.settings(BLOG_COMMENT_THREADS_PAGE_SIZE=2, BLOG_COMMENT_REPLIES_PAGE_SIZE=2):
+            roots = [self.create_thread(replies=0) for _ in range(3)]
+            for i in range(3):
+                Comment.objects.create(post=self.post, author=self.author, content=f'Child {i}', parent=roots[0])
+
+            first = self.client.get('/blog/api/posts/post/comments/?depth=1').json()
+            self.assertEqual([c['id'] for c in first['results']], [r.id for r in roots[:2]])
+            thread = first['results'][0]
+            self.assertEqual(len(thread['replies']), 2)
+            self.assertTrue(thread['has_more_replies'])
+
+            second = self.client.get(first['next']).json()
+            self.assertEqual([c['id'] for c in second['results']], [roots[2].id])
+            self.assertIsNone(second['next'])
+
+            more = self.client.get(
+                f"/blog/api/comments/{thread['id']}/replies/?cursor={thread['replies_cursor']}"
+            ).json()
+            self.assertEqual([c['content'] for c in more['results']], ['Child 2'])
+
+
+class ViewCounterTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', slug=f'post-{i}', author=self.author, content='x', status='published')
+            for i in range(2)
+        ]
+
+    def test_views_are_buffered_and_flushed_in_one_batch(self):
+        counter = ViewCounter()
+        self.assertTrue(counter.record(self.posts[0].id, '10.0.0.1'))
+        self.assertFalse(counter.record(self.posts[0].id, '10.0.0.1'))
+        counter.record(self.posts[0].id, '10.0.0.2')
+        counter.record(self.posts[1].id, '10.0.0.1')
+
+        self.assertEqual(PostView.objects.count(), 0)
+        self.assertEqual(counter.metrics()['buffered_views'], 3)
+
+        self.assertEqual(counter.flush(), 3)
+        self.assertEqual(
+            list(Post.objects.order_by('slug').values_list('views_count', flat=True)), [2, 1]
+        )
+        self.assertEqual(counter.metrics()['buffered_views'], 0)
+
+    @override_settings(BLOG_VIEW_FLUSH_INTERVAL=5)
+    def test_exit_flush_is_registered_once_across_flusher_restarts(self):
+        counter = ViewCounter()
+        with mock.patch('blog.view_counter.threading.Thread') as thread, \
+                mock.patch('blog.view_counter.atexit.register') as register:
+            thread.return_value.is_alive.return_value = False
+            counter._ensure_flusher()
+            counter._ensure_flusher()
+        self.assertEqual(thread.return_value.start.call_count, 2)
+        register.assert_called_once_with(counter._flush_at_exit)
+
+    def test_views_already_stored_by_another_process_are_not_recounted(self):
+        first, second = ViewCounter(), ViewCounter()
+        first.record(self.posts[0].id, '10.0.0.1')
+        second.record(self.posts[0].id, '10.0.0.1')
+
+        self.assertEqual(first.flush(), 1)
+        self.assertEqual(second.flush(), 0)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).views_count, 1)
+
+    def test_retrieve_buffers_the_view(self):
+        self.client.get('/blog/api/posts/post-0/', REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(PostView.objects.count(), 0)
+
+
+class ViewRollupTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.post = Post.objects.create(title='Post', slug='post', author=self.author, content='x', status='published')
+
+    def add_views(self, days_ago, visitors):
+        viewed_on = timezone.localdate() - timedelta(days=days_ago)
+        PostView.objects.bulk_create(
+            PostView(post=self.post, ip_address=f'10.0.{i // 250}.{i % 250}', viewed_on=viewed_on)
+            for i in range(visitors)
+        )
+
+    def test_rollups_serve_views_count_and_analytics(self):
+        self.add_views(days_ago=1, visitors=40)
+        self.add_views(days_ago=0, visitors=60)
+
+        self.assertEqual(rollup_views(), 2)
+        self.assertEqual(rollup_views(), 2)  # recomputed, not double counted
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 100)
+
+        self.client.force_login(self.author)
+        data = self.client.get('/blog/api/posts/post/analytics/?days=7').json()
+        self.assertEqual(data['views'], 100)
+        self.assertEqual([day['views'] for day in data['daily']], [40, 60])
+        # The same 60 addresses visited on both days
+        self.assertAlmostEqual(data['unique_visitors'], 60, delta=2)
+
+    def test_old_raw_views_are_pruned_after_rollup(self):
+        self.add_views(days_ago=40, visitors=30)
+        self.add_views(days_ago=0, visitors=5)
+
+        self.assertEqual(prune_views(retention_days=30), 0)  # nothing rolled up yet
+        rollup_views()
+        self.assertEqual(prune_views(retention_days=30, batch_size=7), 30)
+
+        self.assertEqual(PostView.objects.count(), 5)
+        rollup_views()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).views_count, 35)
+
+    def test_late_and_backdated_views_survive_pruning(self):
+        self.add_views(days_ago=40, visitors=3)
+        rollup_views()
+        self.add_views(days_ago=0, visitors=2)
+        rollup_views()  # day 40 is before rollup_start() now
+        PostView.objects.create(post=self.post, ip_address='10.9.0.1', viewed_on=timezone.localdate() - timedelta(days=40))
+        PostView.objects.create(post=self.post, ip_address='10.9.0.2', viewed_on=timezone.localdate() - timedelta(days=50))
+
+        self.assertEqual(prune_views(retention_days=30), 5)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).views_count, 7)
+        rollup_views()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).views_count, 7)
+
+    def test_sketches_are_compact(self):
+        sketch = HyperLogLog().update(range(20))
+        self.assertLess(len(sketch.to_bytes()), 100)
+        self.assertEqual(HyperLogLog.from_bytes(sketch.to_bytes()).count(), sketch.count())
+
+
+class LikeCounterTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.post = Post.objects.create(title='Post', slug='post', author=self.author, content='x', status='published')
+        self.users = [User.objects.create_user(username=f'reader{i}', password='password') for i in range(3)]
+
+    def like(self, user):
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/blog/api/posts/post/like/').json()
+
+    def test_like_toggles_and_counts_are_summed_from_shards(self):
+        for user in self.users:
+            self.assertTrue(self.like(user)['liked'])
+        data = self.like(self.users[0])
+
+        self.assertFalse(data['liked'])
+        self.assertEqual(data['likes_count'], 2)
+        # The stored count for ordering waits for the reconcile pass
+        self.assertEqual(Post.objects.get(pk=self.post.pk).likes_count, 0)
+        self.assertEqual(reconcile_like_counts(), 0)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).likes_count, 2)
+        self.assertEqual(self.client.get('/blog/api/posts/post/').json()['likes_count'], 2)
+        self.assertEqual(self.client.get('/blog/api/posts/').json()['results'][0]['likes_count'], 2)
+
+    def test_reconciliation_fixes_drift(self):
+        for user in self.users:
+            self.like(user)
+        PostLike.objects.filter(user=self.users[0]).delete()
+        PostLikeCounter.objects.create(post=self.post, shard=99, count=5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reconcile_like_counts(), 1)
+        self.assertEqual(reconcile_like_counts(), 0)
+        self.assertEqual(list(self.post.like_counters.values_list('shard', 'count')), [(0, 2)])
+        self.assertEqual(Post.objects.get(pk=self.post.pk).likes_count, 2)
+        self.assertEqual(self.client.get('/blog/api/posts/post/').json()['likes_count'], 2)
+
+
+class PostSearchTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.posts = {}
+        for slug, title, content in [
+            ('django-orm', 'Optimizing the Django ORM', 'Use select_related and prefetch_related.'),
+            ('react-hooks', 'React hooks', 'Hooks replace classes. Mentions django once.'),
+            ('cooking', 'Pasta', 'Boil water and add salt.'),
+        ]:
+            self.posts[slug] = Post.objects.create(
+                title=title, slug=slug, author=self.author, content=content, status='published'
+            )
+
+    def search(self, query, **params):
+        return self.client.get('/blog/api/posts/', {'search': query, **params}).json()['results']
+
+    def test_results_are_ranked_with_snippets(self):
+        results = self.search('django')
+
+        self.assertEqual([r['slug'] for r in results], ['django-orm', 'react-hooks'])
+        self.assertGreater(results[0]['search_rank'], results[1]['search_rank'])
+        self.assertIn('<mark>django</mark>', results[1]['snippet'])
+
+    def test_index_follows_updates_and_deletes(self):
+        post = self.posts['cooking']
+        post.title = 'Django pasta'
+        post.save()
+        self.posts['django-orm'].delete()
+
+        self.assertEqual(
+            sorted(r['slug'] for r in self.search('djang', ordering='relevance')), ['cooking', 'react-hooks']
+        )
+        self.assertEqual(self.search('"; DROP TABLE'), [])
+
+
+@override_settings(BLOG_POPULARITY_HALF_LIFE_HOURS=24)
+class PopularityTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.posts = [
+            Post.objects.create(title=f'Post {i}', slug=f'post-{i}', author=self.author, content='x', status='published')
+            for i in range(3)
+        ]
+
+    def popular(self):
+        cache.clear()  # score updates don't invalidate cached responses
+        return [p['slug'] for p in self.client.get('/blog/api/posts/popular/').json()]
+
+    def test_recent_engagement_outweighs_older_engagement(self):
+        counter = ViewCounter()
+        for i in range(3):
+            counter.record(self.posts[0].id, f'10.0.0.{i}')
+        counter.add_score(self.posts[1].id, 2)
+        counter.flush()
+        self.assertEqual(self.popular(), ['post-0', 'post-1', 'post-2'])
+
+        # One half-life later a single like counts as much as four views did
+        PopularityEpoch.objects.filter(pk=1).update(started_at=get_epoch() - timedelta(hours=24))
+        apply_scores({self.posts[2].id: 2})
+        self.assertEqual(self.popular(), ['post-2', 'post-0', 'post-1'])
+
+        self.assertAlmostEqual(rescale(), 0.5, places=3)
+        self.assertEqual(self.popular(), ['post-2', 'post-0', 'post-1'])
+        self.assertAlmostEqual(Post.objects.get(slug='post-2').popularity_score, 2, places=2)
+
+    def test_increments_computed_before_a_rescale_are_retried(self):
+        stale_epoch = get_epoch()
+        PopularityEpoch.objects.filter(pk=1).update(started_at=stale_epoch - timedelta(hours=24))
+        apply_scores({self.posts[0].id: 1})
+        rescale()
+        # The first attempt read the epoch from before the rescale
+        with mock.patch('blog.popularity.get_epoch', side_effect=[stale_epoch - timedelta(hours=24), get_epoch()]):
+            apply_scores({self.posts[0].id: 1})
+        self.assertAlmostEqual(Post.objects.get(slug='post-0').popularity_score, 2, places=2)
+
+    @override_settings(BLOG_VIEW_BUFFERING=False)
+    def test_unbuffered_views_and_approved_comments_count(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get('/blog/api/posts/post-0/')
+        self.assertAlmostEqual(Post.objects.get(slug='post-0').popularity_score, 1, places=2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(post=self.posts[1], author=self.author, content='x', is_approved=False)
+        self.assertAlmostEqual(Post.objects.get(slug='post-1').popularity_score, 0, places=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.is_approved = True
+            comment.save()
+        self.assertAlmostEqual(Post.objects.get(slug='post-1').popularity_score, 3, places=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            comment.is_approved = False
+            comment.save()
+        self.assertAlmostEqual(Post.objects.get(slug='post-1').popularity_score, 0, places=2)
+
+
+class KeysetPaginationTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        for i in range(23):
+            Post.objects.create(
+                title=f'Post {i}', slug=f'post-{i}', author=self.author, content='x',
+                status='draft' if i % 5 == 0 else 'published', views_count=i % 3,
+            )
+
+    def walk(self, url):
+        slugs = []
+        while url:
+            data = self.client.get(url).json()
+            slugs.extend(post['slug'] for post in data['results'])
+            url = data['next']
+        return slugs
+
+    def test_pages_follow_ordering_with_ties_and_nulls(self):
+        self.client.force_login(self.author)
+        for ordering in ['-views_count', 'views_count', '-published_at', 'published_at']:
+            expected = list(
+                Post.objects.order_by(
+                    F(ordering.lstrip('-')).desc(nulls_last=True) if ordering.startswith('-')
+                    else F(ordering).asc(nulls_last=True),
+                    ('-' if ordering.startswith('-') else '') + 'id',
+                ).values_list('slug', flat=True)
+            )
+            self.assertEqual(self.walk(f'/blog/api/posts/?ordering={ordering}&page_size=4'), expected)
+
+    def test_seek_is_a_range_condition_in_index_order(self):
+        cursor = self.client.get('/blog/api/posts/?page_size=2').json()['next']
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(cursor)
+        sql = next(q['sql'] for q in context.captured_queries if 'ORDER BY' in q['sql'])
+        self.assertIn('"blog_post"."created_at" <= ', sql)
+        self.assertNotIn('NULLS LAST', sql.upper())
+        self.assertNotIn('IS NULL', sql.upper())
+
+    def test_count_is_opt_in(self):
+        data = self.client.get('/blog/api/posts/').json()
+        self.assertNotIn('count', data)
+
+        data = self.client.get('/blog/api/posts/?count=true').json()
+        self.assertEqual((data['count'], data['count_is_exact']), (18, True))
+        self.assertNotIn('count=', data['next'])
+
+    def test_cursor_from_another_ordering_is_rejected(self):
+        cursor = self.client.get('/blog/api/posts/?ordering=-views_count&page_size=2').json()['next']
+        response = self.client.get(cursor.replace('ordering=-views_count', 'ordering=likes_count'))
+        self.assertEqual(response.status_code, 404)
+
+
+class ResponseCacheTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.category = Category.objects.create(name='Django')
+        self.posts = [
+            Post.objects.create(
+                title=f'Post {i}', slug=f'post-{i}', author=self.author, content='x',
+                category=self.category, status='published',
+            )
+            for i in range(2)
+        ]
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Cache'), response.json()
+
+    def test_anonymous_reads_are_cached_until_a_dependency_changes(self):
+        self.assertEqual(self.get('/blog/api/posts/')[0], 'MISS')
+        self.assertEqual(self.get('/blog/api/posts/?search=&page_size=10')[0], 'MISS')
+        self.assertEqual(self.get('/blog/api/posts/?page_size=10')[0], 'HIT')
+        self.assertEqual(self.get('/blog/api/posts/post-1/')[0], 'MISS')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.posts[0], author=self.author, content='Hi')
+            Post.objects.create(title='Draft', slug='draft', author=self.author, content='x')
+        self.assertEqual(self.get('/blog/api/posts/post-1/')[0], 'HIT')
+        status, data = self.get('/blog/api/posts/')
+        self.assertEqual(status, 'MISS')
+        self.assertEqual(data['results'][1]['comments_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Python'
+            self.category.save()
+        status, data = self.get('/blog/api/posts/post-1/')
+        self.assertEqual((status, data['category']['name']), ('MISS', 'Python'))
+
+        self.assertGreater(response_cache_stats.metrics()['hit_ratio'], 0)
+
+    def test_cached_detail_hits_still_record_views(self):
+        recorded = view_counter.metrics()['recorded_total']
+        for i in range(3):
+            response = self.client.get('/blog/api/posts/post-0/', REMOTE_ADDR=f'10.0.1.{i}')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(view_counter.metrics()['recorded_total'], recorded + 3)
+
+    def test_authenticated_reads_are_not_cached(self):
+        self.client.force_login(self.author)
+        self.assertIsNone(self.get('/blog/api/posts/')[0])
+
+
+class ConditionalGetTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.reader = User.objects.create_user(username='reader', password='password')
+        self.post = Post.objects.create(
+            title='Post', slug='post', author=self.author, content='x', status='published',
+        )
+        self.url = '/blog/api/posts/post/'
+
+    def etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        return response['ETag']
+
+    def test_unchanged_post_is_not_modified_without_serializing(self):
+        etag = self.etag()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertLessEqual(len(context.captured_queries), 2)
+        self.assertEqual(self.client.get('/blog/api/posts/missing/', HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+    def test_etag_is_shared_across_workers_and_head_requests(self):
+        etag = self.etag()
+        # Another worker starts with an empty local cache
+        cache.clear()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        response = self.client.head(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.client.head(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_comments_and_likes_change_the_etag(self):
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=self.post, author=self.reader, content='Hi')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.etag()
+        self.client.force_login(self.reader)
+        reader_etag = self.etag()
+        self.assertNotEqual(reader_etag, etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'{self.url}like/')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=reader_etag).status_code, 200)
+
+    def test_tag_renames_change_the_etag_and_other_publishes_do_not(self):
+        tag = Tag.objects.create(name='python')
+        self.post.tags.add(tag)
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(title='Other', slug='other', author=self.author, content='x', status='published')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Tag.objects.filter(pk=tag.pk).update(name='python3')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class SparseFieldsetTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.tag = Tag.objects.create(name='django')
+        post = Post.objects.create(
+            title='Post', slug='post', author=self.author, content='x', status='published',
+            category=Category.objects.create(name='Web'),
+        )
+        post.tags.add(self.tag)
+
+    def test_selected_fields_limit_columns_and_relations(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/blog/api/posts/?fields=id,title,author,tags&expand=author')
+        post = response.json()['results'][0]
+        self.assertEqual(set(post), {'id', 'title', 'author', 'tags'})
+        self.assertEqual(post['author']['username'], 'author')
+        self.assertEqual(post['tags'], [self.tag.id])
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('"blog_post"."excerpt"', sql)
+        self.assertNotIn('blog_category', sql)
+        self.assertNotIn('"blog_tag"."created_at"', sql)
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/blog/api/posts/?fields=title,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ['Unknown fields: secret']})
+        self.assertEqual(self.client.get('/blog/api/posts/post/?fields=title,secret').status_code, 400)
+
+
+class PostRenderingTest(CacheClearingTestCase):
+    content = '## Setup\n\nRun <script>alert(1)</script> and [docs](javascript:alert).\n\n```python\nprint("hi")\n```\n'
+
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+
+    def create_post(self, content):
+        return Post.objects.create(title='Post', slug='post', author=self.author, content=content, status='published')
+
+    def test_content_is_rendered_sanitized_on_save(self):
+        post = self.create_post(self.content)
+        self.assertEqual(post.rendered_hash, post.content_hash)
+        self.assertIn('<h2 id="setup">', post.content_html)
+        self.assertIn('&lt;script&gt;', post.content_html)
+        self.assertNotIn('javascript:', post.content_html)
+        self.assertIn(' and docs.', post.content_html)
+        self.assertIn('<pre class="highlight"><code class="language-python">', post.content_html)
+
+        data = self.client.get('/blog/api/posts/post/').json()
+        self.assertEqual(data['content_html'], post.content_html)
+        self.assertEqual(data['toc'], [{'level': 2, 'title': 'Setup', 'id': 'setup'}])
+
+    def test_links_with_control_characters_or_unknown_schemes_are_dropped(self):
+        post = self.create_post(
+            '[a](\x01javascript:alert%281%29) [b](java&#9;script:alert) [c](data:text/html,x) '
+            '[d](/blog/) [e](https://example.com/)'
+        )
+        self.assertNotIn('script:', post.content_html)
+        self.assertNotIn('data:', post.content_html)
+        self.assertIn('<a href="/blog/"', post.content_html)
+        self.assertIn('<a href="https://example.com/"', post.content_html)
+
+    @override_settings(BLOG_RENDER_SYNC_MAX_CHARS=10)
+    def test_large_posts_are_rendered_by_the_job(self):
+        post = self.create_post(self.content)
+        self.assertEqual(post.content_html, '')
+        self.assertIn('<h2 id="setup">', self.client.get('/blog/api/posts/post/').json()['content_html'])
+
+        self.assertEqual(render_pending_posts(), 1)
+        post.refresh_from_db()
+        self.assertEqual(post.rendered_hash, post.content_hash)
+        self.assertEqual(render_pending_posts(), 0)
+
+
+class SlugAllocationTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='password')
+        self.client.force_login(self.author)
+
+    def create(self, title):
+        response = self.client.post('/blog/api/posts/', {'title': title, 'content': 'x'})
+        self.assertEqual(response.status_code, 201)
+        return Post.objects.latest('id').slug
+
+    def test_duplicate_titles_get_the_next_suffix_in_one_query(self):
+        for slug in ['python-guide', 'python-guide-1', 'python-guide-9', 'python-guide-10', 'python-guide-tips']:
+            Post.objects.create(title='Python guide', slug=slug, author=self.author, content='x')
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(unique_slug(Post.objects.all(), 'Python Guide'), 'python-guide-11')
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(self.create('Python Guide'), 'python-guide-11')
+        self.assertEqual(self.create('Fresh title'), 'fresh-title')
+        self.assertEqual(self.create('Fresh title'), 'fresh-title-1')
+
+    def test_zero_padded_and_overlong_counters_are_ignored(self):
+        for slug in ['guide', 'guide-2', 'guide-010', 'guide-12345678901']:
+            Post.objects.create(title='Guide', slug=slug, author=self.author, content='x')
+        self.assertEqual(unique_slug(Post.objects.all(), 'Guide'), 'guide-3')
+
+    def test_editing_keeps_a_slug_that_fits_the_title(self):
+        for slug in ['python-guide-1', 'python-guide-5']:
+            Post.objects.create(title='Python guide', slug=slug, author=self.author, content='x')
+        post = Post.objects.get(slug='python-guide-1')
+        url = f'/blog/api/posts/{post.slug}/'
+
+        response = self.client.put(url, {'title': 'Python guide', 'content': 'y'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Post.objects.get(pk=post.pk).slug, 'python-guide-1')
+        self.client.put(url, {'title': 'Python Guide', 'content': 'y'}, content_type='application/json')
+        self.assertEqual(Post.objects.get(pk=post.pk).slug, 'python-guide-1')
+        self.client.put(url, {'title': 'Rust guide', 'content': 'y'}, content_type='application/json')
+        self.assertEqual(Post.objects.get(pk=post.pk).slug, 'rust-guide')
+
+    def test_taken_slug_is_retried(self):
+        Post.objects.create(title='Taken', slug='taken', author=self.author, content='x')
+        slugs = iter(['taken', 'taken-1'])
+        with mock.patch('backend.slugs.unique_slug', side_effect=lambda *args, **kwargs: next(slugs)):
+            self.assertEqual(self.create('Taken'), 'taken-1')
+
+
+class PostExchangeTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username='admin', password='password')
+        self.client.force_login(self.admin)
+        category = Category.objects.create(name='Guides')
+        tag = Tag.objects.create(name='python')
+        for i in range(3):
+            post = Post.objects.create(
+                title=f'Post {i}', slug=f'post-{i}', author=self.admin, content='# Title\n\nword ' * 5,
+                category=category, status='published',
+            )
+            post.tags.add(tag)
+            comment = Comment.objects.create(post=post, author=self.admin, content='First')
+            Comment.objects.create(post=post, author=self.admin, content='Reply', parent=comment)
+
+    def test_export_then_import_round_trips(self):
+        response = self.client.get('/blog/api/posts/export/')
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content)
+        self.assertEqual(len(body.splitlines()), 3)
+
+        Post.objects.all().delete()
+        Category.objects.all().delete()
+        Tag.objects.all().delete()
+        response = self.client.post('/blog/api/posts/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 3)
+
+        post = Post.objects.get(slug='post-1')
+        self.assertEqual(post.category.name, 'Guides')
+        self.assertEqual(list(post.tags.values_list('name', flat=True)), ['python'])
+        self.assertEqual(post.word_count, 15)
+        reply = post.comments.get(content='Reply')
+        self.assertEqual(reply.parent.post_id, post.id)
+
+        response = self.client.post('/blog/api/posts/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.json()['skipped'], 3)
+        response = self.client.post('/blog/api/posts/import/', b'{"title": "x"}\nnot json\n', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+
+    def test_import_rejects_wrong_field_types(self):
+        for record in (
+            b'{"title": "New", "content": "x", "tags": "python"}',
+            b'{"title": "New", "content": "x", "comments": [{"id": "1"}]}',
+            b'{"title": "New", "content": "x", "published_at": 1700000000}',
+            b'{"title": "' + b'x' * 201 + b'", "content": "x"}',
+            b'{"title": "New", "content": "x", "tags": ["' + b'x' * 51 + b'"]}',
+            b'{"title": "!!!", "content": "x"}',
+        ):
+            body = b'{"title": "Valid", "content": "x"}\n' + record
+            response = self.client.post('/blog/api/posts/import/', body, content_type='application/x-ndjson')
+            self.assertEqual(response.status_code, 400)
+            self.assertTrue(response.json()['error'].startswith('Record 2'))
+        self.assertFalse(Post.objects.filter(title__in=['Valid', 'New']).exists())
+
+    def test_database_errors_are_reported_as_bad_input(self):
+        body = b'{"title": "New", "content": "x"}\n'
+        with mock.patch('blog.exchange.Post.tags.through.objects.bulk_create', side_effect=IntegrityError('duplicate key')):
+            response = self.client.post('/blog/api/posts/import/', body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Records 1-1: duplicate key')
+        self.assertFalse(Post.objects.filter(title='New').exists())
+
+
+class LoadDataGeneratorTest(TestCase):
+    def generate(self, **options):
+        call_command(
+            'generate_load_data', users=20, posts=40, tutorials=6, batch_size=15, seed=7,
+            stdout=StringIO(), **options,
+        )
+        return {
+            'comments': list(Post.objects.order_by('slug').annotate(n=Count('comments')).values_list('slug', 'n')),
+            'tags': list(Post.tags.through.objects.order_by('post__slug', 'tag__name').values_list('post__slug', 'tag__name')),
+            'likes': list(Post.objects.order_by('slug').values_list('likes_count', flat=True)),
+            'steps': TutorialStep.objects.count(),
+        }
+
+    def test_same_seed_gives_the_same_consistent_data(self):
+        first = self.generate()
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(Tutorial.objects.count(), 6)
+        self.assertEqual(sum(first['likes']), PostLike.objects.count())
+        self.assertTrue(Comment.objects.filter(parent__isnull=False).exists())
+        self.assertFalse(Post.objects.filter(status='draft', popularity_score__gt=0).exists())
+        hottest = Post.objects.order_by('-popularity_score').first()
+        self.assertGreater(hottest.views_count + hottest.likes_count + hottest.comments_count, 0)
+        self.assertFalse(Comment.objects.exclude(parent__isnull=True).exclude(parent__post=F('post')).exists())
+
+        self.assertEqual(self.generate(clear=True), first)
+
+
+class BenchmarkTest(TestCase):
+    def test_query_regressions_are_reported(self):
+        author = User.objects.create_user(username='author', password='password')
+        Post.objects.create(title='Post', slug='post', author=author, content='x', status='published')
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = f'{directory}/baseline.json'
+            # Two samples are too few to compare latency, so only queries and errors count here
+            options = {
+                'iterations': 2, 'warmup': 0, 'cold_cache': True, 'tolerance': 100, 'baseline': baseline,
+                'stdout': StringIO(),
+            }
+            call_command('benchmark_api', endpoints='posts,post-detail', save_baseline=True, **options)
+            with open(baseline) as f:
+                results = json.load(f)
+            self.assertEqual(set(results), {'in-process:posts', 'in-process:post-detail'})
+            self.assertGreater(results['in-process:post-detail']['queries'], 0)
+
+            results['in-process:post-detail']['queries'] -= 1
+            with open(baseline, 'w') as f:
+                json.dump(results, f)
+            with self.assertRaisesMessage(CommandError, '1 regressions'):
+                call_command('benchmark_api', endpoints='posts,post-detail', fail_on_regression=True, **options)
+        self.assertEqual(User.objects.count(), 1)
+
+
+class CommentCountTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.post = Post.objects.create(title='Post', slug='post', author=self.author, content='x', status='published')
+
+    def comments_count(self):
+        return Post.objects.values_list('comments_count', flat=True).get(id=self.post.id)
+
+    def test_count_follows_approval_and_deletion(self):
+        parent = Comment.objects.create(post=self.post, author=self.author, content='First')
+        Comment.objects.create(post=self.post, author=self.author, content='Reply', parent=parent)
+        pending = Comment.objects.create(post=self.post, author=self.author, content='Spam?', is_approved=False)
+        self.assertEqual(self.comments_count(), 2)
+
+        pending.is_approved = True
+        pending.save()
+        self.assertEqual(self.comments_count(), 3)
+        pending.save()
+        self.assertEqual(self.comments_count(), 3)
+
+        parent.delete()
+        self.assertEqual(self.comments_count(), 1)
+
+        with CaptureQueriesContext(connection) as context:
+            data = self.client.get('/blog/api/posts/').json()
+        self.assertEqual(data['results'][0]['comments_count'], 1)
+        self.assertFalse(any('blog_comment' in query['sql'] for query in context.captured_queries))
+
+    def test_reconcile_fixes_drift(self):
+        Comment.objects.create(post=self.post, author=self.author, content='First')
+        Post.objects.filter(id=self.post.id).update(comments_count=7)
+
+        self.assertEqual(reconcile_comment_counts(), 1)
+        self.assertEqual(self.comments_count(), 1)
+        self.assertEqual(reconcile_comment_counts(), 0)
+
+
+class PostCountTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.author = User.objects.create_user(username='author', password='password')
+        self.categories = [Category.objects.create(name=f'Category {i}') for i in range(2)]
+        self.tags = [Tag.objects.create(name=f'tag-{i}') for i in range(3)]
+
+    def counts(self):
+        return (
+            list(Category.objects.order_by('id').values_list('posts_count', flat=True)),
+            list(Tag.objects.order_by('id').values_list('posts_count', flat=True)),
+        )
+
+    def test_counts_follow_status_category_and_tags(self):
+        post = Post.objects.create(
+            title='Post', slug='post', author=self.author, content='x', category=self.categories[0], status='draft',
+        )
+        post.tags.set(self.tags[:2])
+        self.assertEqual(self.counts(), ([0, 0], [0, 0, 0]))
+
+        post.status = 'published'
+        post.save()
+        self.assertEqual(self.counts(), ([1, 0], [1, 1, 0]))
+
+        post.category = self.categories[1]
+        post.save()
+        post.tags.remove(self.tags[0], self.tags[2])
+        self.tags[2].posts.add(post)
+        self.assertEqual(self.counts(), ([0, 1], [0, 1, 1]))
+
+        post.tags.clear()
+        self.assertEqual(self.counts(), ([0, 1], [0, 0, 0]))
+        post.tags.set(self.tags)
+        post.delete()
+        self.assertEqual(self.counts(), ([0, 0], [0, 0, 0]))
+
+    def test_tag_list_is_served_from_a_local_snapshot_until_invalidated(self):
+        post = Post.objects.create(title='Post', slug='post', author=self.author, content='x', status='published')
+        self.client.get('/blog/api/tags/')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/blog/api/tags/')
+        self.assertEqual(response['X-Cache'], 'LOCAL')
+        self.assertEqual(len(context.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.tags.add(self.tags[1])
+        response = self.client.get('/blog/api/tags/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([tag['posts_count'] for tag in response.json()['results']], [0, 1, 0])
+
+    @override_settings(BLOG_RESPONSE_CACHE_TIMEOUT=0)
+    def test_local_snapshot_expires(self):
+        self.client.get('/blog/api/categories/')
+        with mock.patch('blog.response_cache.time.time', return_value=time.time() + 1):
+            self.assertEqual(self.client.get('/blog/api/categories/')['X-Cache'], 'MISS')
+
+
+class ImageRenditionTest(CacheClearingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=self.media.name)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        self.author = User.objects.create_user(username='author', password='password')
+
+    def upload(self):
+        image = Image.new('RGB', (800, 400), 'red')
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera Maker'
+        output = BytesIO()
+        image.save(output, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', output.getvalue(), content_type='image/jpeg')
+
+    def test_renditions_are_generated_stripped_and_deduplicated(self):
+        first = Post.objects.create(title='One', slug='one', author=self.author, content='x', status='published', featured_image=self.upload())
+        second = Post.objects.create(title='Two', slug='two', author=self.author, content='x', status='published', featured_image=self.upload())
+        upload = second.featured_image.name
+        self.assertNotEqual(first.featured_image.name, upload)
+        self.assertIsNone(self.client.get('/blog/api/posts/one/').json()['featured_image_srcset'])
+
+        self.assertEqual(process_pending_images(), 2)
+        self.assertEqual(process_pending_images(), 0)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        # Identical uploads share renditions but each post keeps its own file
+        self.assertEqual(second.featured_image.name, upload)
+        self.assertEqual(second.image_renditions, first.image_renditions)
+
+        self.assertEqual([(r['width'], r['format']) for r in first.image_renditions], [
+            (320, 'webp'), (320, 'jpeg'), (640, 'webp'), (640, 'jpeg'), (800, 'webp'), (800, 'jpeg'),
+        ])
+        with default_storage.open(first.image_renditions[1]['name']) as f, Image.open(f) as rendition:
+            self.assertEqual(rendition.size, (320, 160))
+            self.assertEqual(len(rendition.getexif()), 0)
+
+        srcset = self.client.get('/blog/api/posts/two/').json()['featured_image_srcset']
+        self.assertEqual(sorted(srcset), ['jpeg', 'webp'])
+        self.assertTrue(srcset['webp'].startswith('http://testserver/media/renditions/'))
+        self.assertTrue(srcset['webp'].endswith('/800.webp 800w'))
+
+
+class SemanticIndexTest(TestCase):
+    class Encoder:
+        def encode(self, texts, **kwargs):
+            return [[float(len(text))] + [1.0] * 383 for text in texts]
+
+    def setUp(self):
+        self.embeddings = tempfile.TemporaryDirectory()
+        self.addCleanup(self.embeddings.cleanup)
+        embeddings_settings = override_settings(EMBEDDINGS_PATH=self.embeddings.name)
+        embeddings_settings.enable()
+        self.addCleanup(embeddings_settings.disable)
+        model = mock.patch('blog.semantic.get_embedding_model', return_value=self.Encoder())
+        model.start()
+        self.addCleanup(model.stop)
+        self.author = User.objects.create_user(username='author', password='password')
+
+    def test_saved_posts_are_embedded_by_the_job(self):
+        post = Post.objects.create(title='Post', slug='post', author=self.author, content='x', status='published')
+        Post.objects.create(title='Draft', slug='draft', author=self.author, content='x', status='draft')
+        self.assertEqual(index_stale_posts(), 1)
+        self.assertEqual(index_stale_posts(), 0)
+
+        post.content = 'Edited'
+        post.save()
+        self.assertEqual(index_stale_posts(), 1)
+        self.assertEqual(list(get_post_store().ids()), [post.id])
+
+    def test_unpublished_and_deleted_posts_leave_the_store(self):
+        posts = [
+            Post.objects.create(title=f'Post {i}', slug=f'post-{i}', author=self.author, content='x' * i, status='published')
+            for i in range(4)
+        ]
+        self.assertEqual(index_stale_posts(), 4)
+        posts[0].status = 'draft'
+        posts[0].save()
+        posts[1].delete()
+        index_stale_posts()
+
+        store = get_post_store()
+        self.assertEqual(sorted(store.ids().tolist()), [posts[2].id, posts[3].id])
+        # Each remaining vector moved along with its id
+        expected = normalize(self.Encoder().encode([post_embedding_text(post) for post in posts]))
+        for post_id, vector in zip(store.ids().tolist(), store.matrix()):
+            self.assertTrue(np.allclose(vector, expected[post_id - posts[0].id], atol=1e-3))
+
+    def test_search_loads_posts_like_the_list(self):
+        post = Post.objects.create(title='Post', slug='post', author=self.author, content='x', status='published')
+        index_stale_posts()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/blog/api/posts/semantic_search/?q=post')
+        self.assertEqual([item['id'] for item in response.json()], [post.id])
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertNotIn('"blog_post"."content_html"', sql)
@@ -0,0 +1,205 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from .models import Post, PostView
+from .popularity import apply_scores
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Write-behind view counter for post detail hits.
+
+    Requests only touch process memory: a (post, ip, day) seen recently is
+    dropped by an LRU, otherwise it is added to a pending buffer. A daemon
+    thread flushes the buffer every BLOG_VIEW_FLUSH_INTERVAL seconds,
+    inserting the new PostView rows with one bulk insert and bumping
+    views_count for all affected posts with one UPDATE, so hot posts no
+    longer serialize on a row lock per request.
+
+    Popularity weights of likes and comments (add_score) are buffered the
+    same way and applied with the views' weights in the same transaction.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()
+        self._pending = {}
+        self._pending_scores = Counter()
+        self._oldest_pending = None
+        self._thread = None
+        self._thread_pid = None
+        # Forked workers inherit the registration along with the flag
+        self._exit_flush_registered = False
+
+        self.recorded_total = 0
+        self.deduplicated_total = 0
+        self.flushed_total = 0
+        self.flush_errors = 0
+        self.last_flush_at = None
+        self.last_flush_seconds = None
+
+    def record(self, post_id, ip_address, user_id=None):
+        """Buffer a view; returns False if it was deduplicated in memory"""
+        key = (post_id, ip_address, timezone.localdate())
+        with self._lock:
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                self.deduplicated_total += 1
+                return False
+
+            self._recent[key] = None
+            if len(self._recent) > settings.BLOG_VIEW_DEDUPE_SIZE:
+                self._recent.popitem(last=False)
+
+            self._pending[key] = user_id
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+            self.recorded_total += 1
+
+        self._ensure_flusher()
+        return True
+
+    def add_score(self, post_id, weight):
+        """Buffer a popularity weight for the post"""
+        with self._lock:
+            self._pending_scores[post_id] += weight
+            if self._oldest_pending is None:
+                self._oldest_pending = time.monotonic()
+        self._ensure_flusher()
+
+    def flush(self):
+        """Write all buffered views to the database; returns the number of new views"""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            scores, self._pending_scores = self._pending_scores, Counter()
+            self._oldest_pending = None
+        if not batch and not scores:
+            return 0
+
+        started = time.monotonic()
+        try:
+            created = self._write(batch, scores)
+        except Exception as e:
+            # Put the views and scores back so the next flush retries them
+            with self._lock:
+                for key, user_id in batch.items():
+                    self._pending.setdefault(key, user_id)
+                self._pending_scores.update(scores)
+                if self._oldest_pending is None:
+                    self._oldest_pending = started
+            self.flush_errors += 1
+            logger.error(f"Error flushing {len(batch)} buffered post views: {str(e)}")
+            return 0
+
+        self.flushed_total += created
+        self.last_flush_at = time.time()
+        self.last_flush_seconds = time.monotonic() - started
+        return created
+
+    def _write(self, batch, scores=None):
+        post_ids = {post_id for post_id, _, _ in batch}
+        ip_addresses = {ip_address for _, ip_address, _ in batch}
+        dates = {viewed_on for _, _, viewed_on in batch}
+
+        with transaction.atomic():
+            # Skip posts deleted since the view and views another process already stored
+            live_posts = set(Post.objects.filter(id__in=post_ids).values_list('id', flat=True))
+            existing = set(
+                PostView.objects.filter(post_id__in=post_ids, ip_address__in=ip_addresses, viewed_on__in=dates)
+                .values_list('post_id', 'ip_address', 'viewed_on')
+            )
+            new_views = [
+                PostView(post_id=post_id, ip_address=ip_address, viewed_on=viewed_on, user_id=user_id)
+                for (post_id, ip_address, viewed_on), user_id in batch.items()
+                if post_id in live_posts and (post_id, ip_address, viewed_on) not in existing
+            ]
+            PostView.objects.bulk_create(new_views, batch_size=500, ignore_conflicts=True)
+
+            increments = Counter(view.post_id for view in new_views)
+            weights = Counter(scores or {})
+            for post_id, count in increments.items():
+                weights[post_id] += count * settings.BLOG_POPULARITY_VIEW_WEIGHT
+
+            if increments:
+                Post.objects.filter(id__in=increments).update(views_count=F('views_count') + Case(
+                    *[When(id=post_id, then=Value(count)) for post_id, count in increments.items()],
+                    default=Value(0),
+                    output_field=PositiveIntegerField(),
+                ))
+            apply_scores(weights)
+        return len(new_views)
+
+    def metrics(self):
+        """Buffer size and flush lag for this process"""
+        with self._lock:
+            buffered = len(self._pending)
+            oldest = self._oldest_pending
+        return {
+            'pid': os.getpid(),
+            'buffered_views': buffered,
+            'flush_lag_seconds': round(time.monotonic() - oldest, 3) if oldest else 0.0,
+            'recorded_total': self.recorded_total,
+            'deduplicated_total': self.deduplicated_total,
+            'flushed_total': self.flushed_total,
+            'flush_errors': self.flush_errors,
+            'last_flush_at': self.last_flush_at,
+            'last_flush_seconds': self.last_flush_seconds,
+        }
+
+    def _ensure_flusher(self):
+        """Start the flusher thread in this process (threads don't survive a fork)"""
+        interval = settings.BLOG_VIEW_FLUSH_INTERVAL
+        if interval <= 0:
+            return
+        if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+            if not self._exit_flush_registered:
+                atexit.register(self._flush_at_exit)
+                self._exit_flush_registered = True
+
+    def _flush_at_exit(self):
+        """Last flush as the process exits, skipped if the database can't be reached anymore"""
+        with self._lock:
+            if not self._pending and not self._pending_scores:
+                return
+        try:
+            connection.ensure_connection()
+            usable = connection.is_usable()
+        except Exception:
+            usable = False
+        if not usable:
+            logger.warning(f"Dropping {len(self._pending)} buffered post views at exit: no usable database connection")
+            return
+        self.flush()
+
+    def _run(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"View counter flusher error: {str(e)}")
+            finally:
+                close_old_connections()
+
+
+# Process-wide counter used by PostViewSet.retrieve
+view_counter = ViewCounter()
@@ -2,42 +2,69 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Count, F
+from django.db.models import Q, Count, Exists, F, Max, OuterRef, Subquery, Sum
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.utils import timezone
 import logging
 
-from .models import Post, Category, Tag, Comment, PostLike, PostView
+from backend.conditional import conditional_detail, make_etag
+from backend.ndjson import ImportReport, load_lines, streaming_response
+from backend.pagination import KeysetCursorPagination
+from backend.sparse_fields import SparseFieldsetViewMixin
+from .models import Post, Category, Tag, Comment, PostLike, PostLikeCounter, PostView
 from .serializers import (
     PostListSerializer, PostDetailSerializer, PostCreateUpdateSerializer,
-    CategorySerializer, TagSerializer, CommentSerializer, PostLikeSerializer
+    CategorySerializer, TagSerializer, CommentSerializer, CommentThreadSerializer,
+    PostLikeSerializer
+)
+from .view_counter import view_counter
+from .comments import load_comment_tree, paginate, prune_replies, reply_depth, next_page_url
+from .semantic import search_post_ids
+from .rollups import post_analytics
+from .likes import toggle_like
+from .popularity import record_on_commit
+from .exchange import export_posts, import_posts
+from .search import PostSearchFilter
+from .response_cache import (
+    cache_response, category_dependencies, local_snapshot, post_detail_dependencies,
+    post_list_dependencies, tag_dependencies
 )
 
 logger = logging.getLogger(__name__)
 
 
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.select_related('author', 'category').prefetch_related('tags', 'comments')
+class PostViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.with_related()
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    # PostSearchFilter goes last so it can order results by relevance
+    filter_backends = [DjangoFilterBackend, OrderingFilter, PostSearchFilter]
     filterset_fields = ['category', 'tags', 'status', 'is_featured']
-    search_fields = ['title', 'content', 'excerpt']
-    ordering_fields = ['created_at', 'updated_at', 'published_at', 'views_count', 'likes_count']
+    ordering_fields = ['created_at', 'updated_at', 'published_at', 'views_count', 'likes_count', 'popularity_score']
     ordering = ['-created_at']
+    pagination_class = KeysetCursorPagination
     lookup_field = 'slug'
+    # Actions serialized with PostListSerializer, which never reads the body or its HTML
+    list_actions = ['list', 'featured', 'popular', 'recent', 'semantic_search']
+    # retrieve checks the author before recording a view
+    sparse_required_fields = ['author']
     
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in self.list_actions:
             return PostListSerializer
         elif self.action in ['create', 'update', 'partial_update']:
             return PostCreateUpdateSerializer
         return PostDetailSerializer
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        
+        queryset = self.visible(super().get_queryset())
+        if self.action in self.list_actions:
+            queryset = queryset.defer('content', 'content_html', 'content_toc')
+        return queryset
+    
+    def visible(self, queryset):
         # Filter published posts for non-owners
         if self.request.user.is_anonymous:
             queryset = queryset.filter(status='published')
@@ -48,32 +75,92 @@ class PostViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @cache_response(post_list_dependencies)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @conditional_detail(
+        lambda view, request, slug=None: view.detail_validators(request, slug),
+        on_not_modified=lambda view, request: view._record_view_unless_author(view.conditional_post, request),
+    )
+    @cache_response(
+        post_detail_dependencies,
+        meta=lambda view, data: {'post_id': data['id']},
+        on_hit=lambda view, request, meta: view._record_view(meta['post_id'], request),
+    )
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         
         # Record view if not the author
-        if request.user != instance.author:
-            self._record_view(instance, request)
+        if request.user.id != instance.author_id:
+            self._record_view(instance.id, request)
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
-    def _record_view(self, post, request):
+    def detail_validators(self, request, slug):
+        """
+        ETag of a post detail without serializing it, from database state
+        only so every worker agrees on it: the post row with its author,
+        category, comment activity, like counter shards and the user's like
+        in one query, then its tags. views_count is left out, hence weak.
+        No Last-Modified: likes and tag and category edits have no timestamp
+        to derive it from.
+        """
+        comments = Comment.objects.filter(post=OuterRef('pk')).order_by().values('post')
+        counters = PostLikeCounter.objects.filter(post=OuterRef('pk')).order_by().values('post')
+        annotations = {
+            'comments_updated_at': Subquery(comments.annotate(latest=Max('updated_at')).values('latest')),
+            'comments_total': Subquery(comments.annotate(total=Count('pk')).values('total')),
+            'likes_total': Subquery(counters.annotate(total=Sum('count')).values('total')),
+        }
+        if request.user.is_authenticated:
+            annotations['liked'] = Exists(PostLike.objects.filter(post=OuterRef('pk'), user=request.user))
+        post = self.visible(Post.objects.filter(slug=slug)).values(
+            'id', 'author_id', 'updated_at', 'image_renditions', 'author__username', 'author__first_name',
+            'author__last_name', 'author__email', 'category_id', 'category__name', 'category__description',
+            'category__posts_count',
+        ).annotate(**annotations).first()
+        if post is None:
+            return None
+        
+        self.conditional_post = post
+        tags = list(Tag.objects.filter(posts=post['id']).order_by('id').values_list('id', 'name', 'posts_count'))
+        etag = make_etag(
+            *(post[key] for key in sorted(post)), tags,
+            request.user.id if request.user.is_authenticated else None,
+            sorted(request.query_params.lists()), request.accepted_renderer.format,
+        )
+        return etag, None
+    
+    def _record_view_unless_author(self, post, request):
+        if request.user.id != post['author_id']:
+            self._record_view(post['id'], request)
+    
+    def _record_view(self, post_id, request):
         """Record a view for the post"""
         try:
             # Get IP address
             ip_address = self._get_client_ip(request)
+            user_id = request.user.id if request.user.is_authenticated else None
+            
+            if settings.BLOG_VIEW_BUFFERING:
+                # Deduplicated in memory and written to the database by the flusher
+                view_counter.record(post_id, ip_address, user_id)
+                return
             
             # Create or get view record
             view, created = PostView.objects.get_or_create(
-                post=post,
+                post_id=post_id,
                 ip_address=ip_address,
+                viewed_on=timezone.localdate(),
                 defaults={'user': request.user if request.user.is_authenticated else None}
             )
             
             if created:
                 # Increment view count
-                Post.objects.filter(id=post.id).update(views_count=F('views_count') + 1)
+                Post.objects.filter(id=post_id).update(views_count=F('views_count') + 1)
+                record_on_commit(post_id, settings.BLOG_POPULARITY_VIEW_WEIGHT)
                 
         except Exception as e:
             logger.error(f"Error recording view: {str(e)}")
@@ -88,45 +175,122 @@ class PostViewSet(viewsets.ModelViewSet):
         return ip
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
-    def like(self, request, pk=None):
+    def like(self, request, slug=None):
         """Like or unlike a post"""
         post = self.get_object()
         
+        liked, likes_count = toggle_like(post, request.user)
+        return Response({
+            'liked': liked,
+            'likes_count': likes_count,
+            'message': 'Post liked' if liked else 'Post unliked'
+        })
+    
+    @action(detail=True, methods=['get'])
+    def comments(self, request, slug=None):
+        """Cursor-paginated top-level comment threads, ?cursor=...&depth=N"""
+        post = self.get_object()
+        roots, _ = load_comment_tree(post)
+        page, cursor = paginate(
+            roots, request.query_params.get('cursor'), settings.BLOG_COMMENT_THREADS_PAGE_SIZE
+        )
+        prune_replies(page, reply_depth(request))
+        serializer = CommentThreadSerializer(page, many=True, context={'request': request})
+        return Response({'next': next_page_url(request, cursor), 'results': serializer.data})
+    
+    @action(detail=True, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def analytics(self, request, slug=None):
+        """Daily views and unique visitors from the view rollups, ?days=N"""
+        post = self.get_object()
+        if post.author != request.user and not request.user.is_staff:
+            return Response(
+                {'error': 'Only the author can view post analytics'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+    
         try:
-            like = PostLike.objects.get(post=post, user=request.user)
-            like.delete()
-            # Decrement like count
-            Post.objects.filter(id=post.id).update(likes_count=F('likes_count') - 1)
-            return Response({'liked': False, 'message': 'Post unliked'})
-        except PostLike.DoesNotExist:
-            PostLike.objects.create(post=post, user=request.user)
-            # Increment like count
-            Post.objects.filter(id=post.id).update(likes_count=F('likes_count') + 1)
-            return Response({'liked': True, 'message': 'Post liked'})
+            days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+        except ValueError:
+            return Response(
+                {'error': 'days must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    
+        return Response(post_analytics(post, days))
     
     @action(detail=False, methods=['get'])
+    @cache_response(post_list_dependencies)
     def featured(self, request):
         """Get featured posts"""
-        posts = self.get_queryset().filter(is_featured=True)[:5]
+        posts = self.sparse_queryset(self.get_queryset().filter(is_featured=True))[:5]
         serializer = PostListSerializer(posts, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response(post_list_dependencies)
     def popular(self, request):
-        """Get popular posts based on views and likes"""
-        posts = self.get_queryset().annotate(
-            popularity_score=F('views_count') + F('likes_count') * 2
-        ).order_by('-popularity_score')[:10]
+        """Get popular posts by time-decayed views, likes and comments"""
+        posts = self.sparse_queryset(self.get_queryset().order_by('-popularity_score', '-id'))[:10]
         serializer = PostListSerializer(posts, many=True, context={'request': request})
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @cache_response(post_list_dependencies)
     def recent(self, request):
         """Get recent posts"""
-        posts = self.get_queryset().filter(status='published').order_by('-published_at')[:10]
+        posts = self.sparse_queryset(self.get_queryset().filter(status='published').order_by('-published_at'))[:10]
         serializer = PostListSerializer(posts, many=True, context={'request': request})
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        """Stream every post with its tags, category and comments as NDJSON"""
+        return streaming_response(export_posts(), 'posts.ndjson')
+    
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[permissions.IsAdminUser])
+    def bulk_import(self, request):
+        """Bulk import posts from an NDJSON request body, as produced by export"""
+        report = ImportReport()
+        try:
+            import_posts(load_lines(request.stream or []), default_author=request.user, report=report)
+        except ValueError as e:
+            # Chunks before the invalid record are already imported
+            return Response({'error': str(e), **report.as_dict()}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info(f"Imported posts: {report}")
+        return Response(report.as_dict(), status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['get'])
+    def semantic_search(self, request):
+        """Search posts by meaning using sentence embeddings"""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'Query parameter q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            # Over-fetch so posts hidden from this user don't leave the page short
+            matches = search_post_ids(query, limit * 5)
+        except Exception as e:
+            logger.error(f"Error running semantic search: {str(e)}")
+            return Response(
+                {'error': 'Semantic search is currently unavailable'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        scores = dict(matches)
+        visible = self.get_queryset().in_bulk([post_id for post_id, _ in matches])
+        posts = [visible[post_id] for post_id, _ in matches if post_id in visible][:limit]
+        
+        serializer = PostListSerializer(posts, many=True, context={'request': request})
+        results = serializer.data
+        for item in results:
+            item['score'] = round(scores[item['id']], 4)
+        return Response(results)
+    
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def ai_title_suggestions(self, request):
         """Generate AI-powered title suggestions for a blog post"""
@@ -295,16 +459,32 @@ class PostViewSet(viewsets.ModelViewSet):
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for Category model - read-only for now"""
-    queryset = Category.objects.annotate(post_count=Count('posts')).order_by('name')
+    queryset = Category.objects.order_by('name')
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    
+    @local_snapshot('categories')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response(category_dependencies)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet for Tag model - read-only for now"""
-    queryset = Tag.objects.annotate(post_count=Count('posts')).order_by('name')
+    queryset = Tag.objects.order_by('name')
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    
+    @local_snapshot('tags')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response(tag_dependencies)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
 
 class CommentViewSet(viewsets.ModelViewSet):
@@ -312,6 +492,7 @@ class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.select_related('author', 'post').order_by('-created_at')
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetCursorPagination
     
     def get_queryset(self):
         """Filter comments by post if post_id is provided"""
@@ -324,3 +505,18 @@ class CommentViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Set the author when creating a comment"""
         serializer.save(author=self.request.user)
+    
+    @action(detail=True, methods=['get'])
+    def replies(self, request, pk=None):
+        """Load more replies to a comment, ?cursor=...&depth=N"""
+        comment = self.get_object()
+        _, comments_by_id = load_comment_tree(comment.post)
+        node = comments_by_id.get(comment.id)
+        page, cursor = paginate(
+            node.children if node else [],
+            request.query_params.get('cursor'),
+            settings.BLOG_COMMENT_REPLIES_PAGE_SIZE
+        )
+        prune_replies(page, reply_depth(request))
+        serializer = CommentThreadSerializer(page, many=True, context={'request': request})
+        return Response({'next': next_page_url(request, cursor), 'results': serializer.data})